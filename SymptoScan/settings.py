@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,6 +51,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "ss_app.middleware.AdminRedirectMiddleware",
+    "ss_app.query_budget.QueryBudgetMiddleware",
+    "ss_app.middleware.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "SymptoScan.urls"
@@ -86,6 +89,30 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# To share prediction results between workers, add a Redis or Memcached cache
+# here (e.g. "predictions") and name it in PREDICTION_CACHE_ALIAS below. Avoid
+# FileBasedCache for it: every miss opens a file and every set lists the whole
+# cache directory, which is far slower than running the model.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+
+# Pre-rendered word cloud images (ss_app/wordcloud_images.py). A new image is
+# rendered in the background once the word counts drift from the current
+# image's by more than this fraction; `manage.py render_wordcloud` renders on
+# a schedule.
+WORDCLOUD_IMAGE_DIR = BASE_DIR / "cache" / "wordclouds"
+WORDCLOUD_RERENDER_THRESHOLD = 0.05
+# Background renders of visitor-chosen date ranges allowed per hour; the
+# site-wide and per-disease clouds are always rendered.
+WORDCLOUD_WINDOW_RENDERS_PER_HOUR = 20
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -138,6 +165,80 @@ LOGIN_URL = '/account/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
+# ML predictors are loaded on first use. Set to True to load every predictor
+# when the app starts, or to a list of disease slugs (e.g. ['diabetes']). Under
+# gunicorn.conf.py (preload_app) that happens once in the master process, so
+# forked workers share the memory-mapped models.
+PREDICTOR_WARMUP = False
+
+# Serve predictions from the array-backed .forest exports written by
+# `manage.py compile_models` when they exist, instead of the .pkl files.
+PREDICTOR_COMPILED_MODELS = True
+
+# Versioned model artifacts written by `manage.py train_models`. Web workers
+# only load what is published here (or the models bundled with ss_app).
+MODEL_ARTIFACT_ROOT = BASE_DIR / 'ss_app' / 'artifacts'
+
+# Seconds between checks for a newly published or replaced model; a changed
+# model is loaded in the background and swapped in without a restart. 0 disables.
+PREDICTOR_RELOAD_INTERVAL = 5
+
+# Structured prediction records on the `ss_app.inference` logger (see
+# ss_app/inference_log.py): the fraction of predictions logged and their level.
+INFERENCE_LOG_SAMPLE_RATE = 0.01
+INFERENCE_LOG_LEVEL = 'INFO'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'ss_app.inference_log.JSONFormatter'},
+    },
+    'handlers': {
+        'inference': {'class': 'logging.StreamHandler', 'formatter': 'json'},
+    },
+    'loggers': {
+        'ss_app.inference': {'handlers': ['inference'], 'level': INFERENCE_LOG_LEVEL, 'propagate': False},
+    },
+}
+
+# Request profiling (ss_app.middleware.ProfilingMiddleware): the fraction of
+# requests profiled; admins can also send `X-Profile: 1`. Reports are kept in
+# PROFILING_REPORT_DIR and viewed under /custom-admin/profiles/.
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_STACK_INTERVAL = 0.005
+PROFILING_REPORT_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_REPORTS = 200
+
+# Per-view SQL query budgets (ss_app/query_budget.py). Views declare a budget
+# with @query_budget(n); others get QUERY_BUDGET_DEFAULT (None: unlimited).
+# Overruns and statements repeated QUERY_BUDGET_REPEAT_THRESHOLD times in one
+# request (likely N+1) are logged; under `manage.py test` overruns raise.
+# QUERY_BUDGET_MODE: 'log', 'raise' or 'off'.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+QUERY_BUDGET_MODE = 'raise' if TESTING else 'log'
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_REPEAT_THRESHOLD = 5
+
+# Training workers (`manage.py run_training_worker`) mark their job alive every
+# TRAINING_HEARTBEAT_INTERVAL seconds. A running job silent for
+# TRAINING_JOB_TIMEOUT seconds (its worker was killed) goes back to the queue,
+# or fails once workers died on it TRAINING_JOB_MAX_ATTEMPTS times.
+TRAINING_HEARTBEAT_INTERVAL = 30
+TRAINING_JOB_TIMEOUT = 300
+TRAINING_JOB_MAX_ATTEMPTS = 3
+
+# In-process LRU of prediction results, keyed on the disease and the feature
+# values rounded to PREDICTION_CACHE_DECIMALS places. A size of 0 disables it.
+PREDICTION_CACHE_SIZE = 1024
+PREDICTION_CACHE_DECIMALS = 2
+
+# Cache alias that shares prediction results between worker processes, or
+# None (the default) to keep them in the per-process LRU only. Keys include
+# the model version, so a retrained model never reads results cached for the
+# old one.
+PREDICTION_CACHE_ALIAS = None
+
 # Messages
 from django.contrib.messages import constants as messages
 MESSAGE_TAGS = {
@@ -31,9 +31,11 @@ urlpatterns = [
     path('edit-review/<int:review_id>/', ss.edit_review, name='edit_review'),
     path('delete-review/<int:review_id>/', ss.delete_review, name='delete_review'),
     path('api/disease/<str:disease_name>/stats/', ss.api_disease_stats, name='api_disease_stats'),
+    path('api/disease/<str:disease_name>/predict-batch/', ss.api_predict_batch, name='api_predict_batch'),
     path('api/disease/<str:disease_name>/region/<str:region>/', ss.api_regional_data, name='api_regional_data'),
     path('risk-check/', ss.risk_check, name='risk_check'),
     path('wordcloud/', ss.wordcloud_view, name='wordcloud'),
+    path('wordcloud/image/<str:key>.png', ss.wordcloud_image, name='wordcloud_image'),
     
     # AI Chat URLs
     path('chat/<int:prediction_id>/', chat_views.chat_with_ai, name='chat_with_ai'),
@@ -49,11 +51,17 @@ urlpatterns = [
     path('custom-admin/users/', ss.admin_users, name='admin_users'),
     path('custom-admin/users/<int:user_id>/', ss.admin_user_detail, name='admin_user_detail'),
     path('custom-admin/users/<int:user_id>/delete/', ss.admin_delete_user, name='admin_delete_user'),
+    path('custom-admin/metrics/', ss.admin_metrics, name='admin_metrics'),
+    path('custom-admin/profiles/', ss.admin_profiles, name='admin_profiles'),
+    path('custom-admin/profiles/<str:report_id>/', ss.admin_profile_detail, name='admin_profile_detail'),
+    path('custom-admin/profiles/<str:report_id>/<str:kind>/', ss.admin_profile_download, name='admin_profile_download'),
     path('custom-admin/diseases/', ss.admin_diseases, name='admin_diseases'),
     path('custom-admin/diseases/<int:disease_id>/', ss.admin_disease_detail, name='admin_disease_detail'),
     path('custom-admin/diseases/<int:disease_id>/edit/', ss.admin_disease_edit, name='admin_disease_edit'),
     path('custom-admin/diseases/<int:disease_id>/delete/', ss.admin_disease_delete, name='admin_disease_delete'),
     path('custom-admin/diseases/<int:disease_id>/form-fields/', ss.admin_form_fields, name='admin_form_fields'),
+    path('custom-admin/diseases/<int:disease_id>/train/', ss.admin_disease_train, name='admin_disease_train'),
+    path('custom-admin/diseases/<int:disease_id>/training-jobs/', ss.admin_training_jobs, name='admin_training_jobs'),
     path('custom-admin/reviews/', ss.admin_reviews, name='admin_reviews'),
     path('custom-admin/reviews/<int:review_id>/moderate/', ss.admin_review_moderate, name='admin_review_moderate'),
     path('custom-admin/chat-logs/', ss.admin_chat_logs, name='admin_chat_logs'),
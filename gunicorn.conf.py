@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for SymptoScan.
+
+    gunicorn SymptoScan.wsgi -c gunicorn.conf.py
+
+The application is loaded once in the master process before workers are
+forked. Set PREDICTOR_WARMUP = True (or a list of disease slugs) in the
+settings the server runs with to load the disease predictors there too: with
+the compiled .forest models (`manage.py compile_models`) the model arrays are
+memory-mapped read-only, so all workers then share the same pages. Use
+`manage.py model_memory_report` to see the per-worker memory this saves.
+
+gunicorn is a deployment dependency only; it does not run on Windows.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+preload_app = True
@@ -1,6 +1,28 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class SsAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ss_app"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save, pre_save
+        from .risk_bands import invalidate_risk_bands
+        from .signals import (counted_object_deleted, counted_object_saved, remember_review, review_deleted,
+                              review_saved)
+        post_save.connect(invalidate_risk_bands, sender='ss_app.RiskCategory')
+        post_delete.connect(invalidate_risk_bands, sender='ss_app.RiskCategory')
+        pre_save.connect(remember_review, sender='ss_app.Review')
+        post_save.connect(review_saved, sender='ss_app.Review')
+        post_delete.connect(review_deleted, sender='ss_app.Review')
+        for sender in ('auth.User', 'ss_app.Prediction', 'ss_app.AIChatLog'):
+            post_save.connect(counted_object_saved, sender=sender)
+            post_delete.connect(counted_object_deleted, sender=sender)
+
+        # Predictors load lazily on the first prediction. Workers that would
+        # rather pay that cost at boot can opt in with PREDICTOR_WARMUP.
+        warmup = getattr(settings, 'PREDICTOR_WARMUP', False)
+        if warmup:
+            from .ml_models import predictor_registry
+            predictor_registry.warm_up(None if warmup is True else warmup)
@@ -0,0 +1,293 @@
+"""
+Latency and throughput benchmarks for the public and admin pages.
+
+``seed`` fills the database with synthetic users, predictions, reviews and
+chat logs; ``run_benchmarks`` then requests every endpoint through the Django
+test client and reports, per endpoint, requests/second and p50/p95/p99
+latency, the status codes seen and the SQL queries per request. Requests are
+sent one at a time, so throughput is that of a single worker process.
+
+Use the ``run_benchmarks`` management command, which does this in a throwaway
+test database and writes the results as JSON for comparison across commits.
+Caches, word cloud images and profiling reports written during a run go to a
+temporary directory too (see ``scratch_storage``), never to the host's own.
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+
+from .dashboard_stats import reconcile_dashboard_stats
+from .ml_models import PREDICTOR_SPECS
+from .models import AIChatLog, Disease, Prediction, Review
+from .review_terms import rebuild_review_terms
+
+BENCHMARK_PASSWORD = 'benchmark-pass'
+ADMIN_USERNAME = 'testadmin'
+
+# custom-admin pages that change data or only accept POST
+SKIPPED_ADMIN_VIEWS = {
+    'admin_delete_user', 'admin_disease_delete', 'admin_disease_train',
+    'admin_review_moderate', 'admin_delete_chat_log',
+}
+
+REVIEW_WORDS = (
+    'accurate helpful quick easy simple clear useful reliable confusing slow detailed '
+    'prediction result doctor advice health risk glucose pressure heart form great good'
+).split()
+
+
+def seed(users=50, predictions=500, reviews=200, chat_logs=500, rng=None):
+    """Create synthetic data and return the ids the endpoints need"""
+    rng = rng or random.Random(0)
+    password = make_password(BENCHMARK_PASSWORD)
+
+    diseases = [Disease.objects.get_or_create(name=spec['name'], defaults={
+        'description': f"{spec['name']} benchmark description",
+        'symptoms': 'Fatigue, Headaches',
+        'prevention': 'Exercise regularly, Eat a balanced diet',
+    })[0] for spec in PREDICTOR_SPECS.values()]
+
+    User.objects.get_or_create(username=ADMIN_USERNAME, defaults={'password': password})
+    existing = User.objects.filter(username__startswith='bench-user-').count()
+    User.objects.bulk_create([
+        User(username=f'bench-user-{index}', email=f'bench-user-{index}@example.com', password=password)
+        for index in range(existing, max(users, 1))
+    ])
+    bench_users = list(User.objects.filter(username__startswith='bench-user-').order_by('id'))
+
+    Prediction.objects.bulk_create([
+        Prediction(
+            user=rng.choice(bench_users),
+            disease=rng.choice(diseases),
+            symptoms_data={'glucose': rng.randint(70, 200), 'bmi': round(rng.uniform(18, 40), 1)},
+            risk_level=rng.choice(['low', 'medium', 'high']),
+            confidence_score=round(rng.uniform(50, 100), 2),
+        )
+        for _ in range(predictions)
+    ], batch_size=500)
+    all_predictions = list(Prediction.objects.select_related('user', 'disease'))
+
+    review_predictions = rng.sample(all_predictions, min(reviews, len(all_predictions)))
+    Review.objects.bulk_create([
+        Review(
+            user=prediction.user,
+            disease=prediction.disease,
+            prediction=prediction,
+            rating=rng.randint(1, 5),
+            comment=' '.join(rng.choice(REVIEW_WORDS) for _ in range(rng.randint(5, 30))),
+        )
+        for prediction in review_predictions
+    ], batch_size=500)
+    # bulk_create skips the signals that maintain the word cloud terms
+    rebuild_review_terms()
+
+    logs = []
+    for index in range(chat_logs):
+        prediction = rng.choice(all_predictions)
+        logs.append(AIChatLog(
+            user=prediction.user,
+            disease=prediction.disease,
+            prediction=prediction,
+            conversation_id=f'bench-{prediction.id}',
+            message='What does my result mean?',
+            response='Your result suggests talking to a doctor about your risk.',
+            is_user_message=bool(index % 2),
+        ))
+    AIChatLog.objects.bulk_create(logs, batch_size=500)
+    # bulk_create skips the signals that maintain the dashboard counters too
+    reconcile_dashboard_stats()
+
+    # The benchmarked patient needs a prediction of their own to chat about
+    patient = bench_users[0]
+    patient_prediction = Prediction.objects.filter(user=patient).first() or Prediction.objects.create(
+        user=patient, disease=diseases[0], symptoms_data={}, risk_level='low', confidence_score=75.0)
+    return {
+        'patient': patient.username,
+        'user_id': patient.id,
+        'prediction_id': patient_prediction.id,
+        'disease_id': Disease.objects.get(name=PREDICTOR_SPECS['diabetes']['name']).id,
+        'review_id': Review.objects.order_by('id').values_list('id', flat=True).first(),
+        'chat_log_id': AIChatLog.objects.order_by('id').values_list('id', flat=True).first(),
+    }
+
+
+def diabetes_form(rng):
+    return {
+        'glucose': rng.randint(70, 200), 'blood_pressure': rng.randint(60, 110),
+        'bmi': round(rng.uniform(18, 40), 1), 'age': rng.randint(21, 80),
+        'pregnancies': rng.randint(0, 8), 'insulin': rng.randint(0, 300),
+    }
+
+
+def admin_endpoints(ids):
+    """GET endpoints for every custom-admin page that has no side effects"""
+    endpoints = []
+    for pattern in get_resolver().url_patterns:
+        route = str(pattern.pattern)
+        name = getattr(pattern, 'name', None)
+        if not route.startswith('custom-admin/') or not name or name in SKIPPED_ADMIN_VIEWS:
+            continue
+        params = list(pattern.pattern.converters)
+        if any(param not in ids or ids[param] is None for param in params):
+            continue
+        endpoints.append({'name': name, 'client': 'admin', 'method': 'get',
+                          'path': reverse(name, kwargs={param: ids[param] for param in params})})
+    return endpoints
+
+
+def endpoints(ids, rng):
+    """Everything benchmarked, as dicts of name, client, method, path and data"""
+    prediction_id = ids['prediction_id']
+    return [
+        {'name': 'home', 'client': 'patient', 'method': 'get', 'path': reverse('home')},
+        {'name': 'disease_detail', 'client': 'patient', 'method': 'get',
+         'path': reverse('disease_detail', args=['diabetes'])},
+        {'name': 'predict_disease', 'client': 'patient', 'method': 'post',
+         'path': reverse('predict_disease', args=['diabetes']),
+         # Fresh inputs each time, so predictions don't come from the cache
+         'data': lambda: diabetes_form(rng)},
+        {'name': 'user_predictions', 'client': 'patient', 'method': 'get', 'path': reverse('user_predictions')},
+        {'name': 'wordcloud', 'client': 'patient', 'method': 'get', 'path': reverse('wordcloud')},
+        {'name': 'send_message', 'client': 'patient', 'method': 'post', 'path': reverse('send_message'),
+         'content_type': 'application/json',
+         'data': lambda: json.dumps({'message': 'What does high blood sugar mean for me?',
+                                     'prediction_id': prediction_id,
+                                     'conversation_id': f'bench-{prediction_id}'})},
+    ] + admin_endpoints(ids)
+
+
+def percentiles(timings):
+    p50, p95, p99 = np.percentile(np.asarray(timings) * 1000, [50, 95, 99])
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+
+def measure(client, endpoint, requests=50, warmup=3):
+    """Request one endpoint ``warmup + requests`` times and summarise the timed part"""
+    send = getattr(client, endpoint['method'])
+
+    def request():
+        data = endpoint.get('data')
+        kwargs = {'content_type': endpoint['content_type']} if 'content_type' in endpoint else {}
+        return send(endpoint['path'], data() if callable(data) else data, **kwargs)
+
+    for _ in range(warmup):
+        request()
+
+    timings, queries, statuses = [], [], Counter()
+    started = time.perf_counter()
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as captured:
+            request_started = time.perf_counter()
+            response = request()
+            timings.append(time.perf_counter() - request_started)
+        queries.append(len(captured))
+        statuses[response.status_code] += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        'name': endpoint['name'],
+        'method': endpoint['method'].upper(),
+        'path': endpoint['path'],
+        'requests': requests,
+        'errors': sum(count for status, count in statuses.items() if status >= 400),
+        'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+        'throughput_rps': requests / elapsed if elapsed else 0.0,
+        'mean_ms': float(np.mean(timings) * 1000),
+        **percentiles(timings),
+        'max_ms': float(np.max(timings) * 1000),
+        'queries': int(np.median(queries)),
+    }
+
+
+@contextlib.contextmanager
+def scratch_storage():
+    """Point every cache and file store the pages write to at a temporary directory.
+
+    Synthetic predictions must not reach the shared prediction cache, and
+    word cloud images and profiling reports of synthetic data must not land
+    among the real ones.
+    """
+    from .prediction_cache import prediction_cache
+
+    with tempfile.TemporaryDirectory(prefix='symptoscan-benchmark-') as scratch:
+        overrides = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                'LOCATION': 'benchmark'}},
+            PROFILING_REPORT_DIR=os.path.join(scratch, 'profiles'),
+            WORDCLOUD_IMAGE_DIR=os.path.join(scratch, 'wordclouds'),
+        )
+        alias, prediction_cache.alias = prediction_cache.alias, None
+        try:
+            with overrides:
+                yield scratch
+                # Let background word cloud renders finish before their directory goes
+                for thread in threading.enumerate():
+                    if thread.name.startswith('wordcloud-'):
+                        thread.join()
+        finally:
+            # Only the in-process entries: the shared cache was never used
+            prediction_cache.clear()
+            prediction_cache.alias = alias
+
+
+def run_benchmarks(ids, requests=50, warmup=3, only=None, progress=None, rng=None):
+    """Benchmark every endpoint (or those named in ``only``) and return their results"""
+    with scratch_storage():
+        return _run_benchmarks(ids, requests, warmup, only, progress, rng)
+
+
+def _run_benchmarks(ids, requests, warmup, only, progress, rng):
+    from .ai_chat_service import ai_chat_service
+
+    rng = rng or random.Random(0)
+    # Views that raise are recorded as 500s rather than aborting the run
+    clients = {'patient': Client(raise_request_exception=False), 'admin': Client(raise_request_exception=False)}
+    clients['patient'].login(username=ids['patient'], password=BENCHMARK_PASSWORD)
+    clients['admin'].login(username=ADMIN_USERNAME, password=BENCHMARK_PASSWORD)
+
+    # Measure our own code: chat answers come from the built-in fallback, not the OpenAI API
+    api_key, ai_chat_service.api_key = ai_chat_service.api_key, None
+    results = []
+    try:
+        for endpoint in endpoints(ids, rng):
+            if only and endpoint['name'] not in only:
+                continue
+            # Views print diagnostics; keep them out of the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = measure(clients[endpoint['client']], endpoint, requests, warmup)
+            results.append(result)
+            if progress:
+                progress(result)
+    finally:
+        ai_chat_service.api_key = api_key
+    return results
+
+
+def compare(results, baseline):
+    """Per endpoint, the relative change in p95 latency and throughput against a baseline report"""
+    previous = {result['name']: result for result in baseline.get('endpoints', [])}
+    changes = {}
+    for result in results:
+        before = previous.get(result['name'])
+        if not before:
+            continue
+        changes[result['name']] = {
+            'p95_change': result['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else None,
+            'throughput_change': (result['throughput_rps'] / before['throughput_rps'] - 1
+                                  if before['throughput_rps'] else None),
+        }
+    return changes
@@ -4,8 +4,10 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
+from django.db.models import Min
 from .models import Prediction, AIChatLog
 from .ai_chat_service import ai_chat_service
+from .query_budget import query_budget
 import json
 
 @login_required
@@ -107,28 +109,28 @@ def start_new_conversation(request, prediction_id):
     return redirect('chat_with_ai', prediction_id=prediction_id)
 
 @login_required
+@query_budget(6)
 def chat_history(request):
     """View all chat conversations for the user"""
-    conversations = AIChatLog.objects.filter(
-        user=request.user
-    ).values('conversation_id', 'disease__name', 'prediction__risk_level', 'timestamp').distinct()
-    
-    # Group by conversation
+    # The first message of each conversation, fetched in one query
+    first_message_ids = AIChatLog.objects.filter(
+        user=request.user, conversation_id__isnull=False
+    ).exclude(conversation_id='').values('conversation_id').annotate(first_id=Min('id')).values('first_id')
+    first_messages = AIChatLog.objects.filter(
+        id__in=first_message_ids
+    ).select_related('disease', 'prediction').order_by('timestamp')
+    
+    # One session per conversation
     chat_sessions = []
-    for conv in conversations:
-        if conv['conversation_id']:
-            # Get the first message of this conversation
-            first_message = AIChatLog.objects.filter(
-                conversation_id=conv['conversation_id']
-            ).order_by('timestamp').first()
-            
-            chat_sessions.append({
-                'conversation_id': conv['conversation_id'],
-                'disease_name': conv['disease__name'],
-                'risk_level': conv['prediction__risk_level'],
-                'timestamp': conv['timestamp'],
-                'first_message': first_message.response if first_message and not first_message.is_user_message else "Conversation started"
-            })
+    for first_message in first_messages:
+        chat_sessions.append({
+            'conversation_id': first_message.conversation_id,
+            'prediction_id': first_message.prediction_id,
+            'disease_name': first_message.disease.name if first_message.disease else None,
+            'risk_level': first_message.prediction.risk_level if first_message.prediction else None,
+            'timestamp': first_message.timestamp,
+            'first_message': first_message.response if not first_message.is_user_message else "Conversation started"
+        })
     
     context = {
         'chat_sessions': chat_sessions
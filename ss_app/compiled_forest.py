@@ -0,0 +1,209 @@
+"""
+Array-backed inference for scikit-learn random forests.
+
+A fitted ``RandomForestClassifier`` is flattened into a handful of contiguous
+NumPy arrays (one entry per node across every tree) and saved as ``.npy``
+files in a ``<model>.forest`` directory next to the pickle. Loading memory-maps
+those files, so it is near-instant, needs no unpickling and lets forked
+workers share the same physical pages.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# Arrays written by export_forest(), one .npy file each
+FOREST_ARRAYS = ('feature', 'threshold', 'children_left', 'children_right', 'value', 'roots')
+# Written by exports from scikit-learn versions that route missing values;
+# older exports lack it and reject NaN inputs
+OPTIONAL_ARRAYS = ('missing_go_to_left',)
+META_FILE = 'forest.json'
+
+
+def compiled_path(model_path):
+    """Directory holding the compiled form of the pickle at ``model_path``"""
+    return os.path.splitext(model_path)[0] + '.forest'
+
+
+def file_digest(path):
+    """SHA-256 of a file, used to tie a compiled forest to its source pickle"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def process_umask():
+    """The process umask (reading it means briefly setting it)"""
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def staging_dir(parent, prefix='.tmp-'):
+    """A new directory in ``parent`` to build an artifact in before renaming it into place.
+
+    ``mkdtemp`` makes it private to its owner, but web workers may run as
+    another user than ``train_models`` or the upload flow, so it gets the
+    permissions ``os.makedirs`` would have given it.
+    """
+    directory = tempfile.mkdtemp(prefix=prefix, dir=parent)
+    os.chmod(directory, 0o777 & ~process_umask())
+    return directory
+
+
+def export_forest(model, directory, source_path=None):
+    """Flatten a fitted random forest into ``directory``.
+
+    Node indices are made global across trees: ``roots[t]`` is the first node
+    of tree ``t`` and leaves have ``feature == -1``. ``value`` holds each
+    node's class probabilities, normalised the same way sklearn's
+    ``DecisionTreeClassifier.predict_proba`` does, and ``missing_go_to_left``
+    the side sklearn sends NaN inputs to at each split. When ``source_path``
+    is given, its digest is recorded so stale exports can be detected.
+    """
+    features, thresholds, lefts, rights, values, roots, missing_left = [], [], [], [], [], [], []
+    routes_missing = all(hasattr(estimator.tree_, 'missing_go_to_left') for estimator in model.estimators_)
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, -1, tree.feature))
+        thresholds.append(tree.threshold)
+        lefts.append(np.where(is_leaf, -1, tree.children_left + offset))
+        rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+        if routes_missing:
+            missing_left.append(np.asarray(tree.missing_go_to_left, dtype=np.bool_))
+
+        value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'children_left': np.concatenate(lefts).astype(np.int32),
+        'children_right': np.concatenate(rights).astype(np.int32),
+        'value': np.ascontiguousarray(np.concatenate(values)),
+        'roots': np.asarray(roots, dtype=np.int32),
+    }
+    if routes_missing:
+        arrays['missing_go_to_left'] = np.concatenate(missing_left)
+    meta = {
+        'classes': np.asarray(model.classes_).tolist(),
+        'n_features': int(model.n_features_in_),
+        'n_trees': len(model.estimators_),
+        'n_nodes': int(offset),
+        'max_depth': int(max_depth),
+        'feature_names': [str(name) for name in getattr(model, 'feature_names_in_', [])],
+        'source_sha256': file_digest(source_path) if source_path else None,
+    }
+
+    # Write into a sibling directory and swap it into place, so workers that
+    # have the previous export memory-mapped keep reading intact files
+    directory = os.path.abspath(directory)
+    staging = staging_dir(os.path.dirname(directory))
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, f'{name}.npy'), array)
+    with open(os.path.join(staging, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    if os.path.exists(directory):
+        retired = tempfile.mkdtemp(prefix='.old-', dir=os.path.dirname(directory))
+        os.rename(directory, os.path.join(retired, 'forest'))
+        os.rename(staging, directory)
+        shutil.rmtree(retired)
+    else:
+        os.rename(staging, directory)
+    return directory
+
+
+class CompiledForest:
+    """Drop-in replacement for a fitted forest's ``predict``/``predict_proba``"""
+
+    def __init__(self, arrays, meta):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.missing_go_to_left = arrays.get('missing_go_to_left')
+        self.meta = meta
+        self.classes_ = np.asarray(meta['classes'])
+        self.n_features_in_ = meta['n_features']
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Load a directory written by ``export_forest()``"""
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in FOREST_ARRAYS + OPTIONAL_ARRAYS
+            if name in FOREST_ARRAYS or os.path.exists(os.path.join(directory, f'{name}.npy'))
+        }
+        return cls(arrays, meta)
+
+    @classmethod
+    def exists(cls, directory):
+        return os.path.exists(os.path.join(directory, META_FILE))
+
+    def apply(self, X):
+        """Return the leaf reached in every tree, shape (n_samples, n_trees).
+
+        Like sklearn, NaN inputs follow each split's ``missing_go_to_left``
+        and infinite ones (or ones too large for float32) are rejected.
+        """
+        # sklearn compares float32 inputs against float64 thresholds
+        with np.errstate(over='ignore'):
+            X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        if np.isinf(X).any():
+            raise ValueError("Input contains infinity or a value too large for float32")
+        has_missing = bool(np.isnan(X).any())
+        if has_missing and self.missing_go_to_left is None:
+            raise ValueError("Input contains NaN, which this export cannot route; re-run compile_models")
+
+        n_samples, n_trees = len(X), len(self.roots)
+        nodes = np.tile(self.roots, n_samples)
+        samples = np.repeat(np.arange(n_samples), n_trees)
+        # Walk every (sample, tree) pair one level per step, dropping pairs
+        # from the working set as soon as they reach a leaf
+        active = np.arange(len(nodes))
+        while active.size:
+            current = nodes[active]
+            feature = self.feature[current]
+            internal = feature >= 0
+            active, current, feature = active[internal], current[internal], feature[internal]
+            values = X[samples[active], feature]
+            go_left = values <= self.threshold[current]
+            if has_missing:
+                go_left |= np.isnan(values) & self.missing_go_to_left[current]
+            nodes[active] = np.where(go_left, self.children_left[current], self.children_right[current])
+        return nodes.reshape(n_samples, n_trees)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # Accumulate tree by tree, in the same order as sklearn, so results
+        # (and risk bands at exact thresholds) match the original model
+        proba = np.zeros((len(leaves), len(self.classes_)))
+        for tree in range(leaves.shape[1]):
+            proba += self.value[leaves[:, tree]]
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -0,0 +1,172 @@
+"""
+Counters behind the custom admin dashboard.
+
+The dashboard reads precomputed ``DashboardStat`` rows with one query
+instead of counting whole tables on every load. Keys:
+
+* ``users``, ``predictions``, ``reviews``, ``chat_logs``, ``conversations``:
+  totals
+* ``<name>@<YYYY-MM>``: users, predictions, reviews and chat logs created in
+  a calendar month (local time)
+* ``predictions:disease:<id>``, ``reviews:rating:<n>``: chart data
+* ``conversation:<id>``: messages in one chat conversation, so that
+  ``conversations`` changes only with a conversation's first and last message
+
+The signals in ``ss_app.signals`` apply every create and delete as
+in-database increments. ``bulk_create`` sends no signals, so code that bulk
+inserts applies ``bulk_stat_changes()`` itself; queryset updates and raw SQL
+bypass the counters, and ``manage.py reconcile_dashboard_stats`` recounts everything from the
+tables and reports what had drifted. Run it at a quiet time: increments made
+while it counts are overwritten.
+"""
+from collections import Counter
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import AIChatLog, DashboardStat, Disease, Prediction, Review
+
+RATINGS = range(1, 6)
+
+# (counter name, model, creation timestamp field)
+COUNTED_MODELS = [
+    ('users', 'auth.User', 'date_joined'),
+    ('predictions', 'ss_app.Prediction', 'created_at'),
+    ('reviews', 'ss_app.Review', 'created_at'),
+    ('chat_logs', 'ss_app.AIChatLog', 'timestamp'),
+]
+
+
+def month_key(name, when):
+    if timezone.is_aware(when):
+        when = timezone.localtime(when)
+    return f'{name}@{when:%Y-%m}'
+
+
+def stat_changes(instance, sign):
+    """Counter changes for one object being created (``sign`` 1) or deleted (-1)"""
+    label = instance._meta.label
+    for name, model, date_field in COUNTED_MODELS:
+        if model == label:
+            break
+    else:
+        return {}
+
+    changes = {name: sign, month_key(name, getattr(instance, date_field)): sign}
+    if isinstance(instance, Prediction):
+        changes[f'predictions:disease:{instance.disease_id}'] = sign
+    elif isinstance(instance, Review):
+        changes[f'reviews:rating:{instance.rating}'] = sign
+    elif isinstance(instance, AIChatLog) and instance.conversation_id:
+        changes[f'conversation:{instance.conversation_id}'] = sign
+    return changes
+
+
+def bulk_stat_changes(instances, sign=1):
+    """Summed ``stat_changes`` of many objects, e.g. after a ``bulk_create``"""
+    changes = Counter()
+    for instance in instances:
+        changes.update(stat_changes(instance, sign))
+    return changes
+
+
+def _increment(changes):
+    by_change = {}
+    for key, change in changes.items():
+        by_change.setdefault(change, []).append(key)
+    # Rows start at 0 and every change is an in-database increment, so
+    # concurrent requests never overwrite each other's counts
+    DashboardStat.objects.bulk_create([DashboardStat(key=key, value=0) for key in changes], ignore_conflicts=True)
+    for change, keys in by_change.items():
+        DashboardStat.objects.filter(key__in=keys).update(value=F('value') + change)
+
+
+def apply_stat_changes(changes):
+    changes = {key: change for key, change in changes.items() if change}
+    if not changes:
+        return
+    with transaction.atomic():
+        _increment(changes)
+
+        conversations = [key for key in changes if key.startswith('conversation:')]
+        if not conversations:
+            return
+        values = dict(DashboardStat.objects.filter(key__in=conversations).values_list('key', 'value'))
+        started = [key for key in conversations if changes[key] > 0 and values.get(key) == changes[key]]
+        ended = [key for key in conversations if changes[key] < 0 and values.get(key, 0) <= 0]
+        if len(started) != len(ended):
+            _increment({'conversations': len(started) - len(ended)})
+        DashboardStat.objects.filter(key__in=ended).delete()
+
+
+def dashboard_stats(now=None):
+    """The dashboard's counters and chart data"""
+    now = now or timezone.now()
+    diseases = dict(Disease.objects.values_list('id', 'name'))
+    keys = ([name for name, model, date_field in COUNTED_MODELS] + ['conversations']
+            + [month_key(name, now) for name, model, date_field in COUNTED_MODELS]
+            + [f'predictions:disease:{disease_id}' for disease_id in diseases]
+            + [f'reviews:rating:{rating}' for rating in RATINGS])
+    values = dict(DashboardStat.objects.filter(key__in=keys).values_list('key', 'value'))
+
+    by_disease = [(values.get(f'predictions:disease:{disease_id}', 0), name) for disease_id, name in diseases.items()]
+    by_disease.sort(key=lambda item: item[0], reverse=True)
+    return {
+        'total_users': values.get('users', 0),
+        'total_predictions': values.get('predictions', 0),
+        'total_diseases': len(diseases),
+        'total_reviews': values.get('reviews', 0),
+        'total_chat_logs': values.get('chat_logs', 0),
+        'unique_conversations': values.get('conversations', 0),
+        'predictions_by_disease': [{'disease__name': name, 'count': count} for count, name in by_disease[:5] if count],
+        'reviews_by_rating': [{'rating': rating, 'count': values[f'reviews:rating:{rating}']}
+                              for rating in RATINGS if values.get(f'reviews:rating:{rating}')],
+        'monthly_predictions': values.get(month_key('predictions', now), 0),
+        'monthly_users': values.get(month_key('users', now), 0),
+        'monthly_chat_logs': values.get(month_key('chat_logs', now), 0),
+        'monthly_reviews': values.get(month_key('reviews', now), 0),
+    }
+
+
+def compute_stats(apps=global_apps):
+    """Every counter, counted from the tables"""
+    stats = Counter()
+    for name, model, date_field in COUNTED_MODELS:
+        objects = apps.get_model(model).objects.order_by()
+        stats[name] = objects.count()
+        months = objects.annotate(month=TruncMonth(date_field)).values('month').annotate(count=Count('pk'))
+        for row in months:
+            stats[month_key(name, row['month'])] = row['count']
+
+    predictions = apps.get_model('ss_app.Prediction').objects.order_by()
+    for row in predictions.values('disease_id').annotate(count=Count('pk')):
+        stats[f"predictions:disease:{row['disease_id']}"] = row['count']
+    reviews = apps.get_model('ss_app.Review').objects.order_by()
+    for row in reviews.values('rating').annotate(count=Count('pk')):
+        stats[f"reviews:rating:{row['rating']}"] = row['count']
+
+    chat_logs = apps.get_model('ss_app.AIChatLog').objects.order_by().exclude(conversation_id__isnull=True)
+    conversations = chat_logs.exclude(conversation_id='').values('conversation_id').annotate(count=Count('pk'))
+    for row in conversations:
+        stats[f"conversation:{row['conversation_id']}"] = row['count']
+        stats['conversations'] += 1
+    return stats
+
+
+def reconcile_dashboard_stats(apps=global_apps):
+    """Recount every counter and return the drifted ones as {key: (stored, actual)}"""
+    expected = compute_stats(apps)
+    stat_model = apps.get_model('ss_app.DashboardStat')
+    with transaction.atomic():
+        stored = dict(stat_model.objects.values_list('key', 'value'))
+        drift = {key: (stored.get(key, 0), value) for key, value in expected.items() if stored.get(key, 0) != value}
+        drift.update({key: (value, 0) for key, value in stored.items() if key not in expected and value})
+        stat_model.objects.all().delete()
+        stat_model.objects.bulk_create(
+            [stat_model(key=key, value=value) for key, value in expected.items()],
+            batch_size=1000,
+        )
+    return drift
@@ -314,7 +314,7 @@ class DiseaseFormFieldForm(forms.ModelForm):
 class RiskCategoryForm(forms.ModelForm):
     class Meta:
         model = RiskCategory
-        fields = ['risk_level', 'tips']
+        fields = ['risk_level', 'tips', 'positive_above', 'negative_above']
         widgets = {
             'tips': forms.Textarea(attrs={'rows': 4}),
         }
@@ -345,3 +345,19 @@ class AdminSearchForm(forms.Form):
 class DateRangeForm(forms.Form):
     start_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
     end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+class WordCloudFilterForm(DateRangeForm):
+    disease = forms.ModelChoiceField(queryset=Disease.objects.order_by('name'), required=False,
+                                     empty_label='All diseases', widget=forms.Select(attrs={'class': 'form-select'}))
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in ('start_date', 'end_date'):
+            self.fields[name].widget.attrs['class'] = 'form-control'
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date, end_date = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise forms.ValidationError('The start date must be on or before the end date.')
+        return cleaned_data
@@ -0,0 +1,75 @@
+"""
+Structured, sampled logging of predictions.
+
+Each sampled prediction is one record on the ``ss_app.inference`` logger with
+the disease, model version, feature vector, class probabilities, resulting
+risk level and latency. ``INFERENCE_LOG_SAMPLE_RATE`` (0 to 1) sets the
+fraction of predictions logged and ``INFERENCE_LOG_LEVEL`` the record level.
+
+Nothing is formatted unless a prediction is sampled and the logger is
+enabled for the level, so unsampled predictions only pay for one random
+number. ``JSONFormatter`` renders records as one JSON object per line.
+"""
+import json
+import logging
+import random
+
+from django.conf import settings
+
+logger = logging.getLogger('ss_app.inference')
+
+
+class InferenceLogger:
+    """Decides which predictions are logged and emits them as one record each"""
+
+    def __init__(self, sample_rate=0.0, level=logging.INFO, logger=logger):
+        self.sample_rate = sample_rate
+        self.level = logging.getLevelName(level) if isinstance(level, str) else level
+        self.logger = logger
+
+    def sampled(self):
+        """Whether to log the current prediction; call before building the record"""
+        if self.sample_rate <= 0 or not self.logger.isEnabledFor(self.level):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def log(self, slug, model_version, features, probabilities, risk_level, confidence, timings):
+        """Emit one prediction (or, with 2-D inputs, one batch) as a structured record"""
+        record = {
+            'event': 'prediction',
+            'disease': slug,
+            'model_version': model_version,
+            'features': _tolist(features),
+            'proba': _tolist(probabilities),
+            'risk_level': risk_level,
+            'confidence': round(float(confidence), 4) if confidence is not None else None,
+            'latency_ms': round(timings.get('total_ms', 0.0), 3),
+            'timings': {name: round(value, 3) if isinstance(value, float) else value
+                        for name, value in timings.items()},
+        }
+        self.logger.log(self.level, 'prediction', extra={'inference': record})
+
+
+def _tolist(values):
+    if values is None:
+        return None
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; inference records are merged in at the top level"""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        payload.update(getattr(record, 'inference', None) or {'message': record.getMessage()})
+        return json.dumps(payload, default=str)
+
+
+inference_log = InferenceLogger(
+    sample_rate=getattr(settings, 'INFERENCE_LOG_SAMPLE_RATE', 0.0),
+    level=getattr(settings, 'INFERENCE_LOG_LEVEL', 'INFO'),
+)
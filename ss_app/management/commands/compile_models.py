@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ss_app.compiled_forest import CompiledForest, compiled_path, export_forest
+from ss_app.ml_models import PREDICTOR_SPECS
+
+
+class Command(BaseCommand):
+    help = 'Export the pickled disease models to the array-backed .forest format used for inference'
+
+    def add_arguments(self, parser):
+        parser.add_argument('diseases', nargs='*', help='Disease slugs to compile (default: all)')
+
+    def handle(self, *args, **options):
+        import joblib
+
+        slugs = options['diseases'] or list(PREDICTOR_SPECS)
+        unknown = [slug for slug in slugs if slug not in PREDICTOR_SPECS]
+        if unknown:
+            raise CommandError(f"Unknown disease(s): {', '.join(unknown)}")
+
+        for slug in slugs:
+            model_path = PREDICTOR_SPECS[slug]['model_path']
+            if not os.path.exists(model_path):
+                self.stdout.write(self.style.WARNING(f'{slug}: no model at {model_path}, skipping'))
+                continue
+
+            forest_path = export_forest(joblib.load(model_path), compiled_path(model_path), source_path=model_path)
+            meta = CompiledForest.load(forest_path).meta
+            self.stdout.write(self.style.SUCCESS(
+                f"{slug}: {meta['n_trees']} trees, {meta['n_nodes']} nodes -> {forest_path}"
+            ))
@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ss_app.ml_models import PREDICTOR_SPECS, PredictorRegistry
+
+# (label, serve compiled .forest exports, load models in the master before forking)
+SCENARIOS = [
+    ('pickle, per-worker load', False, False),
+    ('pickle, preloaded', False, True),
+    ('mmap, per-worker load', True, False),
+    ('mmap, preloaded', True, True),
+]
+
+
+def memory_usage():
+    """Return this process's RSS, PSS and USS in bytes from /proc/self/smaps_rollup"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'uss': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def build_registry(slugs):
+    registry = PredictorRegistry()
+    for slug in slugs:
+        registry.register_spec(slug, PREDICTOR_SPECS[slug])
+    return registry
+
+
+def exercise(registry):
+    """Load every predictor and run one prediction so its pages are touched"""
+    for slug in registry.slugs():
+        predictor = registry.get(slug)
+        predictor.predict_batch([[0.0] * len(predictor.columns)])
+
+
+def worker(registry, barrier, results):
+    exercise(registry)
+    # Measure only once every worker has loaded, so pages shared between
+    # workers are not counted as private to whichever loaded first
+    barrier.wait()
+    results.put(memory_usage())
+    barrier.wait()
+
+
+def master(use_compiled, preload, slugs, workers, results):
+    settings.PREDICTOR_COMPILED_MODELS = use_compiled
+    registry = build_registry(slugs)
+    if preload:
+        exercise(registry)
+
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers)
+    processes = [context.Process(target=worker, args=(registry, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+class Command(BaseCommand):
+    help = ('Report per-worker memory for the disease models, loading them from pickles vs. '
+            'memory-mapped .forest exports, with and without preloading before fork')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of forked workers per scenario')
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('This report needs Linux /proc/<pid>/smaps_rollup')
+
+        workers = options['workers']
+        # Diseases without a saved model would be trained, which is not what we measure
+        slugs = [slug for slug, spec in PREDICTOR_SPECS.items() if os.path.exists(spec['model_path'])]
+        self.stdout.write(f"Models: {', '.join(slugs)}; {workers} workers per scenario\n")
+
+        mb = 1024 * 1024
+        self.stdout.write(f"{'scenario':<26}{'USS/worker':>12}{'PSS/worker':>12}{'RSS/worker':>12}{'PSS total':>12}")
+        context = multiprocessing.get_context('fork')
+        for label, use_compiled, preload in SCENARIOS:
+            results = context.Queue()
+            # Each scenario gets a fresh master so nothing loaded earlier is shared
+            process = context.Process(target=master, args=(use_compiled, preload, slugs, workers, results))
+            process.start()
+            usage = [results.get() for _ in range(workers)]
+            process.join()
+
+            uss = sum(u['uss'] for u in usage) / workers
+            pss = sum(u['pss'] for u in usage) / workers
+            rss = sum(u['rss'] for u in usage) / workers
+            self.stdout.write(
+                f"{label:<26}{uss / mb:>10.1f}MB{pss / mb:>10.1f}MB{rss / mb:>10.1f}MB{pss * workers / mb:>10.1f}MB"
+            )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from ss_app.review_terms import rebuild_review_terms
+
+
+class Command(BaseCommand):
+    help = ('Recount the word cloud term table from every review comment. Saves and deletes keep it '
+            'current; run this after imports or bulk updates that bypass model signals.')
+
+    def handle(self, *args, **options):
+        terms = rebuild_review_terms()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt review terms: {terms} distinct words'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ss_app.dashboard_stats import reconcile_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = ('Recount the custom admin dashboard counters from the tables, e.g. nightly from cron. '
+            'Signals keep them current; this corrects drift from bulk operations that bypass them.')
+
+    def handle(self, *args, **options):
+        drift = reconcile_dashboard_stats()
+        for key, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f'{key}: {stored} -> {actual}')
+        self.stdout.write(self.style.SUCCESS(f'Dashboard stats reconciled; {len(drift)} counter(s) had drifted'))
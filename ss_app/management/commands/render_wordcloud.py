@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ss_app.review_terms import top_terms
+from ss_app.wordcloud_images import WORDCLOUD_MAX_WORDS, current_image, needs_render, render
+
+
+class Command(BaseCommand):
+    help = ('Render the review word cloud image served by /wordcloud/, e.g. from cron. '
+            'Skips the render when the current image is still up to date.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Render even if the word counts have not drifted past the threshold')
+
+    def handle(self, *args, **options):
+        word_freq = top_terms(WORDCLOUD_MAX_WORDS)
+        if not word_freq:
+            self.stdout.write('No reviews yet; nothing to render')
+            return
+        if not options['force'] and not needs_render(current_image(), word_freq):
+            self.stdout.write('The word cloud is up to date')
+            return
+        image = render(word_freq)
+        self.stdout.write(self.style.SUCCESS(f"Rendered word cloud {image['key']}"))
@@ -0,0 +1,103 @@
+import json
+import os
+import platform
+import random
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from ss_app.benchmarks import compare, run_benchmarks, seed
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the public and custom-admin pages against synthetic data in a throwaway '
+            'test database and report throughput and p50/p95/p99 latency as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Synthetic users (default: 50)')
+        parser.add_argument('--predictions', type=int, default=500, help='Synthetic predictions (default: 500)')
+        parser.add_argument('--reviews', type=int, default=200, help='Synthetic reviews (default: 200)')
+        parser.add_argument('--chat-logs', type=int, default=500, help='Synthetic chat messages (default: 500)')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per endpoint (default: 50)')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per endpoint first (default: 3)')
+        parser.add_argument('--only', nargs='+', metavar='ENDPOINT', help='Benchmark only these endpoints (URL names)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data (default: 0)')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--compare', metavar='REPORT', help='Show changes against an earlier JSON report')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read {options['compare']}: {e}")
+
+        dataset = {name: options[name] for name in ('users', 'predictions', 'reviews', 'chat_logs')}
+        rng = random.Random(options['seed'])
+
+        # Never touch the real database: everything runs in a fresh test database
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"Seeding {', '.join(f'{count} {name}' for name, count in dataset.items())}")
+            ids = seed(rng=rng, **dataset)
+            self.stdout.write(f"{'endpoint':<28}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'queries':>9}{'errors':>8}")
+            results = run_benchmarks(ids, requests=options['requests'], warmup=options['warmup'],
+                                     only=options['only'], progress=self.write_result, rng=rng)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cpus': os.cpu_count(),
+            'dataset': dataset,
+            'requests_per_endpoint': options['requests'],
+            'endpoints': results,
+        }
+        if baseline:
+            report['compared_to'] = baseline.get('commit')
+            report['changes'] = compare(results, baseline)
+            self.write_changes(report['changes'], baseline.get('commit'))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        failing = [result['name'] for result in results if result['errors']]
+        if failing:
+            self.stdout.write(self.style.WARNING(f"Endpoints with 4xx/5xx responses: {', '.join(failing)}"))
+
+    def write_result(self, result):
+        self.stdout.write(
+            f"{result['name']:<28}{result['throughput_rps']:>9.1f}{result['p50_ms']:>8.1f}ms"
+            f"{result['p95_ms']:>8.1f}ms{result['p99_ms']:>8.1f}ms{result['queries']:>9}{result['errors']:>8}"
+        )
+
+    def write_changes(self, changes, commit):
+        self.stdout.write(f"\nChanges against {commit or 'the baseline'}:")
+        for name, change in changes.items():
+            p95 = f"{change['p95_change']:+.0%}" if change['p95_change'] is not None else 'n/a'
+            throughput = f"{change['throughput_change']:+.0%}" if change['throughput_change'] is not None else 'n/a'
+            self.stdout.write(f"{name:<28}p95 {p95:>6}   req/s {throughput:>6}")
@@ -0,0 +1,100 @@
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from ss_app.models import TrainingJob
+from ss_app.training import prune_versions, train_disease
+from ss_app.uploaded_models import disease_slug, training_spec
+
+
+def run_job(job, n_jobs=None, keep=5):
+    """Train ``job.disease`` from its uploaded CSV, recording progress on the job"""
+    try:
+        slug = disease_slug(job.disease)
+        meta = train_disease(slug, training_spec(job.disease), n_jobs=n_jobs, progress=job.report)
+        prune_versions(slug, keep)
+    except Exception as e:
+        TrainingJob.objects.filter(pk=job.pk).update(
+            status='failed', message=str(e)[:255], finished_at=timezone.now()
+        )
+        return False
+
+    TrainingJob.objects.filter(pk=job.pk).update(
+        status='succeeded', progress=100, version=meta['version'], metrics=meta['metrics'],
+        message=f"Published version {meta['version']}", finished_at=timezone.now()
+    )
+    return True
+
+
+@contextmanager
+def heartbeat(job):
+    """Beat ``job`` every ``TRAINING_HEARTBEAT_INTERVAL`` seconds while the block runs.
+
+    Training reports progress only between stages and a single fit can take
+    longer than ``TRAINING_JOB_TIMEOUT``, so a thread keeps the job from
+    looking abandoned meanwhile.
+    """
+    interval = getattr(settings, 'TRAINING_HEARTBEAT_INTERVAL', 30)
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                job.heartbeat()
+        except Exception as e:
+            print(f"⚠️ Heartbeat for training job {job.pk} failed: {str(e)}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'training-heartbeat-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+class Command(BaseCommand):
+    help = 'Train queued admin-uploaded disease CSVs (TrainingJob rows) and publish the resulting models'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the jobs queued now, then exit')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between queue checks (default: 2)')
+        parser.add_argument('--n-jobs', type=int, default=None,
+                            help='Cores used to fit each model (default: all)')
+        parser.add_argument('--keep', type=int, default=5,
+                            help='Number of versions to keep per disease (default: 5)')
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        n_jobs = options['n_jobs'] or os.cpu_count()
+        self.stdout.write(f'Training worker {worker} waiting for jobs')
+
+        while True:
+            job = TrainingJob.claim_next(worker)
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll'])
+                continue
+
+            self.stdout.write(f'{job.disease.name}: training job {job.pk} started')
+            try:
+                with heartbeat(job):
+                    succeeded = run_job(job, n_jobs=n_jobs, keep=options['keep'])
+            except KeyboardInterrupt:
+                # Hand the job back so another worker picks it up
+                TrainingJob.objects.filter(pk=job.pk).update(status='queued', worker='', progress=0, message='')
+                raise
+
+            job.refresh_from_db()
+            style = self.style.SUCCESS if succeeded else self.style.ERROR
+            self.stdout.write(style(f'{job.disease.name}: job {job.pk} {job.status}: {job.message}'))
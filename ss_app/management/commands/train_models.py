@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ss_app.ml_models import PREDICTOR_SPECS
+from ss_app.training import COMPACTION_GRID, prune_versions, train_disease
+
+
+def training_spec_for(slug):
+    """Spec of a built-in disease, or of an admin-added one (``disease-<id>``)"""
+    if slug in PREDICTOR_SPECS:
+        return PREDICTOR_SPECS[slug]
+    from ss_app.models import Disease
+    from ss_app.uploaded_models import training_spec
+    return training_spec(Disease.objects.get(pk=int(slug[len('disease-'):])))
+
+
+def train_one(slug, publish, n_jobs, compact):
+    """Process pool entry point; runs in its own interpreter"""
+    import django
+    django.setup()
+    return train_disease(slug, training_spec_for(slug), publish=publish, n_jobs=n_jobs, compact=compact)
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+        size /= 1024
+    return f'{size:.1f}GB'
+
+
+class Command(BaseCommand):
+    help = 'Train disease models from ss_app/data and publish them as versioned artifacts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('diseases', nargs='*',
+                            help='Disease slugs to train, or disease-<id> for an admin-added disease '
+                                 'with an uploaded CSV (default: every built-in disease with a dataset)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Diseases trained at once, one process each (default: one per disease, up to the CPU count)')
+        parser.add_argument('--n-jobs', type=int, default=None,
+                            help='Cores used to fit each model (default: the CPU count split between the workers)')
+        parser.add_argument('--compact', action='store_true',
+                            help='Search for the smallest forest whose accuracy/AUC stay within --tolerance')
+        parser.add_argument('--tolerance', type=float, default=0.01,
+                            help='Largest accuracy/AUC drop accepted by --compact (default: 0.01)')
+        parser.add_argument('--no-publish', action='store_true',
+                            help='Write the new versions without making them the served model')
+        parser.add_argument('--keep', type=int, default=5,
+                            help='Number of versions to keep per disease (default: 5)')
+
+    def handle(self, *args, **options):
+        slugs = options['diseases']
+        unknown = [slug for slug in slugs
+                   if slug not in PREDICTOR_SPECS and not re.fullmatch(r'disease-\d+', slug)]
+        if unknown:
+            raise CommandError(f"Unknown disease(s): {', '.join(unknown)}")
+        if not slugs:
+            # Only diseases named explicitly fail for a missing dataset
+            for slug, spec in PREDICTOR_SPECS.items():
+                if os.path.exists(spec['csv_path']):
+                    slugs.append(slug)
+                else:
+                    self.stdout.write(self.style.WARNING(f"{slug}: no dataset at {spec['csv_path']}, skipping"))
+            if not slugs:
+                raise CommandError('No disease has a dataset to train on')
+
+        cpus = os.cpu_count() or 1
+        workers = options['workers'] or min(len(slugs), cpus)
+        # Give every concurrently trained disease an equal share of the cores
+        n_jobs = options['n_jobs'] or max(1, cpus // workers)
+        publish = not options['no_publish']
+        compact = options['tolerance'] if options['compact'] else None
+        failed = []
+        results = {}
+
+        self.stdout.write(f'Training {len(slugs)} disease(s): {workers} at a time, n_jobs={n_jobs} each')
+        # Each disease trains in a fresh spawned process, never in a web worker.
+        # One task per process keeps the peak memory figure per disease.
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=1) as pool:
+            futures = {pool.submit(train_one, slug, publish, n_jobs, compact): slug for slug in slugs}
+            for future in as_completed(futures):
+                slug = futures[future]
+                try:
+                    meta = future.result()
+                except Exception as e:
+                    failed.append(slug)
+                    self.stdout.write(self.style.ERROR(f'{slug}: training failed: {e}'))
+                    continue
+
+                results[slug] = meta
+                if meta['compaction']:
+                    compaction = meta['compaction']
+                    chosen = {name: compaction['chosen_params'][name] for name in COMPACTION_GRID}
+                    self.stdout.write(
+                        f"{slug}: compacted to {chosen}, "
+                        f"{compaction['baseline_nodes']} -> {compaction['chosen_nodes']} nodes"
+                    )
+                metrics = ', '.join(f'{name} {value:.3f}' for name, value in meta['metrics'].items())
+                self.stdout.write(self.style.SUCCESS(
+                    f"{slug}: version {meta['version']} ({metrics}, fit {meta['fit_seconds']:.2f}s)"
+                    + ('' if publish else ' [not published]')
+                ))
+                for version in prune_versions(slug, options['keep']):
+                    self.stdout.write(f'{slug}: removed old version {version}')
+
+        if results:
+            self.write_benchmark([results[slug] for slug in slugs if slug in results])
+
+        if failed:
+            raise CommandError(f"Training failed for: {', '.join(failed)}")
+
+    def write_benchmark(self, results):
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'disease':<16}{'rows':>8}{'features':>10}{'fit':>9}{'peak mem':>10}"
+            f"{'model':>10}{'compiled':>10}{'p50':>9}{'p99':>9}"
+        )
+        for meta in results:
+            bench = meta['benchmark']
+            rows = meta['rows']['train'] + meta['rows']['test']
+            self.stdout.write(
+                f"{meta['slug']:<16}{rows:>8}{bench['features']:>10}{bench['fit_seconds']:>8.2f}s"
+                f"{format_bytes(bench['peak_memory_bytes']):>10}{format_bytes(bench['model_bytes']):>10}"
+                f"{format_bytes(bench['compiled_bytes']):>10}"
+                f"{bench['inference']['p50_ms']:>7.2f}ms{bench['inference']['p99_ms']:>7.2f}ms"
+            )
@@ -0,0 +1,176 @@
+"""
+In-process metrics for the prediction path, in Prometheus text format.
+
+Counters and histograms are kept in memory per worker process and exposed by
+the admin-only ``/custom-admin/metrics/`` view, which is served by whichever
+worker takes the request. With one worker (e.g. ``runserver``) the numbers are
+the whole server's. Under several gunicorn workers each response shows one
+worker's numbers only, so successive requests jump between workers' totals:
+they are not aggregated and are not suitable for scraping as they are. The
+``X-Metrics-Worker`` response header names the process that answered.
+
+The prediction views record how long each stage of a request takes
+(``validation``, ``inference``, ``db_write``, ``render``) per disease::
+
+    with PREDICTION_STAGE_SECONDS.time(disease='diabetes', stage='inference'):
+        ...
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond model calls to slow renders
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += [line for key, value in items for line in self.render_sample(key, value)]
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count per label set"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render_sample(self, key, value):
+        yield f'{self.name}{_labels(self.labelnames, key)} {_number(value)}'
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count of observations per label set"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the ``with`` block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state['count'] if state else 0
+
+    def render_sample(self, key, state):
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['buckets']):
+            cumulative += count
+            yield f'{self.name}_bucket{_labels(self.labelnames, key, [("le", _number(bound))])} {cumulative}'
+        yield f'{self.name}_sum{_labels(self.labelnames, key)} {_number(state["sum"])}'
+        yield f'{self.name}_count{_labels(self.labelnames, key)} {state["count"]}'
+
+
+class MetricsRegistry:
+    """The set of metrics rendered by the metrics endpoint"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = [line for metric in self._metrics.values() for line in metric.render()]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+PREDICTION_STAGE_SECONDS = registry.histogram(
+    'symptoscan_prediction_stage_seconds',
+    'Seconds spent in each stage of a prediction request.',
+    ['disease', 'stage'],
+)
+PREDICTIONS_TOTAL = registry.counter(
+    'symptoscan_predictions_total',
+    'Predictions made, by disease and resulting risk level.',
+    ['disease', 'risk_level'],
+)
+PREDICTION_CACHE_TOTAL = registry.counter(
+    'symptoscan_prediction_cache_total',
+    'Single predictions answered from the prediction cache (hit) or the model (miss).',
+    ['disease', 'result'],
+)
+PREDICTION_ERRORS_TOTAL = registry.counter(
+    'symptoscan_prediction_errors_total',
+    'Prediction requests that did not produce a prediction, by reason.',
+    ['disease', 'reason'],
+)
@@ -1,3 +1,6 @@
+import random
+
+from django.conf import settings
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
@@ -28,3 +31,44 @@ class AdminRedirectMiddleware:
         
         response = self.get_response(request)
         return response
+
+
+class ProfilingMiddleware:
+    """Profile a sample of requests and write reports viewable in the custom admin.
+
+    Off unless ``PROFILING_SAMPLE_RATE`` is above 0 (the fraction of requests
+    profiled) or the admin sends an ``X-Profile: 1`` header, which profiles
+    that request and returns the report id in ``X-Profile-Report``. See
+    ``ss_app.profiling`` for what a report contains.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        self.stack_interval = getattr(settings, 'PROFILING_STACK_INTERVAL', 0.005)
+
+    def reason(self, request):
+        """Why this request should be profiled, or None"""
+        if request.path.startswith('/custom-admin/profiles/'):
+            return None
+        # Same admin check as AdminRedirectMiddleware and views.is_admin
+        if (request.META.get('HTTP_X_PROFILE') == '1' and request.user.is_authenticated
+                and request.user.username == 'testadmin'):
+            return 'header'
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    def __call__(self, request):
+        reason = self.reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        from .profiling import RequestProfile
+
+        with RequestProfile(self.stack_interval) as profile:
+            response = self.get_response(request)
+        report_id = profile.write(request, response, reason)
+        if reason == 'header':
+            response['X-Profile-Report'] = report_id
+        return response
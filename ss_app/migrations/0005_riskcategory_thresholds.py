@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ss_app', '0004_trainingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskcategory',
+            name='negative_above',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='riskcategory',
+            name='positive_above',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_existing_reviews(apps, schema_editor):
+    from ss_app.review_terms import tokenize
+
+    Review = apps.get_model('ss_app', 'Review')
+    ReviewTerm = apps.get_model('ss_app', 'ReviewTerm')
+    counts = Counter()
+    for comment in Review.objects.values_list('comment', flat=True).iterator():
+        counts.update(tokenize(comment))
+    ReviewTerm.objects.bulk_create([ReviewTerm(term=term, count=count) for term, count in counts.items()],
+                                   batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ss_app', '0005_riskcategory_thresholds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-count', 'term'],
+                'indexes': [models.Index(fields=['-count', 'term'], name='ss_app_reviewterm_top')],
+            },
+        ),
+        migrations.RunPython(count_existing_reviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:39
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def count_existing_reviews(apps, schema_editor):
+    from ss_app.review_terms import review_day, tokenize
+
+    Review = apps.get_model('ss_app', 'Review')
+    DailyReviewTerm = apps.get_model('ss_app', 'DailyReviewTerm')
+    counts = Counter()
+    for disease_id, created_at, comment in Review.objects.values_list('disease_id', 'created_at', 'comment').iterator():
+        day = review_day(created_at)
+        for term in tokenize(comment):
+            counts[disease_id, day, term] += 1
+    DailyReviewTerm.objects.bulk_create(
+        [DailyReviewTerm(disease_id=disease_id, day=day, term=term, count=count)
+         for (disease_id, day, term), count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ss_app', '0006_reviewterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReviewTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('term', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('disease', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_review_terms', to='ss_app.disease')),
+            ],
+            options={
+                'ordering': ['-day', '-count'],
+                'indexes': [models.Index(fields=['day', 'term'], name='ss_app_dailyreviewterm_day')],
+                'constraints': [models.UniqueConstraint(fields=('disease', 'day', 'term'), name='ss_app_dailyreviewterm_unique')],
+            },
+        ),
+        migrations.RunPython(count_existing_reviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_existing_rows(apps, schema_editor):
+    from ss_app.dashboard_stats import reconcile_dashboard_stats
+
+    reconcile_dashboard_stats(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ss_app', '0007_dailyreviewterm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=150, unique=True)),
+                ('value', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['key'],
+            },
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+    ]
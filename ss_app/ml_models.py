@@ -1,525 +1,548 @@
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-import pandas as pd
-import random
+import json
 import os
-import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-import joblib
-from sklearn.metrics import accuracy_score
-
-# Path to your saved model (put your trained .pkl here)
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(BASE_DIR, "trained_model.pkl")
-DATA_PATH = os.path.join(BASE_DIR, "data", "diabetes.csv")
-
-
-class DiabetesPredictor:
-    def __init__(self):
-        # Try to load existing model
-        if os.path.exists(MODEL_PATH):
-            # os.remove(MODEL_PATH)
-            self.model = joblib.load(MODEL_PATH)
-            print("✅ Loaded existing model!")
-        else:
-            print("⚠️ No saved model found, training a new one...")
-            self.train_model()
-
-    def train_model(self):
-        df = pd.read_csv(DATA_PATH)
-
-        # Train only on 6 features
-        X = df[["Glucose", "BloodPressure", "BMI", "Age", "Pregnancies", "Insulin"]]
-        y = df["Outcome"]
-
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-        self.model = RandomForestClassifier()
-        self.model.fit(X_train, y_train)
-
-        # X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        # self.model.fit(X_train, y_train)
-
-        y_pred = self.model.predict(X_test)
-        acc = accuracy_score(y_test, y_pred)
-        print(f"✅ Model trained. Accuracy: {acc:.2f}")
-
-        # Save the trained model
-        joblib.dump(self.model, MODEL_PATH)
-        print(f"✅ Model saved at: {MODEL_PATH}")
-
-    def predict(self, glucose, blood_pressure, bmi, age, pregnancies, insulin):
-        features = np.array([[glucose, blood_pressure, bmi, age, pregnancies, insulin]])
-        prediction = self.model.predict(features)[0]
-        probability = self.model.predict_proba(features)[0]
-
-        confidence = max(probability) * 100
-
-        print(f"🔍 Diabetes Prediction Input: {features[0]}")
-        print(f"🔍 Prediction: {prediction}, Probability: {probability}, Confidence: {confidence:.2f}%")
-
-        # Use ML model prediction to determine risk level
-        if prediction == 1:  # High risk prediction from model
-            if confidence > 80:
-                risk_level = 'high'
-            elif confidence > 60:
-                risk_level = 'medium'
-            else:
-                risk_level = 'low'
-        else:  # Low risk prediction from model
-            if confidence > 90:
-                risk_level = 'low'
-            elif confidence > 70:
-                risk_level = 'medium'
-            else:
-                risk_level = 'high'  # Low confidence in low risk = potential high risk
-
-        print(f"🔍 Risk Level: {risk_level}")
-        return risk_level, confidence
-
-
-class HeartDiseasePredictor:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self._train_model()
-
-    def _train_model(self):
-        """Train the heart disease prediction model with real CSV"""
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        DATA_PATH = os.path.join(BASE_DIR, "data", "heart.csv")
-        MODEL_PATH = os.path.join(BASE_DIR, "heart_model.pkl")
-
-        # Try to load existing model first (like other disease models)
-        if os.path.exists(MODEL_PATH):
-            try:
-                self.model = joblib.load(MODEL_PATH)
-                print(f"✅ Loaded existing heart disease model: {MODEL_PATH}")
-                return
-            except Exception as e:
-                print(f"⚠️ Error loading existing heart disease model: {str(e)}")
-                # Continue to train new model
-
-        # Train new model if no existing model found
-        try:
-            df = pd.read_csv(DATA_PATH)
-
-            X = df[['age', 'sex', 'cp', 'trestbps', 'chol', 'thalach']]  # Only your 6
-            y = df['target']
-
-            # Print dataset info for debugging
-            print(f"🔍 Heart Disease Dataset shape: {X.shape}")
-            print(f"🔍 Heart Disease Target distribution: {y.value_counts()}")
-            print(f"🔍 Heart Disease Features: {list(X.columns)}")
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            self.model.fit(X_train, y_train)
-
-            # Test the model on training data
-            train_pred = self.model.predict(X_train)
-            train_acc = accuracy_score(y_train, train_pred)
-            print(f"🔍 Heart Disease Training accuracy: {train_acc:.3f}")
-
-            # Save trained model
-            joblib.dump(self.model, MODEL_PATH)
-            print(f"✅ Heart disease model trained and saved: {MODEL_PATH}")
-        except Exception as e:
-            print(f"❌ Error training heart disease model: {str(e)}")
-            # Create a dummy model for now
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-
-    def predict(self, age, sex, chest_pain, blood_pressure, cholesterol, max_heart_rate):
-        """Make heart disease prediction"""
-        features = np.array([[age, sex, chest_pain, blood_pressure, cholesterol, max_heart_rate]])
-        prediction = self.model.predict(features)[0]
-        probability = self.model.predict_proba(features)[0]
-
-        confidence = max(probability) * 100
-
-        print(f"🔍 Heart Disease Prediction Input: {features[0]}")
-        print(f"🔍 Prediction: {prediction}, Probability: {probability}, Confidence: {confidence:.2f}%")
-
-        # Use ML model prediction to determine risk level
-        if prediction == 1:  # High risk prediction from model
-            if confidence > 80:
-                risk_level = 'high'
-            elif confidence > 60:
-                risk_level = 'medium'
-            else:
-                risk_level = 'low'
-        else:  # Low risk prediction from model
-            if confidence > 90:
-                risk_level = 'low'
-            elif confidence > 70:
-                risk_level = 'medium'
-            else:
-                risk_level = 'high'  # Low confidence in low risk = potential high risk
-
-        print(f"🔍 Risk Level: {risk_level}")
-        return risk_level, confidence
+import threading
+import time
 
+import numpy as np
 
-class HypertensionPredictor:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self._train_model()
+from .compiled_forest import META_FILE, CompiledForest, compiled_path, file_digest
+from .inference_log import inference_log
+from .prediction_cache import prediction_cache
+from .risk_bands import risk_bands_for
 
-    def _train_model(self):
-        """Train the hypertension prediction model with real CSV"""
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        DATA_PATH = os.path.join(BASE_DIR, "data", "hypertension.csv")
-        MODEL_PATH = os.path.join(BASE_DIR, "hypertension_model.pkl")
+# scikit-learn, pandas and joblib are imported inside the methods that need
+# them so that importing this module (and therefore views.py, urls.py and
+# every management command) stays cheap. Models are built on first use
+# through ``predictor_registry`` at the bottom of this file.
 
-        # Try to load existing model first (like other disease models)
-        if os.path.exists(MODEL_PATH):
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+
+# Declarative description of every tabular disease model.
+#
+# model_path:   model bundled with the app, used until `manage.py train_models`
+#               publishes an artifact for the disease.
+# model_params: optional RandomForestClassifier arguments for train_models.
+# features:     (form field name, CSV column) pairs, in the order the model
+#               was trained on. Predictions are made from form field names.
+# categorical:  per CSV column, mapping of raw CSV values to model codes.
+# dropna:       drop incomplete CSV rows before training.
+PREDICTOR_SPECS = {
+    'diabetes': {
+        'name': 'Diabetes',
+        'csv_path': os.path.join(DATA_DIR, 'diabetes.csv'),
+        'model_path': os.path.join(BASE_DIR, 'trained_model.pkl'),
+        'target': 'Outcome',
+        'features': [
+            ('glucose', 'Glucose'),
+            ('blood_pressure', 'BloodPressure'),
+            ('bmi', 'BMI'),
+            ('age', 'Age'),
+            ('pregnancies', 'Pregnancies'),
+            ('insulin', 'Insulin'),
+        ],
+    },
+    'heart_disease': {
+        'name': 'Heart Disease',
+        'csv_path': os.path.join(DATA_DIR, 'heart.csv'),
+        'model_path': os.path.join(BASE_DIR, 'heart_model.pkl'),
+        'target': 'target',
+        'features': [
+            ('age', 'age'),
+            ('sex', 'sex'),
+            ('chest_pain', 'cp'),
+            ('blood_pressure', 'trestbps'),
+            ('cholesterol', 'chol'),
+            ('max_heart_rate', 'thalach'),
+        ],
+    },
+    'hypertension': {
+        'name': 'Hypertension',
+        'csv_path': os.path.join(DATA_DIR, 'Hypertension.csv'),
+        'model_path': os.path.join(BASE_DIR, 'hypertension_model.pkl'),
+        'target': 'Risk',
+        'features': [
+            ('age', 'age'),
+            ('bmi', 'BMI'),
+            ('currentSmoker', 'currentSmoker'),
+            ('sysBP', 'sysBP'),
+            ('diaBP', 'diaBP'),
+            ('heartRate', 'heartRate'),
+        ],
+    },
+    'asthma': {
+        'name': 'Asthma',
+        'csv_path': os.path.join(DATA_DIR, 'asthma.csv'),
+        'model_path': os.path.join(BASE_DIR, 'asthma_model.pkl'),
+        'target': 'Diagnosis',
+        'features': [
+            ('age', 'Age'),
+            ('gender', 'Gender'),
+            ('shortness_of_breath', 'ShortnessOfBreath'),
+            ('coughing', 'Coughing'),
+            ('chest_tightness', 'ChestTightness'),
+            ('wheezing', 'Wheezing'),
+            ('allergy_history', 'FamilyHistoryAsthma'),
+        ],
+    },
+    'stroke': {
+        'name': 'Stroke',
+        'csv_path': os.path.join(DATA_DIR, 'stroke-data.csv'),
+        'model_path': os.path.join(BASE_DIR, 'stroke_model.pkl'),
+        'target': 'stroke',
+        'features': [
+            ('age', 'age'),
+            ('gender', 'gender'),
+            ('hypertension', 'hypertension'),
+            ('heart_disease', 'heart_disease'),
+            ('avg_glucose_level', 'avg_glucose_level'),
+            ('bmi', 'bmi'),
+            ('smoking_status', 'smoking_status'),
+        ],
+        'categorical': {
+            'gender': {'Female': 0, 'Male': 1, 'Other': 2},
+            'smoking_status': {
+                'never smoked': 0, 'formerly smoked': 1, 'smokes': 2, 'Unknown': 3
+            },
+        },
+        'dropna': True,
+    },
+    'kidney_disease': {
+        'name': 'Kidney Disease',
+        'csv_path': os.path.join(DATA_DIR, 'kidney_disease_dataset.csv'),
+        'model_path': os.path.join(BASE_DIR, 'kidney_disease_model.pkl'),
+        'target': 'Target',
+        'features': [
+            ('age', 'Age of the patient'),
+            ('blood_pressure', 'Blood pressure (mm/Hg)'),
+            ('serum_creatinine', 'Serum creatinine (mg/dl)'),
+            ('blood_urea', 'Blood urea (mg/dl)'),
+            ('hemoglobin', 'Hemoglobin level (gms)'),
+            ('hypertension', 'Hypertension (yes/no)'),
+            ('diabetes', 'Diabetes mellitus (yes/no)'),
+        ],
+        'categorical': {
+            'Hypertension (yes/no)': {'yes': 1, 'no': 0},
+            'Diabetes mellitus (yes/no)': {'yes': 1, 'no': 0},
+        },
+        'dropna': True,
+    },
+}
+
+
+class ModelNotAvailable(Exception):
+    """Raised when a disease has no trained model artifact to serve"""
+
+
+def artifact_root():
+    """Directory holding the versioned artifacts written by ``train_models``"""
+    from django.conf import settings
+    return getattr(settings, 'MODEL_ARTIFACT_ROOT', os.path.join(BASE_DIR, 'artifacts'))
+
+
+def current_artifact(slug):
+    """Return the directory of the published artifact for ``slug``, or None.
+
+    ``<artifact root>/<slug>/current.json`` names the published version and
+    is only replaced once that version's directory is complete.
+    """
+    pointer = os.path.join(artifact_root(), slug, 'current.json')
+    try:
+        with open(pointer) as f:
+            version = json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+    directory = os.path.join(artifact_root(), slug, version)
+    return directory if os.path.isdir(directory) else None
+
+
+class TabularPredictor:
+    """Random forest risk predictor driven by a ``PREDICTOR_SPECS`` entry.
+
+    The model comes from the artifact published by ``manage.py train_models``
+    or, failing that, from ``spec['model_path']``. Predictors never train:
+    fitting is CPU-heavy and belongs in the offline pipeline, not in a web
+    worker (see ``ss_app.training``).
+    """
+
+    def __init__(self, slug, spec):
+        self.slug = slug
+        self.spec = spec
+        self.name = spec.get('name', slug)
+        self.field_names = [field for field, column in spec['features']]
+        self.columns = [column for field, column in spec['features']]
+        self.categorical = spec.get('categorical', {})
+        self.model = None
+        self.model_version = ''
+        self.artifact = None
+        self.signature = None
+        self.cache = prediction_cache
+        self.load()
+
+    def load(self):
+        """Load the published artifact, or the spec's bundled model.
+
+        A compiled ``.forest`` export (see ``manage.py compile_models``) is
+        preferred over the pickle when it was built from the same file.
+        Raises ``ModelNotAvailable`` when there is nothing to load.
+        """
+        # Taken before loading, so a file replaced mid-load is seen as a change
+        self.signature = self.source_signature()
+        self._load_model()
+        # Results cached for a previous model are no longer valid
+        self.cache.invalidate(self.slug)
+
+    def _load_model(self):
+        artifact = current_artifact(self.slug)
+        if artifact and self._load_from(os.path.join(artifact, 'model.pkl')):
+            self.artifact = artifact
+            return
+
+        model_path = self.spec.get('model_path')
+        if model_path and self._load_from(model_path):
+            self.artifact = None
+            return
+
+        raise ModelNotAvailable(
+            f"No trained {self.name} model; run `manage.py train_models {self.slug}`"
+        )
+
+    def _load_from(self, model_path):
+        """Load the compiled export or pickle for ``model_path``; returns success"""
+        forest_path = compiled_path(model_path)
+        if self.use_compiled() and CompiledForest.exists(forest_path):
             try:
-                self.model = joblib.load(MODEL_PATH)
-                print(f"✅ Loaded existing hypertension model: {MODEL_PATH}")
-                return
+                forest = CompiledForest.load(forest_path)
+                if os.path.exists(model_path) and forest.meta.get('source_sha256') != file_digest(model_path):
+                    print(f"⚠️ Compiled {self.name} model is stale, run compile_models: {forest_path}")
+                else:
+                    self.model = forest
+                    self.model_version = self.version_of(forest.meta.get('source_sha256')
+                                                         or file_digest(os.path.join(forest_path, META_FILE)))
+                    print(f"✅ Loaded compiled {self.name} model: {forest_path}")
+                    return True
             except Exception as e:
-                print(f"⚠️ Error loading existing hypertension model: {str(e)}")
-                # Continue to train new model
-
-        # Train new model if no existing model found
-        try:
-            df = pd.read_csv(DATA_PATH)
-
-            X = df[['age', 'BMI', 'currentSmoker', 'sysBP', 'diaBP', 'heartRate']]
-            y = df['Risk']
-
-            # Print dataset info for debugging
-            print(f"🔍 Hypertension Dataset shape: {X.shape}")
-            print(f"🔍 Hypertension Target distribution: {y.value_counts()}")
-            print(f"🔍 Hypertension Features: {list(X.columns)}")
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            self.model.fit(X_train, y_train)
-
-            # Test the model on training data
-            train_pred = self.model.predict(X_train)
-            train_acc = accuracy_score(y_train, train_pred)
-            print(f"🔍 Hypertension Training accuracy: {train_acc:.3f}")
-
-            # Save trained model
-            joblib.dump(self.model, MODEL_PATH)
-            print(f"✅ Hypertension model trained and saved: {MODEL_PATH}")
-        except Exception as e:
-            print(f"❌ Error training hypertension model: {str(e)}")
-            # Create a dummy model for now
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-
-    def predict(self, age, bmi, current_smoker, sys_bp, dia_bp, heart_rate):
-        """Make hypertension prediction"""
-        features = np.array([[age, bmi, current_smoker, sys_bp, dia_bp, heart_rate]])
-        prediction = self.model.predict(features)[0]
-        probability = self.model.predict_proba(features)[0]
-
-        confidence = max(probability) * 100
-
-        print(f"🔍 Hypertension Prediction Input: {features[0]}")
-        print(f"🔍 Prediction: {prediction}, Probability: {probability}, Confidence: {confidence:.2f}%")
-
-        # Use ML model prediction to determine risk level
-        if prediction == 1:  # High risk prediction from model
-            if confidence > 80:
-                risk_level = 'high'
-            elif confidence > 60:
-                risk_level = 'medium'
-            else:
-                risk_level = 'low'
-        else:  # Low risk prediction from model
-            if confidence > 90:
-                risk_level = 'low'
-            elif confidence > 70:
-                risk_level = 'medium'
-            else:
-                risk_level = 'high'  # Low confidence in low risk = potential high risk
-
-        print(f"🔍 Risk Level: {risk_level}")
-        return risk_level, confidence
-
-# import os
-# import joblib
-# import numpy as np
-# import pandas as pd
-# from sklearn.model_selection import train_test_split
-# from sklearn.ensemble import RandomForestClassifier
-
-class AsthmaPredictor:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self._train_model()
-
-    def _train_model(self):
-        """Train the asthma prediction model using CSV dataset"""
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        DATA_PATH = os.path.join(BASE_DIR, "data", "asthma.csv")
-        MODEL_PATH = os.path.join(BASE_DIR, "asthma_model.pkl")
+                print(f"⚠️ Error loading compiled {self.name} model: {str(e)}")
+                # Fall back to the pickle
 
-        # Try to load existing model first (like other disease models)
-        if os.path.exists(MODEL_PATH):
+        if os.path.exists(model_path):
             try:
-                self.model = joblib.load(MODEL_PATH)
-                print(f"✅ Loaded existing asthma model: {MODEL_PATH}")
-                return
+                import joblib
+                self.model = joblib.load(model_path)
+                self.model_version = self.version_of(file_digest(model_path))
+                print(f"✅ Loaded existing {self.name} model: {model_path}")
+                return True
             except Exception as e:
-                print(f"⚠️ Error loading existing asthma model: {str(e)}")
-                # Continue to train new model
-
-        # Train new model if no existing model found
-        try:
-            df = pd.read_csv(DATA_PATH)
-
-            # Make sure these columns match your form fields and dataset
-            X = df[['Age', 'Gender', 'ShortnessOfBreath', 'Coughing', 'ChestTightness', 'Wheezing', 'FamilyHistoryAsthma']]
-            y = df['Diagnosis']  # Target variable should be named 'Risk' (0 or 1)
-
-            # Print dataset info for debugging
-            print(f"🔍 Asthma Dataset shape: {X.shape}")
-            print(f"🔍 Asthma Target distribution: {y.value_counts()}")
-            print(f"🔍 Asthma Features: {list(X.columns)}")
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            self.model.fit(X_train, y_train)
-
-            # Test the model on training data
-            train_pred = self.model.predict(X_train)
-            train_acc = accuracy_score(y_train, train_pred)
-            print(f"🔍 Asthma Training accuracy: {train_acc:.3f}")
-
-            # Save trained model
-            joblib.dump(self.model, MODEL_PATH)
-            print(f"✅ Asthma model trained and saved: {MODEL_PATH}")
-        except Exception as e:
-            print(f"❌ Error training asthma model: {str(e)}")
-            # Create a dummy model for now
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-
-    def predict(self, age, gender, shortness_of_breath, coughing, chest_tightness, wheezing, allergy_history):
-        """Make asthma prediction from input"""
-        features = np.array([[int(age), int(gender), int(shortness_of_breath), int(coughing),
-                              int(chest_tightness), int(wheezing), int(allergy_history)]])
-        prediction = self.model.predict(features)[0]
-        probability = self.model.predict_proba(features)[0]
-        confidence = max(probability) * 100
-
-        print(f"🔍 Asthma Prediction Input: {features[0]}")
-        print(f"🔍 Prediction: {prediction}, Probability: {probability}, Confidence: {confidence:.2f}%")
-
-        # Use ML model prediction to determine risk level
-        if prediction == 1:  # High risk prediction from model
-            if confidence > 80:
-                risk_level = 'high'
-            elif confidence > 60:
-                risk_level = 'medium'
-            else:
-                risk_level = 'low'
-        else:  # Low risk prediction from model
-            if confidence > 90:
-                risk_level = 'low'
-            elif confidence > 70:
-                risk_level = 'medium'
-            else:
-                risk_level = 'high'  # Low confidence in low risk = potential high risk
-
-        print(f"🔍 Risk Level: {risk_level}")
-        return risk_level, confidence
-
-class StrokePredictor:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self._train_model()
-
-    def _train_model(self):
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        DATA_PATH = os.path.join(BASE_DIR, 'data', 'stroke-data.csv')  # Make sure stroke.csv exists
-        MODEL_PATH = os.path.join(BASE_DIR, 'stroke_model.pkl')
-
-        # Try to load existing model first (like other disease models)
-        if os.path.exists(MODEL_PATH):
+                print(f"⚠️ Error loading existing {self.name} model: {str(e)}")
+
+        return False
+
+    def source_files(self):
+        """Files whose replacement means a different model would be loaded"""
+        files = [os.path.join(artifact_root(), self.slug, 'current.json')]
+        model_path = self.spec.get('model_path')
+        if model_path:
+            files += [model_path, os.path.join(compiled_path(model_path), META_FILE)]
+        return files
+
+    def source_signature(self):
+        """Cheap fingerprint (inode, size, mtime) of ``source_files()``"""
+        signature = []
+        for path in self.source_files():
             try:
-                self.model = joblib.load(MODEL_PATH)
-                print(f"✅ Loaded existing stroke model: {MODEL_PATH}")
-                return
-            except Exception as e:
-                print(f"⚠️ Error loading existing stroke model: {str(e)}")
-                # Continue to train new model
-
-        # Train new model if no existing model found
-        try:
-            df = pd.read_csv(DATA_PATH)
-
-            # Convert categorical columns if needed
-            df.dropna(inplace=True)
-
-            df['gender'] = df['gender'].map({'Female': 0, 'Male': 1, 'Other': 2})
-            df['smoking_status'] = df['smoking_status'].map({
-                'never smoked': 0, 'formerly smoked': 1, 'smokes': 2, 'Unknown': 3
-            })
-
-            X = df[['age', 'gender', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi', 'smoking_status']]
-            y = df['stroke']  # Target column
-
-            # Print dataset info for debugging
-            print(f"🔍 Stroke Dataset shape: {X.shape}")
-            print(f"🔍 Stroke Target distribution: {y.value_counts()}")
-            print(f"🔍 Stroke Features: {list(X.columns)}")
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            self.model.fit(X_train, y_train)
-
-            # Test the model on training data
-            train_pred = self.model.predict(X_train)
-            train_acc = accuracy_score(y_train, train_pred)
-            print(f"🔍 Stroke Training accuracy: {train_acc:.3f}")
-
-            joblib.dump(self.model, MODEL_PATH)
-            print(f"✅ Stroke model trained and saved to: {MODEL_PATH}")
-        except Exception as e:
-            print(f"❌ Error training stroke model: {str(e)}")
-            # Create a dummy model for now
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-
-    def predict(self, age, gender, hypertension, heart_disease, avg_glucose_level, bmi, smoking_status):
-        """Predict stroke and return risk level + confidence"""
-        input_data = np.array([[
-            int(age),
-            int(gender),
-            int(hypertension),
-            int(heart_disease),
-            float(avg_glucose_level),
-            float(bmi),
-            int(smoking_status)
+                stat = os.stat(path)
+                signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def has_changed(self):
+        """True when the files on disk no longer match the loaded model"""
+        return self.source_signature() != self.signature
+
+    @staticmethod
+    def version_of(digest):
+        """Short model version derived from the artifact's SHA-256"""
+        return digest[:12]
+
+    @staticmethod
+    def use_compiled():
+        from django.conf import settings
+        return getattr(settings, 'PREDICTOR_COMPILED_MODELS', True)
+
+    def encode(self, column, value):
+        """Convert a single input value to the number the model expects"""
+        mapping = self.categorical.get(column)
+        if mapping and value in mapping:
+            return mapping[value]
+        return float(value)
+
+    def features(self, values):
+        """Build a 1×N feature array from a dict keyed by form field name"""
+        return np.array([[
+            self.encode(column, values[field])
+            for field, column in zip(self.field_names, self.columns)
         ]])
 
-        prediction = self.model.predict(input_data)[0]
-        proba = self.model.predict_proba(input_data)[0]
-        confidence = max(proba) * 100
-
-        print(f"🔍 Stroke Prediction Input: {input_data[0]}")
-        print(f"🔍 Prediction: {prediction}, Probability: {proba}, Confidence: {confidence:.2f}%")
-
-        # Use ML model prediction to determine risk level
-        if prediction == 1:  # High risk prediction from model
-            if confidence > 80:
-                risk_level = 'high'
-            elif confidence > 60:
-                risk_level = 'medium'
-            else:
-                risk_level = 'low'
-        else:  # Low risk prediction from model
-            if confidence > 90:
-                risk_level = 'low'
-            elif confidence > 70:
-                risk_level = 'medium'
+    def features_batch(self, rows):
+        """Build an M×N feature array from a batch of rows.
+
+        ``rows`` may be a 2-D array already in feature order, a DataFrame with
+        either form field or CSV column names, or a list of dicts keyed by
+        form field name. An empty batch gives a 0×N array.
+        """
+        if len(rows) == 0:
+            return np.empty((0, len(self.columns)))
+        if hasattr(rows, 'columns'):  # pandas DataFrame
+            if set(self.columns) <= set(rows.columns):
+                frame = rows[self.columns].copy()
             else:
-                risk_level = 'high'  # Low confidence in low risk = potential high risk
-
-        print(f"🔍 Risk Level: {risk_level}")
+                frame = rows[self.field_names].copy()
+                frame.columns = self.columns
+            for column, mapping in self.categorical.items():
+                frame[column] = frame[column].map(lambda value: mapping.get(value, value))
+            return frame.to_numpy(dtype=float)
+
+        if len(rows) and isinstance(rows[0], dict):
+            return np.array([self.features(row)[0] for row in rows])
+
+        features = np.asarray(rows, dtype=float)
+        if features.ndim != 2 or features.shape[1] != len(self.columns):
+            raise ValueError(
+                f"{self.name} expects rows of {len(self.columns)} features, got shape {features.shape}"
+            )
+        return features
+
+    def risk_bands(self):
+        """This disease's band table (see ``ss_app.risk_bands``), cached per disease"""
+        return risk_bands_for(self.slug, self.spec)
+
+    def risk_level(self, prediction, confidence):
+        """Map a class prediction and its confidence (%) to low/medium/high"""
+        return self.risk_bands().band(prediction, confidence)
+
+    def cache_version(self, bands):
+        """Version part of prediction cache keys: the model and the band table"""
+        return f'{self.model_version}.{bands.key}'
+
+    def predict(self, **values):
+        """Predict from form values; returns ``(risk_level, confidence)``"""
+        risk_level, confidence, timings = self.predict_with_timings(**values)
         return risk_level, confidence
 
+    def predict_with_timings(self, **values):
+        """Like ``predict()`` but also returns a per-stage timing breakdown.
+
+        The class label is taken from the same ``predict_proba`` pass as the
+        confidence (argmax over ``classes_``, exactly what the model's own
+        ``predict`` does), so each request walks the forest once.
+        """
+        started = time.perf_counter()
+        features = self.features(values)
+        prepared = time.perf_counter()
+
+        bands = self.risk_bands()
+        key = self.cache.key(self.slug, features[0], self.cache_version(bands)) if self.cache.enabled else None
+        cached = self.cache.get(key) if key else None
+        probability = None
+        if cached is not None:
+            risk_level, confidence = cached
+            finished = time.perf_counter()
+        else:
+            probability = self.model.predict_proba(features)[0]
+            best = int(np.argmax(probability))
+            prediction = self.model.classes_[best]
+            confidence = probability[best] * 100
+            inferred = time.perf_counter()
+
+            risk_level = bands.band(prediction, confidence)
+            finished = time.perf_counter()
+            if key:
+                self.cache.set(key, (risk_level, float(confidence)))
+
+        timings = {
+            'features_ms': (prepared - started) * 1000,
+            'inference_ms': 0.0 if cached else (inferred - prepared) * 1000,
+            'risk_banding_ms': 0.0 if cached else (finished - inferred) * 1000,
+            'total_ms': (finished - started) * 1000,
+            'cache_hit': cached is not None,
+        }
+        if inference_log.sampled():
+            inference_log.log(self.slug, self.model_version, features[0], probability,
+                              risk_level, confidence, timings)
+        return risk_level, confidence, timings
+
+    def predict_batch(self, rows):
+        """Predict many patients with one model call.
+
+        Accepts the same inputs as ``features_batch()`` and returns a list of
+        ``(risk_level, confidence)`` tuples in input order. Rows already in
+        the prediction cache are not sent to the model; an empty batch gives
+        an empty list.
+        """
+        started = time.perf_counter()
+        features = self.features_batch(rows)
+        if not len(features):
+            return []
+        bands = self.risk_bands()
+        results = [None] * len(features)
+        keys = [None] * len(features)
+        if self.cache.enabled:
+            version = self.cache_version(bands)
+            keys = [self.cache.key(self.slug, row, version) for row in features]
+            results = self.cache.get_many(keys)
+
+        misses = [index for index, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+
+        probabilities = self.model.predict_proba(features[misses])
+        best = probabilities.argmax(axis=1)
+        predictions = self.model.classes_[best]
+        confidences = probabilities[np.arange(len(best)), best] * 100
+        risk_levels = bands.apply(predictions, confidences)
+
+        for index, risk_level, confidence in zip(misses, risk_levels, confidences):
+            results[index] = (str(risk_level), float(confidence))
+        if self.cache.enabled:
+            self.cache.set_many([(keys[index], results[index]) for index in misses])
+
+        if inference_log.sampled():
+            timings = {'total_ms': (time.perf_counter() - started) * 1000,
+                       'rows': len(features), 'cache_misses': len(misses)}
+            inference_log.log(self.slug, self.model_version, features[misses], probabilities,
+                              risk_levels.tolist(), None, timings)
+        return results
+
+
+class PredictorRegistry:
+    """Lazily builds one predictor per disease slug on first use.
+
+    Loading a predictor reads its model from disk, so nothing is built
+    until ``get()`` is called for that disease. Each slug has its own lock so
+    concurrent first requests build the model exactly once, while requests for
+    other diseases are not blocked.
+
+    Loaded predictors are hot-reloaded: at most every
+    ``PREDICTOR_RELOAD_INTERVAL`` seconds ``get()`` checks whether the
+    predictor's files changed (e.g. ``train_models`` published a version) and,
+    if so, builds a replacement in a background thread. Requests keep being
+    served by the old predictor until the new one is swapped in, and requests
+    already holding the old one finish with it.
+    """
 
-class KidneyDiseasePredictor:
     def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self._train_model()
-
-    def _train_model(self):
-        """Train the kidney disease prediction model using CSV dataset"""
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        DATA_PATH = os.path.join(BASE_DIR, "data", "kidney_disease_dataset.csv")
-        MODEL_PATH = os.path.join(BASE_DIR, "kidney_disease_model.pkl")
-
-        # Try to load existing model first (like other disease models)
-        if os.path.exists(MODEL_PATH):
-            try:
-                self.model = joblib.load(MODEL_PATH)
-                print(f"✅ Loaded existing kidney disease model: {MODEL_PATH}")
-                return
-            except Exception as e:
-                print(f"⚠️ Error loading existing model: {str(e)}")
-                # Continue to train new model
-
-        # Train new model if no existing model found
+        self._factories = {}
+        self._predictors = {}
+        self._locks = {}
+        self._checked = {}
+        self._reloading = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, slug, factory):
+        """Register a zero-argument callable that builds the predictor for ``slug``"""
+        with self._registry_lock:
+            self._factories[slug] = factory
+            self._locks.setdefault(slug, threading.Lock())
+            self._predictors.pop(slug, None)
+
+    def register_spec(self, slug, spec):
+        """Register a ``TabularPredictor`` for a ``PREDICTOR_SPECS``-style spec"""
+        self.register(slug, lambda: TabularPredictor(slug, spec))
+
+    def slugs(self):
+        return list(self._factories)
+
+    def __contains__(self, slug):
+        return slug in self._factories
+
+    def is_loaded(self, slug):
+        return slug in self._predictors
+
+    def get(self, slug):
+        """Return the predictor for ``slug``, building it on first use"""
+        predictor = self._predictors.get(slug)
+        if predictor is not None:
+            self._check_for_changes(slug, predictor)
+            return predictor
+
+        if slug not in self._factories:
+            raise KeyError(f"No predictor registered for '{slug}'")
+
+        with self._locks[slug]:
+            # Another thread may have finished loading while we waited
+            predictor = self._predictors.get(slug)
+            if predictor is None:
+                predictor = self._factories[slug]()
+                self._predictors[slug] = predictor
+        return predictor
+
+    @staticmethod
+    def reload_interval():
+        from django.conf import settings
+        return getattr(settings, 'PREDICTOR_RELOAD_INTERVAL', 5)
+
+    def _check_for_changes(self, slug, predictor):
+        interval = self.reload_interval()
+        if not interval or interval < 0:
+            return
+        now = time.monotonic()
+        if now - self._checked.get(slug, 0) < interval:
+            return
+        self._checked[slug] = now
+
+        has_changed = getattr(predictor, 'has_changed', None)
+        if has_changed and has_changed():
+            self.reload(slug, wait=False)
+
+    def reload(self, slug, wait=True):
+        """Rebuild the predictor for ``slug`` and swap it in.
+
+        With ``wait=False`` the rebuild runs in a background thread (at most
+        one per slug) and the current predictor keeps serving meanwhile.
+        Returns the thread doing the reload.
+        """
+        with self._registry_lock:
+            thread = self._reloading.get(slug)
+            if thread is None:
+                old = self._predictors.get(slug)
+                thread = threading.Thread(target=self._reload, args=(slug, old),
+                                          name=f'reload-{slug}', daemon=True)
+                self._reloading[slug] = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def _reload(self, slug, old):
         try:
-            df = pd.read_csv(DATA_PATH)
-            
-            # Clean the data - remove rows with missing values
-            df.dropna(inplace=True)
-            
-            # Convert categorical columns to numeric
-            df['Hypertension (yes/no)'] = df['Hypertension (yes/no)'].map({'yes': 1, 'no': 0})
-            df['Diabetes mellitus (yes/no)'] = df['Diabetes mellitus (yes/no)'].map({'yes': 1, 'no': 0})
-            
-            # Select the 7 features we want to use - using exact column names from CSV
-            X = df[['Age of the patient', 'Blood pressure (mm/Hg)', 'Serum creatinine (mg/dl)', 'Blood urea (mg/dl)', 'Hemoglobin level (gms)', 'Hypertension (yes/no)', 'Diabetes mellitus (yes/no)']]
-            y = df['Target']  # Target column
-
-            # Print dataset info for debugging
-            print(f"🔍 Dataset shape: {X.shape}")
-            print(f"🔍 Target distribution: {y.value_counts()}")
-            print(f"🔍 Features: {list(X.columns)}")
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            self.model.fit(X_train, y_train)
-
-            # Test the model on training data
-            train_pred = self.model.predict(X_train)
-            train_acc = accuracy_score(y_train, train_pred)
-            print(f"🔍 Training accuracy: {train_acc:.3f}")
-
-            # Save trained model
-            joblib.dump(self.model, MODEL_PATH)
-            print(f"✅ Kidney disease model trained and saved: {MODEL_PATH}")
+            predictor = self._factories[slug]()
         except Exception as e:
-            print(f"❌ Error training kidney disease model: {str(e)}")
-            # Create a dummy model for now
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-
-    def predict(self, age, blood_pressure, serum_creatinine, blood_urea, hemoglobin, hypertension, diabetes):
-        """Make kidney disease prediction from input"""
-        features = np.array([[
-            int(age),
-            float(blood_pressure),
-            float(serum_creatinine),
-            float(blood_urea),
-            float(hemoglobin),
-            int(hypertension),
-            int(diabetes)
-        ]])
-        
-        print(f"🔍 Kidney Disease Prediction Input: {features[0]}")
-        
-        prediction = self.model.predict(features)[0]
-        probability = self.model.predict_proba(features)[0]
-        confidence = max(probability) * 100
-
-        print(f"🔍 Prediction: {prediction}, Probability: {probability}, Confidence: {confidence:.2f}%")
-
-        # Use ML model prediction to determine risk level
-        if prediction == 1:  # High risk prediction from model
-            if confidence > 80:
-                risk_level = 'high'
-            elif confidence > 60:
-                risk_level = 'medium'
-            else:
-                risk_level = 'low'
-        else:  # Low risk prediction from model
-            if confidence > 90:
-                risk_level = 'low'
-            elif confidence > 70:
-                risk_level = 'medium'
-            else:
-                risk_level = 'high'  # Low confidence in low risk = potential high risk
+            print(f"⚠️ Reloading {slug} failed, keeping the current model: {str(e)}")
+        else:
+            with self._locks[slug]:
+                # Only replace what we set out to replace
+                if self._predictors.get(slug) is old:
+                    self._predictors[slug] = predictor
+            print(f"🔄 Reloaded {slug} model, version {predictor.model_version}")
+        finally:
+            with self._registry_lock:
+                self._reloading.pop(slug, None)
+
+    def warm_up(self, slugs=None):
+        """Build the given predictors (all registered ones by default) now.
+
+        Diseases without a trained model are skipped rather than failing boot.
+        """
+        for slug in (slugs if slugs is not None else self.slugs()):
+            try:
+                self.get(slug)
+            except ModelNotAvailable as e:
+                print(f"⚠️ {e}")
 
-        print(f"🔍 Risk Level: {risk_level}")
-        return risk_level, confidence
 
-# Initialize predictors
-diabetes_predictor = DiabetesPredictor()
-heart_disease_predictor = HeartDiseasePredictor()
-hypertension_predictor = HypertensionPredictor()
-asthma_predictor=AsthmaPredictor()
-stroke_predictor=StrokePredictor()
-kidney_disease_predictor = KidneyDiseasePredictor()
\ No newline at end of file
+# Predictors are keyed by the same slug used in the /predict/<disease_name>/ URLs
+predictor_registry = PredictorRegistry()
+for _slug, _spec in PREDICTOR_SPECS.items():
+    predictor_registry.register_spec(_slug, _spec)
@@ -72,12 +72,16 @@ class RiskCategory(models.Model):
         ('high', 'High Risk'),
     ])
     tips = models.TextField()
+    # Band thresholds (confidence %, see ss_app.risk_bands): this level applies when the
+    # model predicts the condition / its absence with a confidence above the value
+    positive_above = models.FloatField(null=True, blank=True)
+    negative_above = models.FloatField(null=True, blank=True)
     
     def __str__(self):
         return f"{self.disease.name} - {self.risk_level}"
     
     class Admin(admin.ModelAdmin):
-        list_display = ['disease', 'risk_level']
+        list_display = ['disease', 'risk_level', 'positive_above', 'negative_above']
         list_filter = ['risk_level', 'disease']
         search_fields = ['disease__name']
 
@@ -169,6 +173,184 @@ class UserProfile(models.Model):
         search_fields = ['user__username', 'user__email']
         readonly_fields = ['created_at']
 
+class TrainingJob(models.Model):
+    """A request to train a disease model from its uploaded CSV.
+
+    Jobs are queued by the admin and picked up by ``manage.py
+    run_training_worker``; no external broker is involved.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    disease = models.ForeignKey(Disease, on_delete=models.CASCADE, related_name='training_jobs')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.IntegerField(default=0)  # Percent complete
+    message = models.CharField(max_length=255, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    version = models.CharField(max_length=100, blank=True)  # Artifact version once published
+    metrics = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Last sign of life from the worker
+    attempts = models.IntegerField(default=0)  # Times a worker has claimed the job
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.disease.name} - {self.status} ({self.progress}%)"
+    
+    @property
+    def is_active(self):
+        return self.status in ('queued', 'running')
+    
+    @classmethod
+    def claim_next(cls, worker):
+        """Atomically take the oldest queued job for ``worker``, or return None.
+
+        The conditional UPDATE only succeeds for one worker per job, so any
+        number of workers can share the queue on any database backend. Jobs
+        of workers that died first go back to the queue, see ``reclaim_stale``.
+        """
+        from django.db.models import F
+        from django.utils import timezone
+        
+        cls.reclaim_stale()
+        for job in cls.objects.filter(status='queued').order_by('created_at')[:10]:
+            now = timezone.now()
+            claimed = cls.objects.filter(pk=job.pk, status='queued').update(
+                status='running', worker=worker, started_at=now, heartbeat_at=now, message='Starting',
+                attempts=F('attempts') + 1
+            )
+            if claimed:
+                job.refresh_from_db()
+                return job
+        return None
+    
+    @classmethod
+    def reclaim_stale(cls):
+        """Requeue running jobs whose worker has been silent for ``TRAINING_JOB_TIMEOUT`` seconds.
+
+        A worker killed outright (SIGKILL, out of memory, host restart) never
+        marks its job finished. Jobs that already took ``TRAINING_JOB_MAX_ATTEMPTS``
+        workers down with them are failed rather than retried. Returns the
+        number of jobs requeued or failed.
+        """
+        from datetime import timedelta
+        
+        from django.conf import settings
+        from django.db.models import Q
+        from django.utils import timezone
+        
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=getattr(settings, 'TRAINING_JOB_TIMEOUT', 300))
+        # Jobs claimed before heartbeats existed have only started_at
+        stale = cls.objects.filter(status='running').filter(
+            Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+        )
+        max_attempts = getattr(settings, 'TRAINING_JOB_MAX_ATTEMPTS', 3)
+        failed = stale.filter(attempts__gte=max_attempts).update(
+            status='failed', finished_at=now,
+            message=f'Worker stopped responding {max_attempts} times; check its memory use and logs'
+        )
+        requeued = stale.filter(attempts__lt=max_attempts).update(
+            status='queued', worker='', progress=0, message='Worker stopped responding; waiting for another'
+        )
+        return failed + requeued
+    
+    def heartbeat(self):
+        """Record that the worker running this job is alive"""
+        from django.utils import timezone
+        
+        self.heartbeat_at = timezone.now()
+        TrainingJob.objects.filter(pk=self.pk).update(heartbeat_at=self.heartbeat_at)
+    
+    def report(self, progress, message):
+        """Record progress without touching the other columns; also a heartbeat"""
+        from django.utils import timezone
+        
+        self.progress, self.message, self.heartbeat_at = progress, message[:255], timezone.now()
+        TrainingJob.objects.filter(pk=self.pk).update(progress=self.progress, message=self.message,
+                                                      heartbeat_at=self.heartbeat_at)
+    
+    class Admin(admin.ModelAdmin):
+        list_display = ['disease', 'status', 'progress', 'version', 'created_at', 'finished_at']
+        list_filter = ['status', 'disease']
+        readonly_fields = ['created_at', 'started_at', 'finished_at', 'heartbeat_at', 'attempts']
+
+class ReviewTerm(models.Model):
+    """How often a word occurs across all review comments, for the word cloud.
+
+    Kept current by the ``Review`` signals in ``ss_app.signals``; ``manage.py
+    rebuild_review_terms`` recounts it from scratch.
+    """
+    term = models.CharField(max_length=100, unique=True)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-count', 'term']
+        indexes = [models.Index(fields=['-count', 'term'], name='ss_app_reviewterm_top')]
+    
+    def __str__(self):
+        return f"{self.term} ({self.count})"
+    
+    class Admin(admin.ModelAdmin):
+        list_display = ['term', 'count']
+        search_fields = ['term']
+
+class DailyReviewTerm(models.Model):
+    """Word counts of the reviews of one disease written on one day.
+
+    Word clouds for a disease or date range add up these buckets instead of
+    reading review comments. Maintained alongside ``ReviewTerm``.
+    """
+    disease = models.ForeignKey(Disease, on_delete=models.CASCADE, related_name='daily_review_terms')
+    day = models.DateField()
+    term = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-day', '-count']
+        constraints = [
+            models.UniqueConstraint(fields=['disease', 'day', 'term'], name='ss_app_dailyreviewterm_unique'),
+        ]
+        indexes = [models.Index(fields=['day', 'term'], name='ss_app_dailyreviewterm_day')]
+    
+    def __str__(self):
+        return f"{self.disease.name} {self.day}: {self.term} ({self.count})"
+    
+    class Admin(admin.ModelAdmin):
+        list_display = ['disease', 'day', 'term', 'count']
+        list_filter = ['disease', 'day']
+        search_fields = ['term']
+
+class DashboardStat(models.Model):
+    """One counter shown on the custom admin dashboard, e.g. ``predictions`` or
+    ``reviews@2026-10``.
+
+    Kept current by the signals in ``ss_app.signals`` (see
+    ``ss_app.dashboard_stats``); ``manage.py reconcile_dashboard_stats``
+    recounts them from the tables.
+    """
+    key = models.CharField(max_length=150, unique=True)
+    value = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['key']
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+    
+    class Admin(admin.ModelAdmin):
+        list_display = ['key', 'value']
+        search_fields = ['key']
+
 # Register all models with admin
 admin.site.register(Disease, Disease.Admin)
 admin.site.register(DiseaseFormField, DiseaseFormField.Admin)
@@ -177,3 +359,7 @@ admin.site.register(Prediction, Prediction.Admin)
 admin.site.register(Review, Review.Admin)
 admin.site.register(AIChatLog, AIChatLog.Admin)
 admin.site.register(UserProfile, UserProfile.Admin)
+admin.site.register(TrainingJob, TrainingJob.Admin)
+admin.site.register(ReviewTerm, ReviewTerm.Admin)
+admin.site.register(DailyReviewTerm, DailyReviewTerm.Admin)
+admin.site.register(DashboardStat, DashboardStat.Admin)
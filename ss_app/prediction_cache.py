@@ -0,0 +1,180 @@
+"""
+Cache of disease prediction results.
+
+Many visitors submit the same (or nearly the same) form values, so the result
+for a feature vector is kept in a bounded LRU keyed on the disease slug, the
+model version and the feature values rounded to ``PREDICTION_CACHE_DECIMALS``
+places. Entries for a disease are dropped whenever its model is (re)loaded.
+
+Behind the in-process LRU, results can also be shared between workers through
+the Django cache named by ``PREDICTION_CACHE_ALIAS`` (off by default). Because
+the model version is part of every key, retraining a model makes old shared
+entries unreachable. Batches go to the shared cache with one ``get_many`` and
+one ``set_many`` rather than a round trip per row.
+
+The shared cache may hold other keys too (sessions, other apps), so ``clear()``
+never empties it: shared keys include a generation number kept in the cache,
+and clearing moves every worker to a new generation within
+``GENERATION_TTL`` seconds. Old entries are left to expire.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+GENERATION_KEY = 'prediction:generation'
+# Seconds a worker reuses the shared generation number before reading it again
+GENERATION_TTL = 5
+
+
+class PredictionCache:
+    """Thread-safe bounded LRU mapping (slug, version, features) to a prediction,
+    optionally backed by a shared Django cache"""
+
+    def __init__(self, maxsize=1024, decimals=2, alias=None):
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self.alias = alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generation = None
+        self._generation_read = 0.0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def key(self, slug, features, version=''):
+        """Cache key for one feature row scored by model ``version``"""
+        return (slug, version) + tuple(round(float(value), self.decimals) for value in features)
+
+    @property
+    def shared(self):
+        """The shared Django cache backend, or None when not configured"""
+        return caches[self.alias] if self.alias else None
+
+    def generation(self):
+        """Current generation of the shared cache's prediction keys"""
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_read >= GENERATION_TTL:
+            self._generation = self.shared.get(GENERATION_KEY, 0)
+            self._generation_read = now
+        return self._generation
+
+    def shared_key(self, key, generation):
+        digest = hashlib.sha1(repr(key[2:]).encode()).hexdigest()
+        return f'prediction:{generation}:{key[0]}:{key[1]}:{digest}'
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self.shared.get(self.shared_key(key, self.generation())) if self.shared else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        value = tuple(value)
+        self._store(key, value)
+        return value
+
+    def get_many(self, keys):
+        """Cached values for ``keys`` as a list in the same order, None for misses"""
+        values = [None] * len(keys)
+        with self._lock:
+            for index, key in enumerate(keys):
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    values[index] = value
+            self.hits += sum(value is not None for value in values)
+        missing = [index for index, value in enumerate(values) if value is None]
+
+        shared = {}
+        if missing and self.shared:
+            generation = self.generation()
+            shared_keys = {self.shared_key(keys[index], generation): index for index in missing}
+            shared = {shared_keys[key]: tuple(value) for key, value in self.shared.get_many(list(shared_keys)).items()}
+        with self._lock:
+            self.shared_hits += len(shared)
+            self.misses += len(missing) - len(shared)
+        for index, value in shared.items():
+            values[index] = value
+            self._store(keys[index], value)
+        return values
+
+    def set_many(self, items):
+        """Cache many ``(key, value)`` pairs"""
+        if not self.enabled:
+            return
+        for key, value in items:
+            self._store(key, value)
+        if self.shared and items:
+            generation = self.generation()
+            self.shared.set_many({self.shared_key(key, generation): value for key, value in items})
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        self._store(key, value)
+        if self.shared:
+            self.shared.set(self.shared_key(key, self.generation()), value)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, slug):
+        """Drop every entry for one disease, e.g. after its model is reloaded"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == slug]:
+                del self._entries[key]
+
+    def clear(self):
+        """Empty the local LRU, retire the shared entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = self.evictions = 0
+        if self.shared:
+            self.shared.add(GENERATION_KEY, 0, timeout=None)
+            try:
+                generation = self.shared.incr(GENERATION_KEY)
+            except ValueError:  # Evicted in between
+                generation = self.generation() + 1
+                self.shared.set(GENERATION_KEY, generation, timeout=None)
+            self._generation, self._generation_read = generation, time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+prediction_cache = PredictionCache(
+    maxsize=getattr(settings, 'PREDICTION_CACHE_SIZE', 1024),
+    decimals=getattr(settings, 'PREDICTION_CACHE_DECIMALS', 2),
+    alias=getattr(settings, 'PREDICTION_CACHE_ALIAS', None),
+)
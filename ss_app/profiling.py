@@ -0,0 +1,202 @@
+"""
+Per-request profiles written by ``ProfilingMiddleware``.
+
+A profiled request produces three files in ``PROFILING_REPORT_DIR``, named by
+a report id:
+
+* ``<id>.json``   summary: request, status, duration, SQL count/time, the
+  slowest queries and the top functions by cumulative time
+* ``<id>.prof``   the raw cProfile stats (``python -m pstats`` or snakeviz)
+* ``<id>.folded`` wall-clock stack samples in folded format, one
+  ``frame;frame;frame count`` line per stack, for flamegraph.pl or speedscope
+
+Reports are listed and viewed under ``/custom-admin/profiles/``.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+REPORT_ID = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+REPORT_FILES = {'json': '.json', 'prof': '.prof', 'folded': '.folded'}
+
+
+def report_dir():
+    return str(getattr(settings, 'PROFILING_REPORT_DIR', os.path.join(settings.BASE_DIR, 'profiles')))
+
+
+class StackSampler:
+    """Samples one thread's Python stack every ``interval`` seconds"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook counting and timing SQL statements"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def total_seconds(self):
+        return sum(seconds for sql, seconds in self.queries)
+
+
+class RequestProfile:
+    """cProfile, stack samples and SQL for the request being handled"""
+
+    def __init__(self, stack_interval=0.005):
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), stack_interval)
+        self.queries = QueryRecorder()
+        self.started = None
+        self.duration = None
+
+    def __enter__(self):
+        from django.db import connection
+
+        self._wrapper = connection.execute_wrapper(self.queries)
+        self._wrapper.__enter__()
+        self.sampler.start()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        self.sampler.stop()
+        self._wrapper.__exit__(*exc_info)
+        return False
+
+    def top_functions(self, limit=30):
+        stats = pstats.Stats(self.profiler)
+        rows = []
+        for (filename, line, name), (calls, primitive, total, cumulative, callers) in stats.stats.items():
+            rows.append({
+                'function': f'{name} ({os.path.basename(filename)}:{line})',
+                'calls': calls,
+                'total_ms': total * 1000,
+                'cumulative_ms': cumulative * 1000,
+            })
+        rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+        return rows[:limit]
+
+    def write(self, request, response, reason):
+        """Write this profile's report files and return the report id"""
+        directory = report_dir()
+        os.makedirs(directory, exist_ok=True)
+        now = timezone.now()
+        report_id = f"{now.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(directory, report_id)
+
+        slowest = sorted(self.queries.queries, key=lambda query: query[1], reverse=True)[:20]
+        summary = {
+            'id': report_id,
+            'created_at': now.isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': getattr(getattr(request, 'resolver_match', None), 'view_name', None),
+            'user': request.user.username if getattr(request, 'user', None) and request.user.is_authenticated else None,
+            'status': response.status_code,
+            'reason': reason,
+            'duration_ms': self.duration * 1000,
+            'sql_count': len(self.queries.queries),
+            'sql_ms': self.queries.total_seconds * 1000,
+            'slowest_queries': [{'sql': sql, 'ms': seconds * 1000} for sql, seconds in slowest],
+            'stack_samples': sum(self.sampler.stacks.values()),
+            'top_functions': self.top_functions(),
+        }
+
+        self.profiler.dump_stats(path + REPORT_FILES['prof'])
+        with open(path + REPORT_FILES['folded'], 'w') as f:
+            f.write(self.sampler.folded())
+        # The summary goes last: a report is listed once its JSON exists
+        with open(path + REPORT_FILES['json'], 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        prune_reports(getattr(settings, 'PROFILING_MAX_REPORTS', 200))
+        return report_id
+
+
+def list_reports(limit=100):
+    """Summaries of the newest reports, newest first"""
+    directory = report_dir()
+    if not os.path.isdir(directory):
+        return []
+    ids = sorted((name[:-5] for name in os.listdir(directory)
+                  if name.endswith('.json') and REPORT_ID.match(name[:-5])), reverse=True)
+    reports = []
+    for report_id in ids[:limit]:
+        try:
+            reports.append(load_report(report_id))
+        except (OSError, ValueError):
+            continue
+    return reports
+
+
+def report_path(report_id, kind='json'):
+    if not REPORT_ID.match(report_id) or kind not in REPORT_FILES:
+        raise ValueError(f'Invalid profile report {report_id!r}')
+    return os.path.join(report_dir(), report_id + REPORT_FILES[kind])
+
+
+def load_report(report_id):
+    with open(report_path(report_id)) as f:
+        return json.load(f)
+
+
+def prune_reports(keep):
+    """Delete all but the newest ``keep`` reports"""
+    directory = report_dir()
+    ids = sorted({name.split('.')[0] for name in os.listdir(directory) if REPORT_ID.match(name.split('.')[0])})
+    for report_id in ids[:max(len(ids) - keep, 0)]:
+        for suffix in REPORT_FILES.values():
+            try:
+                os.remove(os.path.join(directory, report_id + suffix))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,101 @@
+"""
+Per-view SQL query budgets and N+1 detection.
+
+``QueryBudgetMiddleware`` counts the queries each request runs. A view
+declares its budget with the ``query_budget`` decorator; views without one
+get ``QUERY_BUDGET_DEFAULT``::
+
+    @login_required
+    @query_budget(6)
+    def chat_history(request):
+        ...
+
+Going over budget is logged on the ``ss_app.query_budget`` logger, or raises
+``QueryBudgetExceeded`` when ``QUERY_BUDGET_MODE`` is ``'raise'`` (the
+default under ``manage.py test``, so regressions fail the suite). The same
+SQL statement run ``QUERY_BUDGET_REPEAT_THRESHOLD`` or more times in one
+request (only the parameters differ) is reported as an N+1 suspect.
+"""
+import logging
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('ss_app.query_budget')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its declared budget"""
+
+
+def query_budget(max_queries):
+    """Declare the most queries a view may run per request"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(*args, **kwargs):
+            return view_func(*args, **kwargs)
+        wrapped.query_budget = max_queries
+        return wrapped
+    return decorator
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` hook recording each statement's SQL"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, threshold):
+        """Statements run at least ``threshold`` times, most repeated first"""
+        return [(sql, count) for sql, count in Counter(self.statements).most_common() if count >= threshold]
+
+
+class QueryBudgetMiddleware:
+    """Enforce per-view query budgets, see the module docstring"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = getattr(settings, 'QUERY_BUDGET_MODE', 'log')
+        self.default_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        self.repeat_threshold = getattr(settings, 'QUERY_BUDGET_REPEAT_THRESHOLD', 5)
+
+    def __call__(self, request):
+        if self.mode == 'off':
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        self.check(request, counter)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', self.default_budget)
+        return None
+
+    def check(self, request, counter):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+        budget = getattr(request, 'query_budget', None)
+
+        suspects = counter.repeated(self.repeat_threshold)
+        for sql, count in suspects:
+            logger.warning('Possible N+1 in %s: %d runs of %s', view, count, sql[:300])
+
+        if budget is not None and counter.count > budget:
+            message = f'{view} ran {counter.count} queries, over its budget of {budget}'
+            if suspects:
+                message += f' ({len(suspects)} repeated statement(s), e.g. {suspects[0][1]}x {suspects[0][0][:200]})'
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
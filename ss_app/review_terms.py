@@ -0,0 +1,228 @@
+"""
+Word frequencies of review comments, for the word cloud.
+
+``ReviewTerm`` holds one row per word with its count across all reviews, and
+``DailyReviewTerm`` the same per disease and day. The ``Review`` signals in
+``ss_app.signals`` apply the difference between a review's old and new words
+on every save and delete. The site-wide word cloud reads the top terms with
+one indexed query however many reviews there are; one for a disease or date
+range adds up that window's daily buckets. ``rebuild_review_terms`` recounts
+every comment, e.g. after bulk imports that bypass signals.
+"""
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import DailyReviewTerm, Review, ReviewTerm
+
+# Longer "words" are pasted URLs and the like; they also wouldn't fit ReviewTerm.term
+MAX_TERM_LENGTH = 100
+PUNCTUATION = re.compile(r'[^\w\s]')
+# Reviews fetched from the database at a time when counting every comment
+CHUNK_SIZE = 2000
+
+# Only basic stop words are removed; medical and health-related terms are kept
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
+    'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those',
+    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them',
+    'my', 'your', 'his', 'her', 'its', 'our', 'their', 'mine', 'yours', 'his', 'hers', 'ours', 'theirs',
+    'very', 'really', 'quite', 'just', 'only', 'also', 'too', 'as', 'so', 'than', 'more', 'most',
+    'like', 'love', 'hate', 'dislike', 'enjoy', 'appreciate', 'value', 'trust', 'believe', 'think',
+    'know', 'understand', 'see', 'look', 'watch', 'hear', 'listen', 'feel', 'touch', 'taste', 'smell',
+    'say', 'tell', 'speak', 'talk', 'ask', 'answer', 'reply', 'respond', 'comment', 'mention',
+    'get', 'give', 'take', 'put', 'set', 'place', 'move', 'go', 'come', 'arrive', 'leave', 'stay',
+    'make', 'create', 'build', 'construct', 'form', 'shape', 'design', 'plan', 'prepare', 'ready',
+    'use', 'utilize', 'apply', 'employ', 'practice', 'exercise', 'work', 'play', 'study', 'learn',
+    'help', 'assist', 'support', 'aid', 'serve', 'provide', 'offer', 'give', 'present', 'show',
+    'want', 'need', 'require', 'desire', 'wish', 'hope', 'expect', 'wait', 'try', 'attempt', 'effort',
+    'find', 'discover', 'search', 'seek', 'look', 'find', 'locate', 'identify', 'recognize', 'notice',
+    'start', 'begin', 'commence', 'initiate', 'launch', 'open', 'close', 'end', 'finish', 'complete',
+    'continue', 'keep', 'maintain', 'preserve', 'save', 'store', 'hold', 'contain', 'include', 'involve',
+    'change', 'modify', 'alter', 'adjust', 'adapt', 'transform', 'convert', 'turn', 'become', 'grow',
+    'increase', 'decrease', 'rise', 'fall', 'grow', 'shrink', 'expand', 'contract', 'extend', 'reduce',
+    'time', 'day', 'week', 'month', 'year', 'hour', 'minute', 'second', 'morning', 'afternoon', 'evening',
+    'night', 'today', 'yesterday', 'tomorrow', 'now', 'then', 'before', 'after', 'during', 'while',
+    'place', 'location', 'area', 'region', 'country', 'city', 'town', 'village', 'street', 'road',
+    'way', 'path', 'direction', 'north', 'south', 'east', 'west', 'up', 'down', 'left', 'right',
+    'thing', 'object', 'item', 'piece', 'part', 'section', 'portion', 'amount', 'quantity', 'number',
+    'people', 'person', 'man', 'woman', 'boy', 'girl', 'child', 'adult', 'human', 'individual',
+    'group', 'team', 'family', 'community', 'society', 'world', 'earth', 'planet', 'universe',
+    'life', 'living', 'alive', 'dead', 'death', 'birth', 'born', 'die', 'live', 'survive',
+    'food', 'eat', 'drink', 'meal', 'breakfast', 'lunch', 'dinner', 'snack', 'hungry', 'thirsty',
+    'water', 'milk', 'juice', 'coffee', 'tea', 'soda', 'alcohol', 'wine', 'beer', 'drink',
+    'house', 'home', 'building', 'room', 'kitchen', 'bathroom', 'bedroom', 'living', 'dining',
+    'car', 'vehicle', 'transport', 'travel', 'trip', 'journey', 'vacation', 'holiday', 'visit',
+    'money', 'cash', 'dollar', 'cent', 'price', 'cost', 'expensive', 'cheap', 'free', 'buy', 'sell',
+    'job', 'work', 'employment', 'career', 'profession', 'business', 'company', 'office', 'factory',
+    'school', 'education', 'student', 'teacher', 'class', 'course', 'lesson', 'study', 'learn',
+    'book', 'read', 'write', 'story', 'article', 'news', 'information', 'data', 'fact', 'truth',
+    'music', 'song', 'dance', 'art', 'picture', 'photo', 'image', 'video', 'movie', 'film',
+    'game', 'play', 'fun', 'enjoy', 'entertainment', 'hobby', 'interest', 'activity', 'sport',
+    'computer', 'internet', 'website', 'app', 'software', 'program', 'code', 'technology',
+    'phone', 'mobile', 'call', 'text', 'message', 'email', 'communication', 'contact',
+    'weather', 'sunny', 'rainy', 'cloudy', 'hot', 'cold', 'warm', 'cool', 'temperature',
+    'color', 'red', 'blue', 'green', 'yellow', 'black', 'white', 'gray', 'brown', 'pink',
+    'size', 'big', 'small', 'large', 'tiny', 'huge', 'enormous', 'giant', 'mini', 'micro',
+    'shape', 'round', 'square', 'triangle', 'circle', 'rectangle', 'oval', 'flat', 'curved',
+    'texture', 'smooth', 'rough', 'soft', 'hard', 'sharp', 'dull', 'wet', 'dry', 'sticky',
+    'taste', 'sweet', 'sour', 'bitter', 'salty', 'spicy', 'delicious', 'tasty', 'yummy',
+    'sound', 'loud', 'quiet', 'noisy', 'silent', 'music', 'noise', 'voice', 'speech',
+    'light', 'bright', 'dark', 'shiny', 'dull', 'glowing', 'sparkling', 'twinkling',
+    'speed', 'fast', 'slow', 'quick', 'rapid', 'gradual', 'sudden', 'immediate', 'instant',
+    'strength', 'strong', 'weak', 'powerful', 'mighty', 'fragile', 'delicate', 'tough',
+    'quantity', 'many', 'few', 'several', 'some', 'none', 'all', 'every', 'each', 'both',
+    'frequency', 'always', 'never', 'sometimes', 'often', 'rarely', 'usually', 'occasionally',
+    'probability', 'certain', 'possible', 'likely', 'unlikely', 'definite', 'maybe', 'perhaps',
+    'comparison', 'same', 'different', 'similar', 'identical', 'unique', 'special', 'ordinary',
+    'relationship', 'friend', 'family', 'love', 'hate', 'like', 'dislike', 'care', 'ignore',
+    'emotion', 'happy', 'sad', 'angry', 'excited', 'worried', 'scared', 'surprised', 'confused',
+    'thought', 'think', 'believe', 'know', 'understand', 'remember', 'forget', 'imagine', 'dream',
+    'action', 'do', 'make', 'create', 'build', 'destroy', 'break', 'fix', 'repair', 'clean',
+    'movement', 'walk', 'run', 'jump', 'climb', 'swim', 'fly', 'drive', 'ride', 'carry',
+    'communication', 'say', 'tell', 'speak', 'talk', 'ask', 'answer', 'reply', 'respond',
+    'sensation', 'see', 'hear', 'feel', 'touch', 'taste', 'smell', 'look', 'watch', 'listen'
+})
+
+
+def tokenize(text):
+    """The words of a comment that count towards the word cloud"""
+    if not text:
+        return []
+    words = PUNCTUATION.sub('', text.lower()).split()
+    return [word for word in words if word not in STOP_WORDS and 2 < len(word) <= MAX_TERM_LENGTH]
+
+
+def iter_terms(comments):
+    """Stream the words of many comments, one comment in memory at a time"""
+    for comment in comments:
+        yield from tokenize(comment)
+
+
+def generate_wordcloud_data():
+    """Count the words of every review comment from scratch"""
+    comments = Review.objects.values_list('comment', flat=True).iterator(chunk_size=CHUNK_SIZE)
+    return Counter(iter_terms(comments)) or None
+
+
+def term_changes(old_text, new_text):
+    """Per word, how much its count changes when ``old_text`` becomes ``new_text``"""
+    changes = Counter(tokenize(new_text))
+    changes.subtract(tokenize(old_text))
+    return {term: change for term, change in changes.items() if change}
+
+
+def review_day(created_at):
+    """The local day a review belongs to"""
+    return timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+
+
+def _apply_changes(model, changes, **bucket):
+    by_change = {}
+    for term, change in changes.items():
+        by_change.setdefault(change, []).append(term)
+    
+    rows = model.objects.filter(**bucket)
+    # Rows start at 0 and every change is an in-database increment, so
+    # concurrent saves of different reviews never overwrite each other
+    model.objects.bulk_create(
+        [model(term=term, count=0, **bucket) for term, change in changes.items() if change > 0],
+        ignore_conflicts=True,
+    )
+    for change, terms in by_change.items():
+        rows.filter(term__in=terms).update(count=F('count') + change)
+    rows.filter(term__in=changes, count__lte=0).delete()
+
+
+def update_review_terms(old, new):
+    """Apply one review being added, edited or removed to the term tables.
+
+    ``old`` and ``new`` are the review's ``(disease_id, day, comment)`` before
+    and after the change, or None when it didn't / no longer exists.
+    """
+    old_disease, old_day, old_text = old or (None, None, None)
+    new_disease, new_day, new_text = new or (None, None, None)
+    
+    updates = [(ReviewTerm, term_changes(old_text, new_text), {})]
+    if old and new and (old_disease, old_day) == (new_disease, new_day):
+        updates.append((DailyReviewTerm, term_changes(old_text, new_text),
+                        {'disease_id': new_disease, 'day': new_day}))
+    else:
+        if old:
+            updates.append((DailyReviewTerm, term_changes(old_text, None), {'disease_id': old_disease, 'day': old_day}))
+        if new:
+            updates.append((DailyReviewTerm, term_changes(None, new_text), {'disease_id': new_disease, 'day': new_day}))
+    
+    updates = [update for update in updates if update[1]]
+    if not updates:
+        return
+    with transaction.atomic():
+        for model, changes, bucket in updates:
+            _apply_changes(model, changes, **bucket)
+
+
+def is_windowed(disease=None, start=None, end=None):
+    return disease is not None or start is not None or end is not None
+
+
+def daily_terms(disease=None, start=None, end=None):
+    """The daily buckets of one disease (or all) between two days, inclusive"""
+    buckets = DailyReviewTerm.objects.all()
+    if disease is not None:
+        buckets = buckets.filter(disease=disease)
+    if start is not None:
+        buckets = buckets.filter(day__gte=start)
+    if end is not None:
+        buckets = buckets.filter(day__lte=end)
+    return buckets
+
+
+def top_terms(limit=100, disease=None, start=None, end=None):
+    """The ``limit`` most frequent words as an ordered {word: count} dict"""
+    if not is_windowed(disease, start, end):
+        return dict(ReviewTerm.objects.order_by('-count', 'term').values_list('term', 'count')[:limit])
+    terms = daily_terms(disease, start, end).values('term').annotate(total=Sum('count'))
+    return dict(terms.order_by('-total', 'term').values_list('term', 'total')[:limit])
+
+
+def term_totals(disease=None, start=None, end=None):
+    """Total and distinct word counts"""
+    if not is_windowed(disease, start, end):
+        totals = ReviewTerm.objects.aggregate(total=Sum('count'), unique=Count('id'))
+    else:
+        totals = daily_terms(disease, start, end).aggregate(total=Sum('count'), unique=Count('term', distinct=True))
+    return totals['total'] or 0, totals['unique']
+
+
+def count_daily_terms():
+    """Word counts per (disease id, day, word) over every review"""
+    counts = Counter()
+    rows = Review.objects.values_list('disease_id', 'created_at', 'comment').iterator(chunk_size=CHUNK_SIZE)
+    for disease_id, created_at, comment in rows:
+        day = review_day(created_at)
+        for term in tokenize(comment):
+            counts[disease_id, day, term] += 1
+    return counts
+
+
+def rebuild_review_terms():
+    """Recount the term tables from every comment and return the number of distinct words"""
+    word_freq = generate_wordcloud_data() or {}
+    daily = count_daily_terms()
+    with transaction.atomic():
+        ReviewTerm.objects.all().delete()
+        ReviewTerm.objects.bulk_create(
+            [ReviewTerm(term=term, count=count) for term, count in word_freq.items()],
+            batch_size=1000,
+        )
+        DailyReviewTerm.objects.all().delete()
+        DailyReviewTerm.objects.bulk_create(
+            [DailyReviewTerm(disease_id=disease_id, day=day, term=term, count=count)
+             for (disease_id, day, term), count in daily.items()],
+            batch_size=1000,
+        )
+    return len(word_freq)
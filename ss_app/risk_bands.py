@@ -0,0 +1,143 @@
+"""
+Table-driven mapping of model output to low/medium/high risk.
+
+A band table has one side for when the model predicts the condition (class 1)
+and one for any other prediction. Each side lists ``(threshold, band)`` rows
+with descending thresholds: a prediction gets the first band whose threshold
+its confidence (%) is strictly above, or the last band when it is above none.
+The default table reproduces the original rules::
+
+    predicts 1: > 80 high, > 60 medium, otherwise low
+    predicts 0: > 90 low,  > 70 medium, otherwise high
+
+Per disease and level the threshold comes from, in order of precedence, the
+disease's ``RiskCategory`` row for that level, ``spec['risk_bands']`` or the
+default. Tables are applied with NumPy to whole arrays of predictions at once.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger('ss_app.risk_bands')
+
+DEFAULT_RISK_BANDS = {
+    'positive': [(80, 'high'), (60, 'medium'), (0, 'low')],
+    'negative': [(90, 'low'), (70, 'medium'), (0, 'high')],
+}
+
+# Seconds a disease's table is reused before RiskCategory is read again. Saves
+# in this process invalidate it immediately; other workers pick changes up
+# within this interval.
+RISK_BANDS_TTL = 60
+
+
+class RiskBands:
+    """A per-disease band table, see the module docstring"""
+
+    def __init__(self, positive, negative, source='default'):
+        self.source = source
+        self.sides = {}
+        for side, rows in (('positive', positive), ('negative', negative)):
+            rows = sorted(rows, key=lambda row: row[0], reverse=True)
+            self.sides[side] = (
+                np.array([threshold for threshold, band in rows], dtype=np.float64),
+                np.array([band for threshold, band in rows], dtype=object),
+            )
+        # Part of the prediction cache key, so retuning bands invalidates results
+        self.key = hashlib.sha1(repr(self.table()).encode()).hexdigest()[:8]
+
+    @classmethod
+    def from_table(cls, table, source='spec'):
+        return cls(table['positive'], table['negative'], source=source)
+
+    def table(self):
+        return {
+            side: [(float(threshold), str(band)) for threshold, band in zip(*self.sides[side])]
+            for side in ('positive', 'negative')
+        }
+
+    def _side(self, side, confidences):
+        thresholds, bands = self.sides[side]
+        # Number of thresholds the confidence is not strictly above = row index
+        index = (confidences[:, np.newaxis] <= thresholds[np.newaxis, :]).sum(axis=1)
+        return bands[np.minimum(index, len(bands) - 1)]
+
+    def apply(self, predictions, confidences):
+        """Bands for arrays of predicted classes and confidences (%)"""
+        predictions = np.asarray(predictions)
+        confidences = np.asarray(confidences, dtype=np.float64)
+        return np.where(
+            predictions == 1,
+            self._side('positive', confidences),
+            self._side('negative', confidences),
+        )
+
+    def band(self, prediction, confidence):
+        return str(self.apply([prediction], [confidence])[0])
+
+
+def risk_bands_from_categories(categories, base=DEFAULT_RISK_BANDS):
+    """Table from ``RiskCategory`` rows, or None when they carry no thresholds.
+
+    Each row's threshold replaces that level's row of ``base`` on its side
+    (levels ``base`` lacks are added), so overriding one level keeps the
+    others.
+    """
+    table = {}
+    overridden = False
+    for side, field in (('positive', 'positive_above'), ('negative', 'negative_above')):
+        overrides = {category.risk_level: getattr(category, field) for category in categories
+                     if getattr(category, field) is not None}
+        levels = {band for threshold, band in base[side]}
+        table[side] = ([(overrides.get(band, threshold), band) for threshold, band in base[side]]
+                       + [(threshold, level) for level, threshold in overrides.items() if level not in levels])
+        overridden = overridden or bool(overrides)
+    if not overridden:
+        return None
+    return RiskBands.from_table(table, source='database')
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_risk_bands(spec):
+    """Uncached lookup of the table for a predictor spec"""
+    from .models import RiskCategory
+
+    if spec.get('disease_id') is not None:
+        categories = RiskCategory.objects.filter(disease_id=spec['disease_id'])
+    else:
+        categories = RiskCategory.objects.filter(disease__name__iexact=spec.get('name', ''))
+    base = spec.get('risk_bands') or DEFAULT_RISK_BANDS
+    bands = risk_bands_from_categories(list(categories), base)
+    if bands is None and spec.get('risk_bands'):
+        bands = RiskBands.from_table(spec['risk_bands'])
+    return bands or RiskBands.from_table(DEFAULT_RISK_BANDS, source='default')
+
+
+def risk_bands_for(slug, spec):
+    """The cached band table for one disease"""
+    now = time.monotonic()
+    entry = _cache.get(slug)
+    if entry is not None and now - entry[1] < RISK_BANDS_TTL:
+        return entry[0]
+
+    try:
+        bands = load_risk_bands(spec)
+    except Exception as e:
+        # No database (e.g. offline scripts): fall back without caching
+        logger.warning('Could not load risk bands for %s, using the spec or default table: %s', slug, e)
+        return entry[0] if entry else RiskBands.from_table(spec.get('risk_bands') or DEFAULT_RISK_BANDS)
+    with _cache_lock:
+        _cache[slug] = (bands, now)
+    return bands
+
+
+def invalidate_risk_bands(sender=None, **kwargs):
+    """Drop cached tables; connected to RiskCategory saves and deletes"""
+    with _cache_lock:
+        _cache.clear()
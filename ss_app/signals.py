@@ -0,0 +1,47 @@
+"""
+Signal handlers that keep derived tables in step with the models they summarise.
+
+Connected in ``SsAppConfig.ready``.
+"""
+from .dashboard_stats import apply_stat_changes, stat_changes
+from .review_terms import review_day, update_review_terms
+
+
+def remember_review(sender, instance, update_fields=None, **kwargs):
+    """Keep what is stored for the review so the post_save handler can tell what changed"""
+    if update_fields is not None and not {'comment', 'disease', 'disease_id', 'rating'} & set(update_fields):
+        instance._previous_review = (review_terms_source(instance), instance.rating)
+    elif instance.pk:
+        stored = sender.objects.filter(pk=instance.pk).values_list('disease_id', 'created_at', 'comment', 'rating').first()
+        instance._previous_review = ((stored[0], review_day(stored[1]), stored[2]), stored[3]) if stored else None
+    else:
+        instance._previous_review = None
+
+
+def review_terms_source(review):
+    return review.disease_id, review_day(review.created_at), review.comment
+
+
+def review_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_review', None)
+    current = (review_terms_source(instance), instance.rating)
+    update_review_terms(previous[0] if previous else None, current[0])
+    if created:
+        apply_stat_changes(stat_changes(instance, 1))
+    elif previous and previous[1] != instance.rating:
+        apply_stat_changes({f'reviews:rating:{previous[1]}': -1, f'reviews:rating:{instance.rating}': 1})
+    instance._previous_review = current
+
+
+def review_deleted(sender, instance, **kwargs):
+    update_review_terms(review_terms_source(instance), None)
+    apply_stat_changes(stat_changes(instance, -1))
+
+
+def counted_object_saved(sender, instance, created, **kwargs):
+    if created:
+        apply_stat_changes(stat_changes(instance, 1))
+
+
+def counted_object_deleted(sender, instance, **kwargs):
+    apply_stat_changes(stat_changes(instance, -1))
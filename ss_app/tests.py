@@ -1,7 +1,44 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest import mock
+
+import joblib
+import numpy as np
+import pandas as pd
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.contrib.auth.models import User
-from .models import Disease, Prediction, Review
-from ....princy.SymptoScan.Bio_app.ml_models import predictor
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from sklearn.ensemble import RandomForestClassifier
+from .models import AIChatLog, Disease, DiseaseFormField, Prediction, Review, RiskCategory, TrainingJob
+from .benchmarks import compare, run_benchmarks, seed
+from .dashboard_stats import dashboard_stats, reconcile_dashboard_stats
+from .compiled_forest import CompiledForest, compiled_path, export_forest
+from .inference_log import JSONFormatter, inference_log
+from .metrics import PREDICTION_STAGE_SECONDS, registry as metrics_registry
+from .prediction_cache import PredictionCache, prediction_cache
+from .profiling import list_reports
+from .query_budget import QueryBudgetExceeded, QueryBudgetMiddleware, query_budget
+from .review_terms import generate_wordcloud_data, rebuild_review_terms, term_totals, top_terms
+from .risk_bands import DEFAULT_RISK_BANDS, RiskBands, invalidate_risk_bands, risk_bands_for
+from .ml_models import ModelNotAvailable, PredictorRegistry, TabularPredictor, predictor_registry
+from .wordcloud_images import needs_render, render, scope_for
+from .uploaded_models import InvalidUpload, predictor_for_disease, prepare_uploaded_model
+from .training import list_versions, prune_versions, publish_version, train_disease
+
+# A 'predictions' cache for tests that share prediction results between workers
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'predictions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'predictions'},
+}
 
 class DiseaseModelTest(TestCase):
     def setUp(self):
@@ -41,29 +78,899 @@ class PredictionModelTest(TestCase):
         self.assertEqual(prediction.risk_level, 'medium')
         self.assertEqual(prediction.confidence_score, 85.5)
 
+@override_settings(CACHES=LOCMEM_CACHES)
 class MLModelTest(TestCase):
+    def setUp(self):
+        prediction_cache.clear()
+    
     def test_diabetes_prediction(self):
-        risk_level, confidence = predictor.predict_diabetes(
-            age=45,
+        risk_level, confidence = predictor_registry.get('diabetes').predict(
             glucose=140,
             blood_pressure=90,
             bmi=28,
-            insulin=120,
-            family_history=True
+            age=45,
+            pregnancies=2,
+            insulin=120
         )
-        self.assertIn(risk_level, ['Low', 'Medium', 'High'])
+        self.assertIn(risk_level, ['low', 'medium', 'high'])
         self.assertGreaterEqual(confidence, 0)
         self.assertLessEqual(confidence, 100)
     
     def test_heart_disease_prediction(self):
-        risk_level, confidence = predictor.predict_heart_disease(
+        risk_level, confidence = predictor_registry.get('heart_disease').predict(
             age=55,
+            sex=1,
             chest_pain=2,
             blood_pressure=140,
             cholesterol=250,
-            heart_rate=150,
-            exercise_angina=True
+            max_heart_rate=150
         )
-        self.assertIn(risk_level, ['Low', 'Medium', 'High'])
+        self.assertIn(risk_level, ['low', 'medium', 'high'])
         self.assertGreaterEqual(confidence, 0)
         self.assertLessEqual(confidence, 100)
+
+    def test_prediction_walks_the_forest_once(self):
+        predictor = predictor_registry.get('diabetes')
+        values = dict(glucose=140, blood_pressure=90, bmi=28, age=45, pregnancies=2, insulin=120)
+        
+        with mock.patch.object(predictor.model, 'predict', wraps=predictor.model.predict) as predict, \
+                mock.patch.object(predictor.model, 'predict_proba', wraps=predictor.model.predict_proba) as predict_proba:
+            risk_level, confidence, timings = predictor.predict_with_timings(**values)
+        
+        predict.assert_not_called()
+        self.assertEqual(predict_proba.call_count, 1)
+        self.assertEqual((risk_level, confidence), predictor.predict(**values))
+        self.assertEqual(set(timings), {'features_ms', 'inference_ms', 'risk_banding_ms', 'total_ms', 'cache_hit'})
+        self.assertFalse(timings['cache_hit'])
+    
+    def test_repeat_prediction_is_served_from_cache(self):
+        predictor = predictor_registry.get('diabetes')
+        values = dict(glucose=140, blood_pressure=90, bmi=28, age=45, pregnancies=2, insulin=120)
+        first = predictor.predict(**values)
+        
+        with mock.patch.object(predictor.model, 'predict_proba') as predict_proba:
+            risk_level, confidence, timings = predictor.predict_with_timings(**dict(values, bmi=28.001))
+        
+        predict_proba.assert_not_called()
+        self.assertTrue(timings['cache_hit'])
+        self.assertEqual((risk_level, confidence), first)
+        self.assertEqual(prediction_cache.stats()['hits'], 1)
+        
+        # Reloading the model drops its cached results
+        predictor.load()
+        self.assertEqual(prediction_cache.stats()['size'], 0)
+    
+    def test_sampled_prediction_is_logged_as_one_structured_record(self):
+        predictor = predictor_registry.get('diabetes')
+        values = dict(glucose=140, blood_pressure=90, bmi=28, age=45, pregnancies=2, insulin=120)
+        
+        with mock.patch.object(inference_log, 'sample_rate', 0.0), \
+                mock.patch.object(inference_log, 'log') as log:
+            predictor.predict(**values)
+        log.assert_not_called()
+        
+        prediction_cache.clear()
+        with mock.patch.object(inference_log, 'sample_rate', 1.0), \
+                self.assertLogs('ss_app.inference', level='INFO') as logs:
+            risk_level, confidence = predictor.predict(**values)
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(JSONFormatter().format(logs.records[0]))
+        self.assertEqual(record['disease'], 'diabetes')
+        self.assertEqual(record['model_version'], predictor.model_version)
+        self.assertEqual(record['features'], [140, 90, 28, 45, 2, 120])
+        self.assertEqual((record['risk_level'], record['confidence']), (risk_level, round(confidence, 4)))
+        self.assertEqual(len(record['proba']), 2)
+
+    def test_batch_prediction_matches_single_predictions(self):
+        predictor = predictor_registry.get('diabetes')
+        rows = [
+            dict(glucose=140, blood_pressure=90, bmi=28, age=45, pregnancies=2, insulin=120),
+            dict(glucose=85, blood_pressure=66, bmi=26.6, age=31, pregnancies=1, insulin=0),
+        ]
+        expected = [predictor.predict(**row) for row in rows]
+        
+        self.assertEqual(predictor.predict_batch(rows), expected)
+        self.assertEqual(predictor.predict_batch(pd.DataFrame(rows)), expected)
+        self.assertEqual(predictor.predict_batch([list(row.values()) for row in rows]), expected)
+        
+        self.assertEqual(predictor.predict_batch([]), [])
+        self.assertEqual(predictor.predict_batch(pd.DataFrame(columns=list(rows[0]))), [])
+        with self.assertRaises(ValueError):
+            predictor.predict_batch([[1, 2, 3]])
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CompiledForestTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        rng = np.random.RandomState(0)
+        self.X = rng.normal(size=(200, 4))
+        y = (self.X[:, 0] + self.X[:, 1] ** 2 > 0.5).astype(int)
+        self.forest = RandomForestClassifier(n_estimators=10, random_state=0).fit(self.X, y)
+    
+    def test_compiled_forest_matches_sklearn(self):
+        directory = export_forest(self.forest, os.path.join(self.tmpdir, 'toy.forest'))
+        compiled = CompiledForest.load(directory)
+        
+        np.testing.assert_array_equal(compiled.predict_proba(self.X), self.forest.predict_proba(self.X))
+        np.testing.assert_array_equal(compiled.predict(self.X), self.forest.predict(self.X))
+        np.testing.assert_array_equal(compiled.apply(self.X[:5]), self.forest.apply(self.X[:5]) + compiled.roots)
+    
+    def test_missing_values_take_the_same_path_as_in_sklearn(self):
+        X = self.X.copy()
+        X[::3, 0] = np.nan
+        trained_with_nan = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, self.X[:, 1] > 0)
+        for i, forest in enumerate((self.forest, trained_with_nan)):
+            compiled = CompiledForest.load(export_forest(forest, os.path.join(self.tmpdir, f'{i}.forest')))
+            np.testing.assert_array_equal(compiled.predict_proba(X), forest.predict_proba(X))
+        
+        with self.assertRaises(ValueError):
+            compiled.predict_proba(np.where(np.isnan(X), np.inf, X))
+        # Exports from before missing-value routing refuse NaN rather than guess
+        compiled.missing_go_to_left = None
+        with self.assertRaises(ValueError):
+            compiled.predict_proba(X)
+        compiled.predict_proba(self.X)
+    
+    def test_export_is_readable_by_other_users_under_the_umask(self):
+        umask = os.umask(0o022)
+        try:
+            directory = export_forest(self.forest, os.path.join(self.tmpdir, 'toy.forest'))
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o755)
+    
+    def test_predictor_prefers_fresh_compiled_model(self):
+        model_path = os.path.join(self.tmpdir, 'toy_model.pkl')
+        joblib.dump(self.forest, model_path)
+        spec = {'name': 'Toy', 'model_path': model_path,
+                'features': [(f'f{i}', f'f{i}') for i in range(4)]}
+        
+        self.assertNotIsInstance(TabularPredictor('toy', spec).model, CompiledForest)
+        
+        export_forest(self.forest, compiled_path(model_path), source_path=model_path)
+        self.assertIsInstance(TabularPredictor('toy', spec).model, CompiledForest)
+        
+        # Replacing the pickle makes the old export stale
+        joblib.dump(RandomForestClassifier(n_estimators=2).fit(self.X, self.X[:, 0] > 0), model_path)
+        self.assertNotIsInstance(TabularPredictor('toy', spec).model, CompiledForest)
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PredictionCacheTest(TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = PredictionCache(maxsize=2, decimals=1)
+        cache.set(cache.key('a', [1.0]), 'one')
+        cache.set(cache.key('a', [2.0]), 'two')
+        self.assertEqual(cache.get(cache.key('a', [1.04])), 'one')
+        
+        cache.set(cache.key('b', [3.0]), 'three')
+        
+        self.assertIsNone(cache.get(cache.key('a', [2.0])))
+        self.assertEqual(cache.stats(), {'size': 2, 'maxsize': 2, 'hits': 1, 'shared_hits': 0, 'misses': 1, 'evictions': 1})
+        
+        cache.invalidate('a')
+        self.assertIsNone(cache.get(cache.key('a', [1.0])))
+        self.assertEqual(cache.get(cache.key('b', [3.0])), 'three')
+    
+    def test_results_are_shared_between_processes_per_model_version(self):
+        worker_a = PredictionCache(alias='predictions')
+        worker_b = PredictionCache(alias='predictions')
+        worker_a.set(worker_a.key('diabetes', [140.0, 90.0], 'v1'), ('high', 85.0))
+        
+        self.assertEqual(worker_b.get(worker_b.key('diabetes', [140.0, 90.0], 'v1')), ('high', 85.0))
+        self.assertEqual(worker_b.stats()['shared_hits'], 1)
+        # A retrained model has a new version and never sees the old result
+        self.assertIsNone(worker_b.get(worker_b.key('diabetes', [140.0, 90.0], 'v2')))
+
+    def test_clear_retires_shared_predictions_but_not_other_keys(self):
+        from django.core.cache import caches
+        
+        caches['predictions'].set('session:abc', 'logged in')
+        worker_a = PredictionCache(alias='predictions')
+        key = worker_a.key('diabetes', [140.0, 90.0], 'v1')
+        worker_a.set(key, ('high', 85.0))
+        worker_a.clear()
+        
+        self.assertEqual(caches['predictions'].get('session:abc'), 'logged in')
+        self.assertIsNone(worker_a.get(key))
+        self.assertIsNone(PredictionCache(alias='predictions').get(key))
+    
+    def test_batches_use_one_shared_cache_round_trip(self):
+        worker_a = PredictionCache(alias='predictions')
+        worker_b = PredictionCache(alias='predictions')
+        keys = [worker_a.key('diabetes', [float(value)], 'v1') for value in range(3)]
+        worker_a.set_many([(keys[0], ('low', 60.0)), (keys[2], ('high', 90.0))])
+        
+        with mock.patch.object(worker_b.shared, 'get_many', wraps=worker_b.shared.get_many) as get_many:
+            self.assertEqual(worker_b.get_many(keys), [('low', 60.0), None, ('high', 90.0)])
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual((worker_b.stats()['shared_hits'], worker_b.stats()['misses']), (2, 1))
+        # Now served from worker_b's own LRU
+        self.assertEqual(worker_b.get_many(keys[:1]), [('low', 60.0)])
+        self.assertEqual(worker_b.stats()['hits'], 1)
+
+class PredictorRegistryTest(TestCase):
+    def test_predictor_is_built_once_on_first_use(self):
+        calls = []
+        registry = PredictorRegistry()
+        registry.register('test', lambda: calls.append(1) or object())
+        
+        self.assertFalse(registry.is_loaded('test'))
+        self.assertEqual(calls, [])
+        
+        first = registry.get('test')
+        self.assertIs(registry.get('test'), first)
+        self.assertTrue(registry.is_loaded('test'))
+        self.assertEqual(calls, [1])
+    
+    def test_unknown_disease_raises_key_error(self):
+        with self.assertRaises(KeyError):
+            PredictorRegistry().get('unknown')
+
+class TabularPredictorTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        settings_override = override_settings(CACHES=LOCMEM_CACHES, MODEL_ARTIFACT_ROOT=self.tmpdir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        csv_path = os.path.join(self.tmpdir, 'toy.csv')
+        with open(csv_path, 'w') as f:
+            f.write('Score,Smoker,Label\n')
+            for i in range(40):
+                f.write(f"{i},{'yes' if i % 2 else 'no'},{int(i >= 20)}\n")
+        self.spec = {
+            'name': 'Toy',
+            'csv_path': csv_path,
+            'target': 'Label',
+            'features': [('score', 'Score'), ('smoker', 'Smoker')],
+            'categorical': {'Smoker': {'no': 0, 'yes': 1}},
+            'model_params': {'n_estimators': 10},
+        }
+    
+    def test_predictor_never_trains(self):
+        with self.assertRaises(ModelNotAvailable):
+            TabularPredictor('toy', self.spec)
+    
+    def test_new_disease_is_served_from_its_published_artifact(self):
+        meta = train_disease('toy', self.spec, n_jobs=2)
+        self.assertEqual(meta['params']['n_estimators'], 10)
+        self.assertEqual(meta['benchmark']['fit_n_jobs'], 2)
+        self.assertGreater(meta['benchmark']['inference']['p99_ms'], 0)
+        model = joblib.load(os.path.join(self.tmpdir, 'toy', meta['version'], 'model.pkl'))
+        self.assertIsNone(model.n_jobs)
+        self.assertEqual([f['column'] for f in meta['features']], ['Score', 'Smoker'])
+        self.assertIn('roc_auc', meta['metrics'])
+        
+        registry = PredictorRegistry()
+        registry.register_spec('toy', self.spec)
+        predictor = registry.get('toy')
+        self.assertIsInstance(predictor.model, CompiledForest)
+        self.assertEqual(predictor.artifact, os.path.join(self.tmpdir, 'toy', meta['version']))
+        
+        risk_level, confidence = predictor.predict(score=35, smoker='yes')
+        self.assertIn(risk_level, ['low', 'medium', 'high'])
+    
+    def test_published_version_is_hot_reloaded(self):
+        first = train_disease('toy', self.spec)
+        registry = PredictorRegistry()
+        registry.register_spec('toy', self.spec)
+        old = registry.get('toy')
+        
+        second = train_disease('toy', self.spec, params={'n_estimators': 5})
+        self.assertTrue(old.has_changed())
+        with override_settings(PREDICTOR_RELOAD_INTERVAL=0.001):
+            time.sleep(0.01)
+            # The check hands the reload to a background thread and keeps serving the old model
+            self.assertIs(registry.get('toy'), old)
+            thread = registry._reloading.get('toy')
+            if thread:
+                thread.join()
+        
+        new = registry.get('toy')
+        self.assertIsNot(new, old)
+        self.assertTrue(new.artifact.endswith(second['version']))
+        self.assertTrue(old.artifact.endswith(first['version']))
+        # In-flight requests holding the old predictor can still finish
+        old.predict(score=35, smoker='yes')
+        self.assertFalse(new.has_changed())
+    
+    @mock.patch.dict('ss_app.training.COMPACTION_GRID', {'n_estimators': [2, 10], 'max_depth': [1, 2]}, clear=True)
+    def test_compaction_records_the_chosen_forest(self):
+        meta = train_disease('toy', self.spec, compact=0.05)
+        compaction = meta['compaction']
+        self.assertLessEqual(compaction['chosen_nodes'], compaction['baseline_nodes'])
+        self.assertEqual(meta['params'], compaction['chosen_params'])
+        for name, value in compaction['baseline_metrics'].items():
+            self.assertGreaterEqual(compaction['chosen_metrics'][name], value - 0.05)
+    
+    def test_unpublished_versions_are_not_served_and_old_ones_are_pruned(self):
+        first = train_disease('toy', self.spec)
+        second = train_disease('toy', self.spec, publish=False)
+        self.assertEqual(TabularPredictor('toy', self.spec).artifact.rsplit(os.sep, 1)[1], first['version'])
+        
+        publish_version('toy', second['version'])
+        third = train_disease('toy', self.spec, publish=False)
+        # The published version survives pruning even when it is not the newest
+        self.assertEqual(prune_versions('toy', keep=1), [first['version']])
+        self.assertEqual(list_versions('toy'), [second['version'], third['version']])
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PredictDiseaseViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='patient', password='testpass123')
+        Disease.objects.create(
+            name="Diabetes",
+            description="Test description",
+            symptoms="Test symptoms",
+            prevention="Test prevention"
+        )
+        self.client.login(username='patient', password='testpass123')
+    
+    def test_prediction_is_saved(self):
+        response = self.client.post(reverse('predict_disease', args=['diabetes']), {
+            'glucose': 140, 'blood_pressure': 90, 'bmi': 28,
+            'age': 45, 'pregnancies': 2, 'insulin': 120,
+        })
+        self.assertEqual(response.status_code, 200)
+        prediction = Prediction.objects.get(user=self.user)
+        self.assertIn(prediction.risk_level, ['low', 'medium', 'high'])
+    
+    def test_batch_endpoint_scores_valid_rows_and_reports_errors(self):
+        rows = [
+            {'glucose': 140, 'blood_pressure': 90, 'bmi': 28, 'age': 45, 'pregnancies': 2, 'insulin': 120},
+            {'glucose': 'abc'},
+            {'glucose': 85, 'blood_pressure': 66, 'bmi': 26.6, 'age': 31, 'pregnancies': 1, 'insulin': 0},
+        ]
+        response = self.client.post(
+            reverse('api_predict_batch', args=['diabetes']),
+            data=json.dumps({'rows': rows}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['scored'], data['failed']), (2, 1))
+        self.assertIn('errors', data['results'][1])
+        self.assertEqual(Prediction.objects.filter(user=self.user).count(), 2)
+    
+    def test_batch_endpoint_reports_a_batch_with_no_valid_rows(self):
+        response = self.client.post(
+            reverse('api_predict_batch', args=['diabetes']),
+            data=json.dumps({'rows': [{'glucose': 'abc'}, 'not a row']}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['scored'], data['failed']), (0, 2))
+        self.assertTrue(all('errors' in result for result in data['results']))
+        self.assertFalse(Prediction.objects.exists())
+
+    def test_batch_endpoint_rejects_malformed_body(self):
+        response = self.client.post(
+            reverse('api_predict_batch', args=['diabetes']),
+            data='not json', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_endpoint_requires_the_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='patient', password='testpass123')
+        url = reverse('api_predict_batch', args=['diabetes'])
+        body = json.dumps({'rows': [{'glucose': 140, 'blood_pressure': 90, 'bmi': 28,
+                                     'age': 45, 'pregnancies': 2, 'insulin': 120}]})
+        response = client.post(url, data=body, content_type='text/plain')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Prediction.objects.exists())
+
+        client.get(reverse('disease_detail', args=['diabetes']))
+        response = client.post(url, data=body, content_type='application/json',
+                               HTTP_X_CSRFTOKEN=client.cookies['csrftoken'].value)
+        self.assertEqual(response.status_code, 200)
+
+    def test_prediction_stages_are_exposed_as_metrics_to_admins_only(self):
+        metrics_registry.clear()
+        self.client.post(reverse('predict_disease', args=['diabetes']), {
+            'glucose': 140, 'blood_pressure': 90, 'bmi': 28,
+            'age': 45, 'pregnancies': 2, 'insulin': 120,
+        })
+        for stage in ('validation', 'inference', 'db_write', 'render'):
+            self.assertEqual(PREDICTION_STAGE_SECONDS.count(disease='diabetes', stage=stage), 1)
+        
+        response = self.client.get(reverse('admin_metrics'))
+        self.assertEqual(response.status_code, 302)
+        
+        User.objects.create_user(username='testadmin', password='testpass123')
+        self.client.login(username='testadmin', password='testpass123')
+        response = self.client.get(reverse('admin_metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertEqual(response['X-Metrics-Worker'], str(os.getpid()))
+        body = response.content.decode()
+        self.assertIn('# TYPE symptoscan_prediction_stage_seconds histogram', body)
+        self.assertIn('symptoscan_prediction_stage_seconds_count{disease="diabetes",stage="render"} 1', body)
+        self.assertIn('symptoscan_prediction_stage_seconds_bucket{disease="diabetes",stage="render",le="+Inf"} 1', body)
+        self.assertRegex(body, r'symptoscan_predictions_total\{disease="diabetes",risk_level="(low|medium|high)"\} 1')
+    
+    def test_metrics_are_labelled_by_the_resolved_disease_not_the_url(self):
+        toy = Disease.objects.create(name="Toy Fever", description="Test", symptoms="Test", prevention="Test")
+        DiseaseFormField.objects.create(disease=toy, field_name='score', field_label='Score', field_type='number')
+        metrics_registry.clear()
+        # Invalid inputs never reach the model, so none needs to exist
+        with mock.patch('ss_app.views.serves_predictions', return_value=True):
+            for url_name in ('toy_fever', 'toy', 'fev'):
+                self.client.post(reverse('predict_disease', args=[url_name]), {'score': 'abc'})
+        body = metrics_registry.render()
+        self.assertIn(f'disease="disease-{toy.pk}",reason="invalid_form"}} 3', body)
+        self.assertNotIn('disease="toy"', body)
+    
+    def test_invalid_form_redirects_back(self):
+        response = self.client.post(reverse('predict_disease', args=['diabetes']), {'glucose': 'abc'})
+        self.assertRedirects(response, reverse('disease_detail', args=['diabetes']), fetch_redirect_response=False)
+        self.assertFalse(Prediction.objects.exists())
+
+class UploadedDiseaseModelTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        settings_override = override_settings(CACHES=LOCMEM_CACHES, MODEL_ARTIFACT_ROOT=self.tmpdir,
+                                              MEDIA_ROOT=self.tmpdir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.disease = Disease.objects.create(
+            name="Toy Fever", description="Test", symptoms="Test", prevention="Test"
+        )
+        DiseaseFormField.objects.create(disease=self.disease, field_name='score', field_label='Score',
+                                        field_type='number', validation_rules={'min': 0}, order=1)
+        DiseaseFormField.objects.create(disease=self.disease, field_name='smoker', field_label='Smoker',
+                                        field_type='dropdown', options=['no', 'yes'], order=2)
+        # Fitted with the columns in a different order than the form
+        frame = pd.DataFrame({'smoker': [i % 2 for i in range(40)], 'score': list(range(40))})
+        self.model = RandomForestClassifier(n_estimators=5, random_state=0).fit(frame, [int(i >= 20) for i in range(40)])
+        
+        self.user = User.objects.create_user(username='patient', password='testpass123')
+        self.client.login(username='patient', password='testpass123')
+    
+    def upload(self, model):
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        self.disease.model_file = SimpleUploadedFile('toy.pkl', buffer.getvalue())
+        self.disease.save()
+    
+    def test_uploaded_model_is_compiled_and_served(self):
+        self.upload(self.model)
+        meta = prepare_uploaded_model(self.disease)
+        self.assertTrue(meta['compiled'])
+        self.assertEqual([f['column'] for f in meta['features']], ['smoker', 'score'])
+        
+        response = self.client.post(reverse('predict_disease', args=['toy_fever']), {'score': 35, 'smoker': 'yes'})
+        self.assertEqual(response.status_code, 200)
+        prediction = Prediction.objects.get(user=self.user, disease=self.disease)
+        
+        predictor = predictor_for_disease(self.disease)
+        self.assertIsInstance(predictor.model, CompiledForest)
+        self.assertEqual(predictor.model_version, meta['version'][len('upload-'):])
+        expected = self.model.predict_proba(pd.DataFrame({'smoker': [1], 'score': [35]}))[0].max() * 100
+        self.assertAlmostEqual(prediction.confidence_score, expected)
+    
+    def test_every_model_input_is_required(self):
+        DiseaseFormField.objects.filter(disease=self.disease, field_name='score').update(required=False)
+        self.upload(self.model)
+        prepare_uploaded_model(self.disease)
+        
+        response = self.client.post(reverse('predict_disease', args=['toy_fever']), {'score': '', 'smoker': 'yes'})
+        self.assertRedirects(response, reverse('disease_detail', args=['toy_fever']), fetch_redirect_response=False)
+        self.assertFalse(Prediction.objects.exists())
+    
+    def test_form_fields_edited_after_publishing_are_reported_not_served(self):
+        self.upload(self.model)
+        prepare_uploaded_model(self.disease)
+        DiseaseFormField.objects.filter(disease=self.disease, field_name='score').update(field_name='points')
+        
+        response = self.client.post(reverse('predict_disease', args=['toy_fever']), {'points': 35, 'smoker': 'yes'})
+        self.assertRedirects(response, reverse('disease_detail', args=['toy_fever']), fetch_redirect_response=False)
+        self.assertFalse(Prediction.objects.exists())
+        
+        User.objects.create_user(username='testadmin', password='testpass123')
+        self.client.login(username='testadmin', password='testpass123')
+        response = self.client.get(reverse('admin_disease_detail', args=[self.disease.pk]))
+        self.assertContains(response, 'no form field for score; form fields points are not model inputs')
+    
+    def test_model_that_does_not_match_the_form_fields_is_rejected(self):
+        self.upload(RandomForestClassifier(n_estimators=2).fit([[0, 1, 2], [1, 2, 3]], [0, 1]))
+        with self.assertRaises(InvalidUpload):
+            prepare_uploaded_model(self.disease)
+
+class TrainingJobTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        settings_override = override_settings(CACHES=LOCMEM_CACHES, MODEL_ARTIFACT_ROOT=self.tmpdir,
+                                              MEDIA_ROOT=self.tmpdir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.disease = Disease.objects.create(
+            name="Toy Fever", description="Test", symptoms="Test", prevention="Test"
+        )
+        DiseaseFormField.objects.create(disease=self.disease, field_name='score', field_label='Score',
+                                        field_type='number', order=1)
+        DiseaseFormField.objects.create(disease=self.disease, field_name='smoker', field_label='Smoker',
+                                        field_type='dropdown', options=['no', 'yes'], order=2)
+        rows = ''.join(f"{i},{'yes' if i % 2 else 'no'},{int(i >= 20)}\n" for i in range(40))
+        self.disease.csv_file = SimpleUploadedFile('toy.csv', ('score,smoker,label\n' + rows).encode())
+        self.disease.save()
+        
+        User.objects.create_user(username='testadmin', password='testpass123')
+        self.client.login(username='testadmin', password='testpass123')
+    
+    def test_queued_job_is_trained_by_the_worker_and_served(self):
+        response = self.client.post(reverse('admin_disease_train', args=[self.disease.id]))
+        self.assertRedirects(response, reverse('admin_disease_detail', args=[self.disease.id]),
+                             fetch_redirect_response=False)
+        job = TrainingJob.objects.get(disease=self.disease)
+        self.assertEqual(job.status, 'queued')
+        # A second request while the job is pending does not queue a duplicate
+        self.client.post(reverse('admin_disease_train', args=[self.disease.id]))
+        self.assertEqual(TrainingJob.objects.count(), 1)
+        
+        call_command('run_training_worker', '--once', '--n-jobs', '1', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), ('succeeded', 100))
+        self.assertIn('accuracy', job.metrics)
+        
+        predictor = predictor_for_disease(self.disease)
+        self.assertTrue(predictor.artifact.endswith(job.version))
+        self.assertIn(predictor.predict(score=35, smoker='yes')[0], ['low', 'medium', 'high'])
+        
+        response = self.client.get(reverse('admin_training_jobs', args=[self.disease.id]))
+        self.assertEqual(response.json()['jobs'][0]['version'], job.version)
+        response = self.client.get(reverse('admin_disease_detail', args=[self.disease.id]))
+        self.assertContains(response, job.version)
+    
+    def test_job_is_claimed_by_one_worker_only(self):
+        job = TrainingJob.objects.create(disease=self.disease)
+        self.assertEqual(TrainingJob.claim_next('worker-1').pk, job.pk)
+        self.assertIsNone(TrainingJob.claim_next('worker-2'))
+    
+    def test_job_of_a_killed_worker_is_reclaimed(self):
+        job = TrainingJob.objects.create(disease=self.disease)
+        TrainingJob.claim_next('worker-1')
+        # worker-1 reported progress recently, so the job is still its own
+        job.report(40, 'Fitting')
+        self.assertIsNone(TrainingJob.claim_next('worker-2'))
+        
+        # ...then was killed without a word
+        silent = timezone.now() - timedelta(seconds=301)
+        TrainingJob.objects.filter(pk=job.pk).update(heartbeat_at=silent)
+        job = TrainingJob.claim_next('worker-2')
+        self.assertEqual((job.worker, job.attempts, job.progress), ('worker-2', 2, 0))
+        
+        # A job that keeps killing its workers is given up on
+        TrainingJob.objects.filter(pk=job.pk).update(heartbeat_at=silent, attempts=3)
+        self.assertIsNone(TrainingJob.claim_next('worker-3'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.client.post(reverse('admin_disease_train', args=[self.disease.id]))
+        self.assertEqual(TrainingJob.objects.filter(status='queued').count(), 1)
+
+class RiskBandsTest(TestCase):
+    def setUp(self):
+        # Tables cached by earlier tests outlive their rolled-back rows
+        invalidate_risk_bands()
+    
+    @staticmethod
+    def original_risk_level(prediction, confidence):
+        if prediction == 1:
+            return 'high' if confidence > 80 else 'medium' if confidence > 60 else 'low'
+        return 'low' if confidence > 90 else 'medium' if confidence > 70 else 'high'
+    
+    def test_default_table_matches_the_original_rules(self):
+        bands = RiskBands.from_table(DEFAULT_RISK_BANDS)
+        confidences = np.concatenate([np.linspace(0, 100, 1001), [60, 70, 80, 90, np.nextafter(80, 100)]])
+        for prediction in (0, 1):
+            expected = [self.original_risk_level(prediction, c) for c in confidences]
+            self.assertEqual(list(bands.apply(np.full(len(confidences), prediction), confidences)), expected)
+    
+    def test_risk_categories_override_the_spec_and_are_reloaded_on_save(self):
+        disease = Disease.objects.create(name="Banded", description="", symptoms="", prevention="")
+        spec = {'name': 'Banded', 'risk_bands': {
+            'positive': [(50, 'high'), (0, 'medium')], 'negative': [(0, 'low')],
+        }}
+        self.assertEqual(risk_bands_for('banded', spec).band(1, 55), 'high')
+        
+        RiskCategory.objects.create(disease=disease, risk_level='high', tips='', positive_above=95)
+        RiskCategory.objects.create(disease=disease, risk_level='medium', tips='', positive_above=0)
+        bands = risk_bands_for('banded', spec)
+        self.assertEqual(bands.source, 'database')
+        self.assertEqual((bands.band(1, 96), bands.band(1, 90)), ('high', 'medium'))
+        # No negative thresholds in the database, so that side keeps the spec's
+        self.assertEqual(bands.band(0, 75), 'low')
+    
+    def test_database_errors_are_logged_and_fall_back_to_the_spec(self):
+        spec = {'name': 'Banded', 'risk_bands': {'positive': [(0, 'high')], 'negative': [(0, 'low')]}}
+        with mock.patch('ss_app.risk_bands.load_risk_bands', side_effect=RuntimeError('no such table')), \
+                self.assertLogs('ss_app.risk_bands', level='WARNING') as logs:
+            self.assertEqual(risk_bands_for('banded', spec).band(1, 10), 'high')
+        self.assertIn('no such table', logs.output[0])
+    
+    def test_overriding_one_level_keeps_the_others(self):
+        disease = Disease.objects.create(name="Banded", description="", symptoms="", prevention="")
+        RiskCategory.objects.create(disease=disease, risk_level='high', tips='', positive_above=85)
+        bands = risk_bands_for('banded', {'name': 'Banded'})
+        self.assertEqual(bands.table()['positive'], [(85.0, 'high'), (60.0, 'medium'), (0.0, 'low')])
+        self.assertEqual([bands.band(1, c) for c in (90, 82, 65, 30)], ['high', 'medium', 'medium', 'low'])
+        self.assertEqual(bands.table()['negative'], RiskBands.from_table(DEFAULT_RISK_BANDS).table()['negative'])
+
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        settings_override = override_settings(PROFILING_REPORT_DIR=self.tmpdir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        User.objects.create_user(username='testadmin', password='testpass123')
+        User.objects.create_user(username='patient', password='testpass123')
+    
+    def test_admin_header_profiles_the_request_and_report_is_viewable(self):
+        self.client.login(username='testadmin', password='testpass123')
+        response = self.client.get(reverse('admin_diseases'), HTTP_X_PROFILE='1')
+        report_id = response['X-Profile-Report']
+        
+        report = list_reports()[0]
+        self.assertEqual((report['id'], report['view'], report['reason']), (report_id, 'admin_diseases', 'header'))
+        self.assertGreater(report['sql_count'], 0)
+        self.assertTrue(report['top_functions'])
+        
+        response = self.client.get(reverse('admin_profile_detail', args=[report_id]))
+        self.assertContains(response, report['top_functions'][0]['function'])
+        response = self.client.get(reverse('admin_profile_download', args=[report_id, 'folded']))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('admin_profile_detail', args=['..etc']))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_header_is_ignored_for_other_users(self):
+        self.client.login(username='patient', password='testpass123')
+        response = self.client.get(reverse('user_predictions'), HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Report', response)
+        self.assertEqual(list_reports(), [])
+
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='patient', password='testpass123')
+        User.objects.create_user(username='testadmin', password='testpass123')
+    
+    def test_overrun_raises_and_reports_repeated_statement(self):
+        @query_budget(3)
+        def n_plus_one_view(request):
+            for disease_id in range(6):
+                Disease.objects.filter(id=disease_id).first()
+            return HttpResponse()
+        
+        def get_response(request):
+            middleware.process_view(request, n_plus_one_view, (), {})
+            return n_plus_one_view(request)
+        
+        with override_settings(QUERY_BUDGET_MODE='raise'):
+            middleware = QueryBudgetMiddleware(get_response)
+        with self.assertLogs('ss_app.query_budget', 'WARNING') as logs:
+            with self.assertRaisesRegex(QueryBudgetExceeded, 'ran 6 queries, over its budget of 3'):
+                middleware(RequestFactory().get('/'))
+        self.assertIn('Possible N+1', logs.output[0])
+    
+    def test_chat_history_and_reviews_stay_within_budget(self):
+        disease = Disease.objects.create(name='Diabetes', description='Test')
+        for index in range(10):
+            prediction = Prediction.objects.create(user=self.user, disease=disease, symptoms_data={},
+                                                   risk_level='high', confidence_score=90.0)
+            AIChatLog.objects.create(user=self.user, disease=disease, prediction=prediction,
+                                     conversation_id=f'conv-{index}', message='hi', response='Hello',
+                                     is_user_message=False)
+            AIChatLog.objects.create(user=self.user, disease=disease, prediction=prediction,
+                                     conversation_id=f'conv-{index}', message='more', response='Sure')
+            Review.objects.create(user=self.user, disease=disease, prediction=prediction,
+                                  rating=index % 5 + 1, comment='ok')
+        
+        self.client.login(username='patient', password='testpass123')
+        response = self.client.get(reverse('chat_history'))
+        self.assertEqual(len(response.context['chat_sessions']), 10)
+        self.assertEqual(response.context['chat_sessions'][0]['first_message'], 'Hello')
+        self.client.login(username='testadmin', password='testpass123')
+        response = self.client.get(reverse('admin_reviews'))
+        self.assertEqual(response.context['average_rating'], 3)
+
+
+class BenchmarkTest(TestCase):
+    def test_seeded_endpoints_are_measured(self):
+        ids = seed(users=3, predictions=10, reviews=4, chat_logs=6)
+        self.assertEqual(Review.objects.count(), 4)
+        
+        results = run_benchmarks(ids, requests=2, warmup=0,
+                                 only={'home', 'predict_disease', 'send_message', 'admin_dashboard'})
+        self.assertEqual([result['name'] for result in results],
+                         ['home', 'predict_disease', 'send_message', 'admin_dashboard'])
+        for result in results:
+            self.assertEqual(result['errors'], 0, result['name'])
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        
+        baseline = {'endpoints': [dict(results[0], p95_ms=results[0]['p95_ms'] * 2)]}
+        self.assertAlmostEqual(compare(results, baseline)['home']['p95_change'], -0.5)
+    
+    def test_run_writes_no_files_outside_a_scratch_directory(self):
+        ids = seed(users=2, predictions=4, reviews=3, chat_logs=2)
+        real = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, real)
+        with override_settings(WORDCLOUD_IMAGE_DIR=os.path.join(real, 'wordclouds'),
+                               PROFILING_REPORT_DIR=os.path.join(real, 'profiles'), PROFILING_SAMPLE_RATE=1.0):
+            results = run_benchmarks(ids, requests=1, warmup=0, only={'wordcloud', 'predict_disease'})
+        self.assertEqual([result['errors'] for result in results], [0, 0])
+        self.assertEqual(os.listdir(real), [])
+
+
+class ReviewTermTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='patient', password='testpass123')
+        disease = Disease.objects.create(name='Diabetes', description='Test')
+        prediction = Prediction.objects.create(user=user, disease=disease, symptoms_data={},
+                                               risk_level='low', confidence_score=80.0)
+        self.review_kwargs = {'user': user, 'disease': disease, 'prediction': prediction, 'rating': 5}
+    
+    def test_saves_and_deletes_keep_terms_in_step_with_a_rebuild(self):
+        first = Review.objects.create(comment='Accurate prediction, accurate advice!', **self.review_kwargs)
+        second = Review.objects.create(comment='The prediction was confusing', **self.review_kwargs)
+        self.assertEqual(top_terms(), {'accurate': 2, 'prediction': 2, 'advice': 1, 'confusing': 1})
+        
+        first.comment = 'Helpful advice'
+        first.save()
+        second.delete()
+        self.assertEqual(top_terms(), {'advice': 1, 'helpful': 1})
+        self.assertEqual(term_totals(), (2, 2))
+        
+        incremental = top_terms()
+        self.assertEqual(generate_wordcloud_data(), incremental)
+        rebuild_review_terms()
+        self.assertEqual(top_terms(), incremental)
+
+
+class WordCloudImageTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        settings_override = override_settings(WORDCLOUD_IMAGE_DIR=self.tmpdir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        user = User.objects.create_user(username='patient', password='testpass123')
+        disease = Disease.objects.create(name='Diabetes', description='Test')
+        prediction = Prediction.objects.create(user=user, disease=disease, symptoms_data={},
+                                               risk_level='low', confidence_score=80.0)
+        Review.objects.create(user=user, disease=disease, prediction=prediction, rating=5,
+                              comment='Accurate prediction and clear advice')
+        self.client.login(username='patient', password='testpass123')
+    
+    def test_page_links_the_rendered_image_which_is_served_with_an_etag(self):
+        image = render(top_terms())
+        with mock.patch('ss_app.views.render_in_background') as render_in_background:
+            response = self.client.get(reverse('wordcloud'))
+        render_in_background.assert_not_called()
+        url = reverse('wordcloud_image', args=[image['key']])
+        self.assertContains(response, f'src="{url}"')
+        
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['ETag'], f'"{image["key"]}"')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"{image["key"]}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(reverse('wordcloud_image', args=['0' * 16])).status_code, 404)
+    
+    def test_rerenders_only_past_the_drift_threshold(self):
+        with mock.patch('ss_app.views.render_in_background') as render_in_background:
+            response = self.client.get(reverse('wordcloud'))
+        render_in_background.assert_called_once()
+        self.assertContains(response, 'being generated')
+        
+        image = render({'accurate': 100, 'advice': 100})
+        self.assertFalse(needs_render(image, {'accurate': 101, 'advice': 100}))
+        self.assertTrue(needs_render(image, {'accurate': 100, 'advice': 100, 'slow': 20}))
+    
+    def test_disease_and_date_filters_sum_daily_buckets(self):
+        user = User.objects.get(username='patient')
+        asthma = Disease.objects.create(name='Asthma', description='Test')
+        prediction = Prediction.objects.create(user=user, disease=asthma, symptoms_data={},
+                                               risk_level='low', confidence_score=80.0)
+        old = Review.objects.create(user=user, disease=asthma, prediction=prediction, rating=2,
+                                    comment='Inhaler advice was confusing')
+        Review.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+        rebuild_review_terms()
+        Review.objects.create(user=user, disease=asthma, prediction=prediction, rating=4,
+                              comment='Inhaler advice helped')
+        
+        self.assertEqual(top_terms(disease=asthma), {'advice': 2, 'inhaler': 2, 'confusing': 1, 'helped': 1})
+        since = timezone.localdate() - timedelta(days=7)
+        self.assertEqual(top_terms(disease=asthma, start=since), {'advice': 1, 'helped': 1, 'inhaler': 1})
+        self.assertEqual(top_terms()['advice'], 3)
+        
+        with mock.patch('ss_app.views.render_in_background') as render_in_background:
+            response = self.client.get(reverse('wordcloud'), {'disease': asthma.pk, 'start_date': since.isoformat()})
+        render_in_background.assert_called_once_with({'advice': 1, 'helped': 1, 'inhaler': 1},
+                                                     f'disease-{asthma.pk}_{since}_end')
+        self.assertEqual((response.context['total_reviews'], response.context['unique_words']), (1, 3))
+        
+        response = self.client.get(reverse('wordcloud'), {'start_date': '2001-01-01', 'end_date': '2001-01-31'})
+        self.assertContains(response, 'No reviews match these filters.')
+    
+    @override_settings(WORDCLOUD_WINDOW_RENDERS_PER_HOUR=2)
+    def test_date_range_renders_are_capped_per_hour_but_disease_scopes_are_not(self):
+        disease = Disease.objects.get(name='Diabetes')
+        for day in (1, 2):
+            render({'accurate': 1}, scope_for(disease, date(2024, 1, day)))
+        
+        with mock.patch('ss_app.views.render_in_background') as render_in_background:
+            response = self.client.get(reverse('wordcloud'), {'disease': disease.pk, 'start_date': '2024-01-03'})
+        render_in_background.assert_not_called()
+        self.assertContains(response, 'Too many custom date ranges')
+        
+        with mock.patch('ss_app.views.render_in_background') as render_in_background:
+            self.client.get(reverse('wordcloud'), {'disease': disease.pk})
+        render_in_background.assert_called_once_with(top_terms(disease=disease), f'disease-{disease.pk}_start_end')
+
+
+class DashboardStatsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='patient', password='testpass123')
+        self.disease = Disease.objects.create(name='Diabetes', description='Test')
+    
+    def predict(self, **kwargs):
+        return Prediction.objects.create(user=self.user, disease=self.disease, symptoms_data={},
+                                         risk_level='low', confidence_score=80.0, **kwargs)
+    
+    def test_signals_keep_counters_in_step_with_the_tables(self):
+        prediction = self.predict()
+        review = Review.objects.create(user=self.user, disease=self.disease, prediction=prediction,
+                                       rating=2, comment='Fine')
+        review.rating = 5
+        review.save()
+        for conversation_id in ('first', 'first', 'second'):
+            AIChatLog.objects.create(user=self.user, prediction=prediction, conversation_id=conversation_id,
+                                     message='hi', response='Hello')
+        # Same month a year ago: not this month's
+        last_year = self.predict()
+        Prediction.objects.filter(pk=last_year.pk).update(created_at=timezone.now() - timedelta(days=366))
+        reconcile_dashboard_stats()
+        
+        stats = dashboard_stats()
+        self.assertEqual((stats['total_users'], stats['total_predictions'], stats['total_reviews']), (1, 2, 1))
+        self.assertEqual((stats['total_chat_logs'], stats['unique_conversations']), (3, 2))
+        self.assertEqual(stats['monthly_predictions'], 1)
+        self.assertEqual(stats['reviews_by_rating'], [{'rating': 5, 'count': 1}])
+        self.assertEqual(stats['predictions_by_disease'], [{'disease__name': 'Diabetes', 'count': 2}])
+        
+        # Deleting the prediction cascades to its review and chat logs
+        prediction.delete()
+        stats = dashboard_stats()
+        self.assertEqual((stats['total_predictions'], stats['total_reviews']), (1, 0))
+        self.assertEqual((stats['total_chat_logs'], stats['unique_conversations']), (0, 0))
+        self.assertEqual(reconcile_dashboard_stats(), {})
+        
+        Prediction.objects.bulk_create([Prediction(user=self.user, disease=self.disease, symptoms_data={},
+                                                   risk_level='high', confidence_score=90.0)])
+        self.assertEqual(reconcile_dashboard_stats()['predictions'], (1, 2))
+    
+    def test_dashboard_reads_counters_within_a_small_query_budget(self):
+        self.predict()
+        User.objects.create_user(username='testadmin', password='testpass123')
+        self.client.login(username='testadmin', password='testpass123')
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual((response.context['total_predictions'], response.context['total_users']), (1, 2))
+    
+    def test_batch_predictions_update_the_counters(self):
+        self.client.login(username='patient', password='testpass123')
+        row = {'glucose': 140, 'blood_pressure': 90, 'bmi': 28, 'age': 45, 'pregnancies': 2, 'insulin': 120}
+        with override_settings(CACHES=LOCMEM_CACHES):
+            response = self.client.post(reverse('api_predict_batch', args=['diabetes']),
+                                        data=json.dumps({'rows': [row] * 3}), content_type='application/json')
+        self.assertEqual(response.json()['scored'], 3)
+        
+        stats = dashboard_stats()
+        self.assertEqual((stats['total_predictions'], stats['monthly_predictions']), (3, 3))
+        self.assertEqual(stats['predictions_by_disease'], [{'disease__name': 'Diabetes', 'count': 3}])
+        self.assertEqual(reconcile_dashboard_stats(), {})
@@ -0,0 +1,263 @@
+"""
+Offline training pipeline for the disease models.
+
+Training reads a disease's CSV, fits a random forest and publishes a versioned
+artifact that web workers load (they never train themselves):
+
+    <MODEL_ARTIFACT_ROOT>/<slug>/<version>/model.pkl
+                                          model.forest/   compiled export
+                                          meta.json       metrics and feature schema
+    <MODEL_ARTIFACT_ROOT>/<slug>/current.json
+
+``current.json`` is only replaced once the new version directory is complete,
+so a worker never sees a half-written model. Run it with
+``manage.py train_models``.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .compiled_forest import CompiledForest, compiled_path, export_forest, file_digest, process_umask, staging_dir
+from .ml_models import PREDICTOR_SPECS, TabularPredictor, artifact_root
+
+DEFAULT_MODEL_PARAMS = {'n_estimators': 100, 'random_state': 42}
+# Candidate forests tried by compaction, smallest configurations first
+COMPACTION_GRID = {
+    'n_estimators': [10, 25, 50, 100],
+    'max_depth': [4, 6, 8, 12, None],
+    'min_samples_leaf': [1, 2, 5, 10],
+}
+# Single-row predictions timed per model for the benchmark's latency percentiles
+LATENCY_SAMPLES = 200
+
+
+def load_training_data(spec):
+    """Return the (X, y) training frames described by a predictor spec"""
+    import pandas as pd
+
+    df = pd.read_csv(spec['csv_path'])
+    if spec.get('dropna'):
+        df.dropna(inplace=True)
+
+    for column, mapping in spec.get('categorical', {}).items():
+        df[column] = df[column].map(mapping)
+
+    columns = [column for field, column in spec['features']]
+    return df[columns], df[spec['target']]
+
+
+def evaluate(model, X_test, y_test):
+    """Held-out accuracy and (for binary targets) ROC AUC"""
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    metrics = {'accuracy': float(accuracy_score(y_test, model.predict(X_test)))}
+    if len(model.classes_) == 2 and y_test.nunique() == 2:
+        metrics['roc_auc'] = float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]))
+    return metrics
+
+
+def peak_memory():
+    """Peak resident memory of this process in bytes"""
+    import resource
+
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, dirs, files in os.walk(path) for name in files
+    )
+
+
+def inference_latency(model, X, samples=LATENCY_SAMPLES):
+    """p50/p99 milliseconds of single-row ``predict_proba`` calls, as made by the views"""
+    rows = np.asarray(X, dtype=np.float64)[:samples]
+    timings = []
+    for row in rows:
+        started = time.perf_counter()
+        model.predict_proba(row[np.newaxis, :])
+        timings.append((time.perf_counter() - started) * 1000)
+    p50, p99 = np.percentile(timings, [50, 99]) if timings else (0.0, 0.0)
+    return {'p50_ms': float(p50), 'p99_ms': float(p99)}
+
+
+def forest_nodes(model):
+    """Total node count across the trees, which is what drives size and latency"""
+    return int(sum(estimator.tree_.node_count for estimator in model.estimators_))
+
+
+def search_compact_params(X, y, params, tolerance, n_jobs=None):
+    """Find the smallest forest that scores within ``tolerance`` of ``params``.
+
+    Candidates from COMPACTION_GRID are scored on a validation split of the
+    training rows (the test rows stay untouched for the final metrics).
+    Returns the chosen parameters and a report of the search.
+    """
+    from itertools import product
+
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+
+    X_fit, X_val, y_fit, y_val = train_test_split(X, y, test_size=0.25, random_state=42)
+
+    def score(candidate):
+        model = RandomForestClassifier(**candidate, n_jobs=n_jobs).fit(X_fit, y_fit)
+        return forest_nodes(model), evaluate(model, X_val, y_val)
+
+    baseline_nodes, baseline = score(params)
+    chosen, chosen_nodes, chosen_metrics = params, baseline_nodes, baseline
+    for values in product(*COMPACTION_GRID.values()):
+        candidate = {**params, **dict(zip(COMPACTION_GRID, values))}
+        nodes, metrics = score(candidate)
+        within = all(metrics.get(name, 0.0) >= value - tolerance for name, value in baseline.items())
+        if within and nodes < chosen_nodes:
+            chosen, chosen_nodes, chosen_metrics = candidate, nodes, metrics
+
+    return chosen, {
+        'tolerance': tolerance,
+        'baseline_params': params,
+        'baseline_nodes': baseline_nodes,
+        'baseline_metrics': baseline,
+        'chosen_params': chosen,
+        'chosen_nodes': chosen_nodes,
+        'chosen_metrics': chosen_metrics,
+    }
+
+
+def train_disease(slug, spec=None, params=None, publish=True, n_jobs=None, compact=None, progress=None):
+    """Train one disease model and write it as a new versioned artifact.
+
+    Returns the artifact's metadata. With ``publish`` the new version becomes
+    the one served by the web workers. ``n_jobs`` is the number of cores used
+    for fitting only; the saved model always predicts single-threaded. With
+    ``compact`` (a metric tolerance such as 0.01) the smallest forest that
+    stays within it is trained instead, see search_compact_params().
+    ``progress(percent, message)`` is called as each stage starts.
+    """
+    import joblib
+    import sklearn
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+
+    report = progress or (lambda percent, message: None)
+    spec = spec or PREDICTOR_SPECS[slug]
+    params = {**DEFAULT_MODEL_PARAMS, **spec.get('model_params', {}), **(params or {})}
+
+    report(5, 'Loading training data')
+    X, y = load_training_data(spec)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    compaction = None
+    if compact is not None:
+        report(10, 'Searching for a compact forest')
+        params, compaction = search_compact_params(X_train, y_train, params, compact, n_jobs)
+
+    report(30, f'Fitting on {len(X_train)} rows')
+    model = RandomForestClassifier(**params, n_jobs=n_jobs)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    # Web workers score one row at a time, where a thread pool is pure overhead
+    model.n_jobs = None
+
+    trained_at = datetime.now(timezone.utc)
+    version = trained_at.strftime('%Y%m%d-%H%M%S-%f')
+    slug_dir = os.path.join(artifact_root(), slug)
+    os.makedirs(slug_dir, exist_ok=True)
+
+    report(70, 'Saving and compiling the model')
+    # Build the version in a staging directory and rename it into place
+    staging = staging_dir(slug_dir)
+    model_path = os.path.join(staging, 'model.pkl')
+    joblib.dump(model, model_path)
+    forest_path = export_forest(model, compiled_path(model_path), source_path=model_path)
+    served = CompiledForest.load(forest_path) if TabularPredictor.use_compiled() else model
+
+    report(85, 'Evaluating on held-out rows')
+    meta = {
+        'slug': slug,
+        'name': spec.get('name', slug),
+        'version': version,
+        'trained_at': trained_at.isoformat(),
+        'model_sha256': file_digest(model_path),
+        'sklearn_version': sklearn.__version__,
+        'params': params,
+        'target': spec['target'],
+        'features': [{'field': field, 'column': column} for field, column in spec['features']],
+        'categorical': spec.get('categorical', {}),
+        'classes': [c.item() if hasattr(c, 'item') else c for c in model.classes_],
+        'rows': {'train': len(X_train), 'test': len(X_test)},
+        'fit_seconds': fit_seconds,
+        'metrics': evaluate(model, X_test, y_test),
+        'compaction': compaction,
+        'benchmark': {
+            'features': len(spec['features']),
+            'fit_n_jobs': n_jobs or 1,
+            'fit_seconds': fit_seconds,
+            'peak_memory_bytes': peak_memory(),
+            'model_bytes': os.path.getsize(model_path),
+            'compiled_bytes': directory_size(forest_path),
+            'inference': inference_latency(served, X_test),
+        },
+    }
+    with open(os.path.join(staging, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    version_dir = os.path.join(slug_dir, version)
+    os.rename(staging, version_dir)
+    if publish:
+        publish_version(slug, version)
+    report(100, f'Published version {version}' if publish else f'Saved version {version}')
+    return meta
+
+
+def publish_version(slug, version):
+    """Atomically point ``<slug>/current.json`` at an existing version"""
+    slug_dir = os.path.join(artifact_root(), slug)
+    if not os.path.isdir(os.path.join(slug_dir, version)):
+        raise ValueError(f"No {slug} artifact version {version}")
+
+    fd, staging = tempfile.mkstemp(prefix='.current-', dir=slug_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': version}, f)
+    # mkstemp files are private to their owner; web workers must read it
+    os.chmod(staging, 0o666 & ~process_umask())
+    os.replace(staging, os.path.join(slug_dir, 'current.json'))
+
+
+def list_versions(slug):
+    """Versions of ``slug`` on disk, oldest first"""
+    slug_dir = os.path.join(artifact_root(), slug)
+    if not os.path.isdir(slug_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(slug_dir)
+        if not name.startswith('.') and os.path.isdir(os.path.join(slug_dir, name))
+    )
+
+
+def prune_versions(slug, keep):
+    """Delete all but the newest ``keep`` versions, never the published one"""
+    slug_dir = os.path.join(artifact_root(), slug)
+    current = None
+    try:
+        with open(os.path.join(slug_dir, 'current.json')) as f:
+            current = json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    removed = []
+    for version in list_versions(slug)[:-keep or None]:
+        if version != current:
+            shutil.rmtree(os.path.join(slug_dir, version))
+            removed.append(version)
+    return removed
@@ -0,0 +1,302 @@
+"""
+Predictions for diseases added through the custom admin.
+
+A ``Disease`` created in the admin describes its inputs with ``DiseaseFormField``
+rows and can come with an uploaded ``model_file`` (a pickled scikit-learn
+classifier) and/or a ``csv_file`` of training data. This module turns those
+into the same kind of predictor the built-in diseases use:
+
+* ``disease_spec()`` builds a ``PREDICTOR_SPECS``-style spec from the form fields
+* ``training_spec()`` adds the uploaded CSV, for ``train_models disease-<id>``
+* ``disease_form_class()`` builds the matching Django form
+* ``prepare_uploaded_model()`` validates an uploaded model and publishes it,
+  compiled to a ``.forest`` when it is a random forest, as an artifact version
+  of the disease's slug (``disease-<id>``), exactly like ``train_models`` does
+* ``predictor_for_disease()`` returns the disease's predictor from the shared
+  registry, so uploads are lazily loaded, cached per model version and
+  hot-reloaded like every other model
+
+Uploaded pickles are only accepted from admins: unpickling runs code.
+"""
+import json
+import os
+import shutil
+import threading
+
+from django import forms
+
+from .compiled_forest import compiled_path, export_forest, file_digest, staging_dir
+from .ml_models import TabularPredictor, artifact_root, current_artifact, predictor_registry
+
+
+class InvalidUpload(ValueError):
+    """An uploaded model or CSV does not match the disease's form fields"""
+
+
+def disease_slug(disease_or_id):
+    """Registry and artifact slug of an admin-added disease"""
+    return f'disease-{getattr(disease_or_id, "pk", disease_or_id)}'
+
+
+def choice_mapping(options):
+    """Encoding of a dropdown/radio field: ``{"label": value}`` or option index"""
+    if isinstance(options, dict):
+        return {str(label): value for label, value in options.items()}
+    return {str(option): index for index, option in enumerate(options or [])}
+
+
+def disease_spec(disease, form_fields=None):
+    """``PREDICTOR_SPECS``-style spec for an admin-added disease.
+
+    Each ``DiseaseFormField.field_name`` is both the form field and the
+    model's column; choice fields are encoded through ``choice_mapping()``.
+    """
+    form_fields = list(form_fields if form_fields is not None else disease.form_fields.all())
+    return {
+        'name': disease.name,
+        'disease_id': disease.pk,
+        'features': [(field.field_name, field.field_name) for field in form_fields],
+        'categorical': {
+            field.field_name: choice_mapping(field.options)
+            for field in form_fields if field.field_type in ('dropdown', 'radio')
+        },
+    }
+
+
+def training_spec(disease):
+    """``disease_spec()`` plus the uploaded CSV to train on"""
+    if not disease.csv_file:
+        raise InvalidUpload(f'{disease.name} has no uploaded training data')
+    spec = disease_spec(disease)
+    spec['csv_path'] = disease.csv_file.path
+    spec['dropna'] = True
+    spec['target'] = csv_target(spec['csv_path'], [field for field, column in spec['features']])
+    return spec
+
+
+def csv_target(csv_path, field_names):
+    """The one CSV column that is not a form field, i.e. what the model predicts"""
+    import pandas as pd
+
+    columns = list(pd.read_csv(csv_path, nrows=0).columns)
+    missing = [name for name in field_names if name not in columns]
+    if missing:
+        raise InvalidUpload(f"CSV is missing columns for form fields: {', '.join(missing)}")
+    extra = [column for column in columns if column not in field_names]
+    if len(extra) != 1:
+        raise InvalidUpload(f"CSV must have exactly one target column besides the form fields, found {extra}")
+    return extra[0]
+
+
+def disease_form_class(disease, form_fields=None):
+    """Django form class generated from a disease's ``DiseaseFormField`` rows.
+
+    Every field is a model input, so every field is required whatever its
+    ``required`` flag says; an unticked checkbox is 0.
+    """
+    form_fields = form_fields if form_fields is not None else disease.form_fields.all()
+    attrs = {}
+    for field in form_fields:
+        rules = field.validation_rules or {}
+        common = {
+            'label': field.field_label,
+            'required': True,
+        }
+        if field.field_type == 'number':
+            attrs[field.field_name] = forms.FloatField(
+                min_value=rules.get('min'),
+                max_value=rules.get('max'),
+                widget=forms.NumberInput(attrs={'class': 'form-control'}),
+                **common
+            )
+        elif field.field_type in ('dropdown', 'radio'):
+            widget = forms.Select if field.field_type == 'dropdown' else forms.RadioSelect
+            attrs[field.field_name] = forms.ChoiceField(
+                choices=[(label, label) for label in choice_mapping(field.options)],
+                widget=widget(attrs={'class': 'form-control'}),
+                **common
+            )
+        elif field.field_type == 'checkbox':
+            attrs[field.field_name] = forms.BooleanField(label=field.field_label, required=False)
+        else:
+            attrs[field.field_name] = forms.FloatField(
+                widget=forms.TextInput(attrs={'class': 'form-control'}),
+                **common
+            )
+    return type(f'{disease.get_url_name().title()}PredictionForm', (forms.Form,), attrs)
+
+
+def validate_model(model, spec):
+    """Check that an unpickled model can serve ``spec``; returns the column order.
+
+    The model must be a binary 0/1 classifier with ``predict_proba`` taking
+    one column per form field. When it was fitted on a DataFrame its column
+    names must be the form field names (in any order).
+    """
+    if not hasattr(model, 'predict_proba') or not hasattr(model, 'classes_'):
+        raise InvalidUpload('Uploaded file is not a fitted scikit-learn classifier')
+    classes = [c.item() if hasattr(c, 'item') else c for c in model.classes_]
+    if classes != [0, 1]:
+        raise InvalidUpload(f'Model must predict the classes [0, 1], not {classes}')
+
+    columns = [column for field, column in spec['features']]
+    if getattr(model, 'n_features_in_', len(columns)) != len(columns):
+        raise InvalidUpload(
+            f'Model expects {model.n_features_in_} features but the disease has {len(columns)} form fields'
+        )
+    names = [str(name) for name in getattr(model, 'feature_names_in_', [])]
+    if names:
+        if sorted(names) != sorted(columns):
+            raise InvalidUpload(f'Model was trained on columns {names}, not the form fields {columns}')
+        return names
+    return columns
+
+
+def is_forest(model):
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    return isinstance(model, (RandomForestClassifier, ExtraTreesClassifier))
+
+
+def prepare_uploaded_model(disease, form_fields=None):
+    """Validate ``disease.model_file`` and publish it as the disease's artifact.
+
+    The version is derived from the upload's digest, so preparing the same
+    file twice is a no-op. Returns the artifact's metadata; raises
+    ``InvalidUpload`` when the model does not fit the disease's form fields.
+    """
+    import joblib
+
+    from .training import publish_version
+
+    if not disease.model_file:
+        raise InvalidUpload(f'{disease.name} has no uploaded model')
+
+    slug = disease_slug(disease)
+    slug_dir = os.path.join(artifact_root(), slug)
+    os.makedirs(slug_dir, exist_ok=True)
+
+    staging = staging_dir(slug_dir)
+    try:
+        model_path = os.path.join(staging, 'model.pkl')
+        with disease.model_file.open('rb') as source, open(model_path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+
+        digest = file_digest(model_path)
+        version = f'upload-{TabularPredictor.version_of(digest)}'
+        version_dir = os.path.join(slug_dir, version)
+        if os.path.isdir(version_dir):
+            with open(os.path.join(version_dir, 'meta.json')) as f:
+                meta = json.load(f)
+        else:
+            spec = disease_spec(disease, form_fields)
+            try:
+                model = joblib.load(model_path)
+            except Exception as e:
+                raise InvalidUpload(f'Could not load the uploaded model: {str(e)}')
+            columns = validate_model(model, spec)
+
+            if is_forest(model):
+                export_forest(model, compiled_path(model_path), source_path=model_path)
+            meta = {
+                'slug': slug,
+                'name': disease.name,
+                'version': version,
+                'model_sha256': digest,
+                'source': 'upload',
+                'uploaded_file': disease.model_file.name,
+                'features': [{'field': column, 'column': column} for column in columns],
+                'compiled': is_forest(model),
+            }
+            with open(os.path.join(staging, 'meta.json'), 'w') as f:
+                json.dump(meta, f, indent=2)
+            os.rename(staging, version_dir)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    publish_version(slug, version)
+    return meta
+
+
+def artifact_columns(artifact):
+    """Columns a published artifact's model was fitted on, in order"""
+    with open(os.path.join(artifact, 'meta.json')) as f:
+        return [feature['column'] for feature in json.load(f)['features']]
+
+
+def form_fields_mismatch(disease, form_fields=None):
+    """Why the disease's published model can't serve its current form fields, or None.
+
+    Form fields deleted, added or renamed after a model was published leave
+    it expecting columns the form no longer provides.
+    """
+    artifact = current_artifact(disease_slug(disease))
+    if artifact is None:
+        return None
+    form_fields = form_fields if form_fields is not None else disease.form_fields.all()
+    fields = [field.field_name for field in form_fields]
+    columns = artifact_columns(artifact)
+    if sorted(fields) == sorted(columns):
+        return None
+    problems = []
+    missing = [column for column in columns if column not in fields]
+    if missing:
+        problems.append(f"no form field for {', '.join(missing)}")
+    extra = [field for field in fields if field not in columns]
+    if extra:
+        problems.append(f"form fields {', '.join(extra)} are not model inputs")
+    return (f"The model served for {disease.name} does not match its form fields "
+            f"({'; '.join(problems)}). Upload or train a model for the current fields.")
+
+
+def load_disease_predictor(disease_id):
+    """Registry factory for an admin-added disease, read fresh from the database"""
+    from .models import Disease
+
+    disease = Disease.objects.get(pk=disease_id)
+    form_fields = list(disease.form_fields.all())
+    spec = disease_spec(disease, form_fields)
+    artifact = current_artifact(disease_slug(disease))
+    if artifact is None and disease.model_file:
+        # First use of an upload that was not prepared when it was saved
+        prepare_uploaded_model(disease, form_fields)
+        artifact = current_artifact(disease_slug(disease))
+    if artifact:
+        problem = form_fields_mismatch(disease, form_fields)
+        if problem:
+            raise InvalidUpload(problem)
+        # Serve in the column order the model was fitted with
+        spec['features'] = [(column, column) for column in artifact_columns(artifact)]
+    return TabularPredictor(disease_slug(disease), spec)
+
+
+def serves_predictions(disease):
+    """Whether an admin-added disease has a model to predict with"""
+    return bool(disease.model_file) or current_artifact(disease_slug(disease)) is not None
+
+
+# Form-field fingerprint each admin-added disease was registered with
+_registered = {}
+_registered_lock = threading.Lock()
+
+
+def form_fields_signature(disease, form_fields):
+    return (disease.updated_at, disease.model_file.name or '', disease.csv_file.name or '') + tuple(
+        (field.field_name, field.field_type, json.dumps(field.options, sort_keys=True))
+        for field in form_fields
+    )
+
+
+def predictor_for_disease(disease, form_fields=None):
+    """Predictor for an admin-added disease, from the shared ``predictor_registry``.
+
+    Editing the disease or its form fields re-registers it, so the next call
+    builds a predictor for the new definition.
+    """
+    form_fields = list(form_fields if form_fields is not None else disease.form_fields.all())
+    slug = disease_slug(disease)
+    signature = form_fields_signature(disease, form_fields)
+    with _registered_lock:
+        if _registered.get(slug) != signature or slug not in predictor_registry:
+            predictor_registry.register(slug, lambda: load_disease_predictor(disease.pk))
+            _registered[slug] = signature
+    return predictor_registry.get(slug)
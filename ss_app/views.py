@@ -2,25 +2,33 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import logout
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import condition, require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Avg, Q
 from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import Disease, Prediction, Review, DiseaseFormField, RiskCategory, AIChatLog, UserProfile
+from .models import Disease, Prediction, Review, DiseaseFormField, RiskCategory, AIChatLog, UserProfile, TrainingJob
 from .forms import (DiabetesPredictionForm, HeartDiseasePredictionForm, HypertensionPredictionForm,
                    AsthmaPredictionForm, StrokePredictionForm, KidneyDiseasePredictionForm, ReviewForm, RiskForm,
                    DiseaseForm, DiseaseFormFieldForm, RiskCategoryForm, UserSuspensionForm,
-                   ReviewModerationForm, AdminSearchForm, DateRangeForm)
-from .ml_models import diabetes_predictor, heart_disease_predictor, hypertension_predictor, asthma_predictor, stroke_predictor, kidney_disease_predictor
+                   ReviewModerationForm, AdminSearchForm, DateRangeForm, WordCloudFilterForm)
+from .ml_models import ModelNotAvailable, predictor_registry
+from .uploaded_models import (InvalidUpload, disease_form_class, disease_slug, form_fields_mismatch,
+                              predictor_for_disease, prepare_uploaded_model, serves_predictions, training_spec)
 from .api_utils import api_client
+from .profiling import list_reports, load_report, report_path
+from .query_budget import query_budget
+from .dashboard_stats import apply_stat_changes, bulk_stat_changes, dashboard_stats
+from .review_terms import is_windowed, term_totals, top_terms
+from .wordcloud_images import (WORDCLOUD_MAX_WORDS, current_image, image_path, may_render, needs_render,
+                               render_in_background, scope_for)
+from .metrics import (PREDICTION_CACHE_TOTAL, PREDICTION_ERRORS_TOTAL, PREDICTION_STAGE_SECONDS,
+                      PREDICTIONS_TOTAL, registry as metrics_registry)
 import json
-import re
-import io
-import base64
-from collections import Counter
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+import os
 from datetime import datetime, timedelta
 
 
@@ -191,6 +199,19 @@ def disease_detail(request, disease_name):
         # Add others like asthma, cancer, stroke if needed...
     }
 
+    # Diseases added in the admin are described by their database row
+    if disease_name not in disease_info:
+        uploaded = Disease.objects.filter(name__iexact=disease_name.replace('_', ' '), is_active=True).first()
+        form_class = prediction_form_and_predictor(disease_name, uploaded)[0] if uploaded else None
+        if form_class is not None:
+            disease_info[disease_name] = {
+                'name': uploaded.name,
+                'description': uploaded.description,
+                'symptoms': uploaded.symptoms,
+                'prevention': uploaded.prevention,
+                'form_class': form_class,
+            }
+
     # ✅ Validate
     if disease_name not in disease_info:
         messages.error(request, 'Disease not found.')
@@ -235,182 +256,86 @@ def disease_detail(request, disease_name):
 
     return render(request, 'disease_detail.html', context)
 
-@login_required
-def predict_disease(request, disease_name):
-    """Handle disease prediction"""
-    disease_obj = get_object_or_404(Disease, name__icontains=disease_name.replace('_', ' '))
+# Prediction form for each disease slug served by ``predictor_registry``
+PREDICTION_FORMS = {
+    'diabetes': DiabetesPredictionForm,
+    'heart_disease': HeartDiseasePredictionForm,
+    'hypertension': HypertensionPredictionForm,
+    'asthma': AsthmaPredictionForm,
+    'stroke': StrokePredictionForm,
+    'kidney_disease': KidneyDiseasePredictionForm,
+}
 
-    if request.method != 'POST':
-        return redirect('disease_detail', disease_name=disease_name)
+def prediction_form_and_predictor(disease_name, disease_obj):
+    """Return ``(form_class, get_predictor)`` for a disease, or ``(None, None)``.
 
-    if disease_name == 'diabetes':
-        form = DiabetesPredictionForm(request.POST)
-        if form.is_valid():
-            # ✅ Use correct predictor instance
-            risk_level, confidence = diabetes_predictor.predict(
-                glucose=form.cleaned_data['glucose'],
-                blood_pressure=form.cleaned_data['blood_pressure'],
-                bmi=form.cleaned_data['bmi'],
-                age=form.cleaned_data['age'],
-                pregnancies=form.cleaned_data['pregnancies'],
-                insulin=form.cleaned_data['insulin']
-            )
+    The built-in diseases use their hand-written forms; diseases added in the
+    admin get a form generated from their ``DiseaseFormField`` rows and the
+    model uploaded (or trained) for them.
+    """
+    form_class = PREDICTION_FORMS.get(disease_name)
+    if form_class is not None and disease_name in predictor_registry:
+        return form_class, lambda: predictor_registry.get(disease_name)
 
-            prediction = Prediction.objects.create(
-                user=request.user,
-                disease=disease_obj,
-                symptoms_data=form.cleaned_data,
-                risk_level=risk_level.lower(),
-                confidence_score=confidence
-            )
+    form_fields = list(disease_obj.form_fields.all())
+    if form_fields and serves_predictions(disease_obj):
+        return (disease_form_class(disease_obj, form_fields),
+                lambda: predictor_for_disease(disease_obj, form_fields))
+    return None, None
 
-            return render(request, 'prediction_result.html', {
-                'prediction': prediction,
-                'risk_level': risk_level,
-                'confidence': confidence,
-                'disease_name': disease_name
-            })
+def metrics_label(disease_name, disease_obj):
+    """Disease label for prediction metrics: the built-in slug or ``disease-<id>``.
 
-    elif disease_name == 'heart_disease':
-        form = HeartDiseasePredictionForm(request.POST)
-        if form.is_valid():
-            risk_level, confidence = heart_disease_predictor.predict(
-                age=form.cleaned_data['age'],
-                sex=form.cleaned_data['sex'],
-                chest_pain=form.cleaned_data['chest_pain'],
-                blood_pressure=form.cleaned_data['blood_pressure'],
-                cholesterol=form.cleaned_data['cholesterol'],
-                max_heart_rate=form.cleaned_data['max_heart_rate']
-            )
-
-            prediction = Prediction.objects.create(
-                user=request.user,
-                disease=disease_obj,
-                symptoms_data=form.cleaned_data,
-                risk_level=risk_level.lower(),
-                confidence_score=confidence
-            )
-
-            return render(request, 'prediction_result.html', {
-                'prediction': prediction,
-                'risk_level': risk_level,
-                'confidence': confidence,
-                'disease_name': disease_name
-            })
-
-    elif disease_name == 'hypertension':
-        form = HypertensionPredictionForm(request.POST)
-        if form.is_valid():
-            risk_level, confidence = hypertension_predictor.predict(
-                age=form.cleaned_data['age'],
-                bmi=form.cleaned_data['bmi'],
-                current_smoker=form.cleaned_data['currentSmoker'],
-                sys_bp=form.cleaned_data['sysBP'],
-                dia_bp=form.cleaned_data['diaBP'],
-                heart_rate=form.cleaned_data['heartRate']
-            )
-            # current_smoker, sys_bp, dia_bp, heart_rate
-            prediction = Prediction.objects.create(
-                user=request.user,
-                disease=disease_obj,
-                symptoms_data=form.cleaned_data,
-                risk_level=risk_level,
-                confidence_score=confidence
-            )
+    Never the URL segment itself, which matches disease names by substring,
+    so the number of label series is bounded by the diseases that exist.
+    """
+    if disease_name in PREDICTION_FORMS and disease_name in predictor_registry:
+        return disease_name
+    return disease_slug(disease_obj)
 
-            return render(request, 'prediction_result.html', {
-                'prediction': prediction,
-                'risk_level': risk_level,
-                'confidence': confidence,
-                'disease_name': disease_name
-            })
+@login_required
+def predict_disease(request, disease_name):
+    """Handle disease prediction"""
+    disease_obj = get_object_or_404(Disease, name__icontains=disease_name.replace('_', ' '))
 
-    elif disease_name == 'asthma':
-        form = AsthmaPredictionForm(request.POST)
-        if form.is_valid():
-            risk_level, confidence = asthma_predictor.predict(
-                age=form.cleaned_data['age'],
-                gender=form.cleaned_data['gender'],
-                shortness_of_breath=form.cleaned_data['shortness_of_breath'],
-                coughing=form.cleaned_data['coughing'],
-                chest_tightness=form.cleaned_data['chest_tightness'],
-                wheezing=form.cleaned_data['wheezing'],
-                allergy_history=form.cleaned_data['allergy_history']
-        )
-
-            prediction = Prediction.objects.create(
-                user=request.user,
-                disease=disease_obj,
-                symptoms_data=form.cleaned_data,
-                risk_level=risk_level.lower(),
-                confidence_score=confidence
-        )
-
-        return render(request, 'prediction_result.html', {
-            'prediction': prediction,
-            'risk_level': risk_level,
-            'confidence': confidence,
-            'disease_name': disease_name
-        })
-    elif disease_name == 'stroke':
-        form = StrokePredictionForm(request.POST)
-        if form.is_valid():
-            risk_level, confidence = stroke_predictor.predict(
-                age=form.cleaned_data['age'],
-                gender=form.cleaned_data['gender'],
-                hypertension=form.cleaned_data['hypertension'],
-                heart_disease=form.cleaned_data['heart_disease'],
-                avg_glucose_level=form.cleaned_data['avg_glucose_level'],
-                bmi=form.cleaned_data['bmi'],
-                smoking_status=form.cleaned_data['smoking_status']
-        )
-
-            prediction = Prediction.objects.create(
-                user=request.user,
-                disease=disease_obj,
-                symptoms_data=form.cleaned_data,
-                risk_level=risk_level.lower(),
-                confidence_score=confidence
-        )
-
-        return render(request, 'prediction_result.html', {
-            'prediction': prediction,
-            'risk_level': risk_level,
-            'confidence': confidence,
-            'disease_name': disease_name
-        })
-    elif disease_name == 'kidney_disease':
-        form = KidneyDiseasePredictionForm(request.POST)
-        if form.is_valid():
-            # Convert categorical string values to integers
-            hypertension_value = int(form.cleaned_data['hypertension'])
-            diabetes_value = int(form.cleaned_data['diabetes'])
-            
-            risk_level, confidence = kidney_disease_predictor.predict(
-                age=form.cleaned_data['age'],
-                blood_pressure=form.cleaned_data['blood_pressure'],
-                serum_creatinine=form.cleaned_data['serum_creatinine'],
-                blood_urea=form.cleaned_data['blood_urea'],
-                hemoglobin=form.cleaned_data['hemoglobin'],
-                hypertension=hypertension_value,
-                diabetes=diabetes_value
-            )
+    if request.method != 'POST':
+        return redirect('disease_detail', disease_name=disease_name)
 
-            prediction = Prediction.objects.create(
-                user=request.user,
-                disease=disease_obj,
-                symptoms_data=form.cleaned_data,
-                risk_level=risk_level.lower(),
-                confidence_score=confidence
-            )
+    form_class, get_predictor = prediction_form_and_predictor(disease_name, disease_obj)
+    if form_class is not None:
+        label = metrics_label(disease_name, disease_obj)
+        with PREDICTION_STAGE_SECONDS.time(disease=label, stage='validation'):
+            form = form_class(request.POST)
+            is_valid = form.is_valid()
+        if is_valid:
+            try:
+                with PREDICTION_STAGE_SECONDS.time(disease=label, stage='inference'):
+                    predictor = get_predictor()
+                    risk_level, confidence, timings = predictor.predict_with_timings(**form.cleaned_data)
+            except (ModelNotAvailable, InvalidUpload):
+                PREDICTION_ERRORS_TOTAL.inc(disease=label, reason='model_unavailable')
+                messages.error(request, 'Predictions for this disease are temporarily unavailable.')
+                return redirect('disease_detail', disease_name=disease_name)
+            PREDICTION_CACHE_TOTAL.inc(disease=label, result='hit' if timings['cache_hit'] else 'miss')
 
-            return render(request, 'prediction_result.html', {
-                'prediction': prediction,
-                'risk_level': risk_level,
-                'confidence': confidence,
-                'disease_name': disease_name
-            })
+            with PREDICTION_STAGE_SECONDS.time(disease=label, stage='db_write'):
+                prediction = Prediction.objects.create(
+                    user=request.user,
+                    disease=disease_obj,
+                    symptoms_data=form.cleaned_data,
+                    risk_level=risk_level.lower(),
+                    confidence_score=confidence
+                )
+            PREDICTIONS_TOTAL.inc(disease=label, risk_level=prediction.risk_level)
 
+            with PREDICTION_STAGE_SECONDS.time(disease=label, stage='render'):
+                return render(request, 'prediction_result.html', {
+                    'prediction': prediction,
+                    'risk_level': risk_level,
+                    'confidence': confidence,
+                    'disease_name': disease_name
+                })
+        PREDICTION_ERRORS_TOTAL.inc(disease=label, reason='invalid_form')
 
     messages.error(request, 'Invalid form data.')
     return redirect('disease_detail', disease_name=disease_name)
@@ -518,143 +443,141 @@ def api_disease_stats(request, disease_name):
     stats = api_client.get_disease_stats(disease_name)
     return JsonResponse(stats)
 
+# Largest number of rows accepted by a single batch prediction request
+PREDICTION_BATCH_LIMIT = 1000
+
+@login_required
+@require_http_methods(["POST"])
+def api_predict_batch(request, disease_name):
+    """Score a batch of patients for one disease in a single model call.
+
+    Expects a JSON body of the form ``{"rows": [{<form field>: value, ...}]}``
+    and, like every session-authenticated POST, the CSRF token in an
+    ``X-CSRFToken`` header.
+    Every row is validated with the disease's prediction form; valid rows are
+    scored together and saved as ``Prediction`` rows, invalid rows are
+    reported with their form errors.
+    """
+    disease_obj = Disease.objects.filter(name__icontains=disease_name.replace('_', ' ')).first()
+    form_class, get_predictor = prediction_form_and_predictor(disease_name, disease_obj) if disease_obj else (None, None)
+    if form_class is None:
+        return JsonResponse({'error': f'Unknown disease: {disease_name}'}, status=404)
+    label = metrics_label(disease_name, disease_obj)
+
+    try:
+        rows = json.loads(request.body).get('rows')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Body must be a JSON object with a "rows" list'}, status=400)
+    if not isinstance(rows, list) or not rows:
+        return JsonResponse({'error': 'Body must be a JSON object with a "rows" list'}, status=400)
+    if len(rows) > PREDICTION_BATCH_LIMIT:
+        return JsonResponse({'error': f'At most {PREDICTION_BATCH_LIMIT} rows per request'}, status=400)
+
+    results = [None] * len(rows)
+    valid_indexes = []
+    valid_data = []
+    with PREDICTION_STAGE_SECONDS.time(disease=label, stage='validation'):
+        for index, row in enumerate(rows):
+            form = form_class(row if isinstance(row, dict) else {})
+            if form.is_valid():
+                valid_indexes.append(index)
+                valid_data.append(form.cleaned_data)
+            else:
+                results[index] = {'index': index, 'errors': form.errors.get_json_data()}
+    if len(valid_data) < len(rows):
+        PREDICTION_ERRORS_TOTAL.inc(len(rows) - len(valid_data), disease=label, reason='invalid_form')
+
+    if not valid_data:
+        # Nothing to score: report the per-row errors without loading the model
+        return JsonResponse({'disease': disease_name, 'scored': 0, 'failed': len(rows), 'results': results})
+
+    try:
+        with PREDICTION_STAGE_SECONDS.time(disease=label, stage='inference'):
+            scores = get_predictor().predict_batch(valid_data)
+    except (ModelNotAvailable, InvalidUpload):
+        PREDICTION_ERRORS_TOTAL.inc(len(valid_data), disease=label, reason='model_unavailable')
+        return JsonResponse({'error': f'No trained model for {disease_name}'}, status=503)
+
+    with PREDICTION_STAGE_SECONDS.time(disease=label, stage='db_write'), transaction.atomic():
+        predictions = Prediction.objects.bulk_create([
+            Prediction(
+                user=request.user,
+                disease=disease_obj,
+                symptoms_data=cleaned_data,
+                risk_level=risk_level,
+                confidence_score=confidence
+            )
+            for cleaned_data, (risk_level, confidence) in zip(valid_data, scores)
+        ])
+        # bulk_create skips the post_save signals that maintain the dashboard counters
+        apply_stat_changes(bulk_stat_changes(predictions))
+    for prediction in predictions:
+        PREDICTIONS_TOTAL.inc(disease=label, risk_level=prediction.risk_level)
+
+    for index, prediction in zip(valid_indexes, predictions):
+        results[index] = {
+            'index': index,
+            'prediction_id': prediction.pk,
+            'risk_level': prediction.risk_level,
+            'confidence': prediction.confidence_score,
+        }
+
+    return JsonResponse({
+        'disease': disease_name,
+        'scored': len(predictions),
+        'failed': len(rows) - len(predictions),
+        'results': results,
+    })
+
 def api_regional_data(request, disease_name, region):
     """API endpoint for regional disease data"""
     regional_data = api_client.get_regional_data(disease_name, region)
     return JsonResponse(regional_data)
 
-def generate_wordcloud_data():
-    """Generate word cloud data from all reviews"""
-    # Get all review comments
-    reviews = Review.objects.all()
-    if not reviews:
-        return None
-    
-    # Combine all comments
-    all_text = ' '.join([review.comment for review in reviews if review.comment])
-    
-    if not all_text.strip():
-        return None
-    
-    # Clean the text
-    all_text = re.sub(r'[^\w\s]', '', all_text.lower())
-    
-    # Remove only basic stop words, keep medical and health-related terms
-    stop_words = {
-        'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
-        'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
-        'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those',
-        'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them',
-        'my', 'your', 'his', 'her', 'its', 'our', 'their', 'mine', 'yours', 'his', 'hers', 'ours', 'theirs',
-        'very', 'really', 'quite', 'just', 'only', 'also', 'too', 'as', 'so', 'than', 'more', 'most',
-        'like', 'love', 'hate', 'dislike', 'enjoy', 'appreciate', 'value', 'trust', 'believe', 'think',
-        'know', 'understand', 'see', 'look', 'watch', 'hear', 'listen', 'feel', 'touch', 'taste', 'smell',
-        'say', 'tell', 'speak', 'talk', 'ask', 'answer', 'reply', 'respond', 'comment', 'mention',
-        'get', 'give', 'take', 'put', 'set', 'place', 'move', 'go', 'come', 'arrive', 'leave', 'stay',
-        'make', 'create', 'build', 'construct', 'form', 'shape', 'design', 'plan', 'prepare', 'ready',
-        'use', 'utilize', 'apply', 'employ', 'practice', 'exercise', 'work', 'play', 'study', 'learn',
-        'help', 'assist', 'support', 'aid', 'serve', 'provide', 'offer', 'give', 'present', 'show',
-        'want', 'need', 'require', 'desire', 'wish', 'hope', 'expect', 'wait', 'try', 'attempt', 'effort',
-        'find', 'discover', 'search', 'seek', 'look', 'find', 'locate', 'identify', 'recognize', 'notice',
-        'start', 'begin', 'commence', 'initiate', 'launch', 'open', 'close', 'end', 'finish', 'complete',
-        'continue', 'keep', 'maintain', 'preserve', 'save', 'store', 'hold', 'contain', 'include', 'involve',
-        'change', 'modify', 'alter', 'adjust', 'adapt', 'transform', 'convert', 'turn', 'become', 'grow',
-        'increase', 'decrease', 'rise', 'fall', 'grow', 'shrink', 'expand', 'contract', 'extend', 'reduce',
-        'time', 'day', 'week', 'month', 'year', 'hour', 'minute', 'second', 'morning', 'afternoon', 'evening',
-        'night', 'today', 'yesterday', 'tomorrow', 'now', 'then', 'before', 'after', 'during', 'while',
-        'place', 'location', 'area', 'region', 'country', 'city', 'town', 'village', 'street', 'road',
-        'way', 'path', 'direction', 'north', 'south', 'east', 'west', 'up', 'down', 'left', 'right',
-        'thing', 'object', 'item', 'piece', 'part', 'section', 'portion', 'amount', 'quantity', 'number',
-        'people', 'person', 'man', 'woman', 'boy', 'girl', 'child', 'adult', 'human', 'individual',
-        'group', 'team', 'family', 'community', 'society', 'world', 'earth', 'planet', 'universe',
-        'life', 'living', 'alive', 'dead', 'death', 'birth', 'born', 'die', 'live', 'survive',
-        'food', 'eat', 'drink', 'meal', 'breakfast', 'lunch', 'dinner', 'snack', 'hungry', 'thirsty',
-        'water', 'milk', 'juice', 'coffee', 'tea', 'soda', 'alcohol', 'wine', 'beer', 'drink',
-        'house', 'home', 'building', 'room', 'kitchen', 'bathroom', 'bedroom', 'living', 'dining',
-        'car', 'vehicle', 'transport', 'travel', 'trip', 'journey', 'vacation', 'holiday', 'visit',
-        'money', 'cash', 'dollar', 'cent', 'price', 'cost', 'expensive', 'cheap', 'free', 'buy', 'sell',
-        'job', 'work', 'employment', 'career', 'profession', 'business', 'company', 'office', 'factory',
-        'school', 'education', 'student', 'teacher', 'class', 'course', 'lesson', 'study', 'learn',
-        'book', 'read', 'write', 'story', 'article', 'news', 'information', 'data', 'fact', 'truth',
-        'music', 'song', 'dance', 'art', 'picture', 'photo', 'image', 'video', 'movie', 'film',
-        'game', 'play', 'fun', 'enjoy', 'entertainment', 'hobby', 'interest', 'activity', 'sport',
-        'computer', 'internet', 'website', 'app', 'software', 'program', 'code', 'technology',
-        'phone', 'mobile', 'call', 'text', 'message', 'email', 'communication', 'contact',
-        'weather', 'sunny', 'rainy', 'cloudy', 'hot', 'cold', 'warm', 'cool', 'temperature',
-        'color', 'red', 'blue', 'green', 'yellow', 'black', 'white', 'gray', 'brown', 'pink',
-        'size', 'big', 'small', 'large', 'tiny', 'huge', 'enormous', 'giant', 'mini', 'micro',
-        'shape', 'round', 'square', 'triangle', 'circle', 'rectangle', 'oval', 'flat', 'curved',
-        'texture', 'smooth', 'rough', 'soft', 'hard', 'sharp', 'dull', 'wet', 'dry', 'sticky',
-        'taste', 'sweet', 'sour', 'bitter', 'salty', 'spicy', 'delicious', 'tasty', 'yummy',
-        'sound', 'loud', 'quiet', 'noisy', 'silent', 'music', 'noise', 'voice', 'speech',
-        'light', 'bright', 'dark', 'shiny', 'dull', 'glowing', 'sparkling', 'twinkling',
-        'speed', 'fast', 'slow', 'quick', 'rapid', 'gradual', 'sudden', 'immediate', 'instant',
-        'strength', 'strong', 'weak', 'powerful', 'mighty', 'fragile', 'delicate', 'tough',
-        'quantity', 'many', 'few', 'several', 'some', 'none', 'all', 'every', 'each', 'both',
-        'frequency', 'always', 'never', 'sometimes', 'often', 'rarely', 'usually', 'occasionally',
-        'probability', 'certain', 'possible', 'likely', 'unlikely', 'definite', 'maybe', 'perhaps',
-        'comparison', 'same', 'different', 'similar', 'identical', 'unique', 'special', 'ordinary',
-        'relationship', 'friend', 'family', 'love', 'hate', 'like', 'dislike', 'care', 'ignore',
-        'emotion', 'happy', 'sad', 'angry', 'excited', 'worried', 'scared', 'surprised', 'confused',
-        'thought', 'think', 'believe', 'know', 'understand', 'remember', 'forget', 'imagine', 'dream',
-        'action', 'do', 'make', 'create', 'build', 'destroy', 'break', 'fix', 'repair', 'clean',
-        'movement', 'walk', 'run', 'jump', 'climb', 'swim', 'fly', 'drive', 'ride', 'carry',
-        'communication', 'say', 'tell', 'speak', 'talk', 'ask', 'answer', 'reply', 'respond',
-        'sensation', 'see', 'hear', 'feel', 'touch', 'taste', 'smell', 'look', 'watch', 'listen'
-    }
-    
-    # Split into words and filter
-    words = [word for word in all_text.split() if word not in stop_words and len(word) > 2]
-    
-    # Count word frequencies
-    word_freq = Counter(words)
-    
-    return word_freq
-
 def wordcloud_view(request):
-    """Generate and display word cloud from reviews"""
-    word_freq = generate_wordcloud_data()
+    """Display the word cloud from reviews, optionally of one disease and date range"""
+    filter_form = WordCloudFilterForm(request.GET or None)
+    window = {}
+    if filter_form.is_bound and filter_form.is_valid():
+        window = {
+            'disease': filter_form.cleaned_data['disease'],
+            'start': filter_form.cleaned_data['start_date'],
+            'end': filter_form.cleaned_data['end_date'],
+        }
+    windowed = is_windowed(**window)
     
-    if not word_freq:
+    word_freq = top_terms(WORDCLOUD_MAX_WORDS, **window)
+    
+    if not word_freq and not windowed:
         messages.info(request, 'No reviews available to generate word cloud.')
         return redirect('home')
     
-    # Create word cloud
-    wordcloud = WordCloud(
-        width=800, 
-        height=400, 
-        background_color='white',
-        colormap='viridis',
-        max_words=100,
-        relative_scaling=0.5
-    ).generate_from_frequencies(word_freq)
-    
-    # Convert to image
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis('off')
-    
-    # Save to buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight', dpi=300)
-    buffer.seek(0)
-    
-    # Convert to base64
-    image_png = buffer.getvalue()
-    buffer.close()
-    plt.close()
-    
-    # Encode to base64
-    image_base64 = base64.b64encode(image_png).decode('utf-8')
+    # The image is rendered off-request; until a first one exists the page says so.
+    # Date ranges are visitor-chosen, so their renders are rate-limited
+    scope = scope_for(**window)
+    image = current_image(scope) if word_freq else None
+    rendering = False
+    if word_freq and needs_render(image, word_freq) and may_render(scope):
+        render_in_background(word_freq, scope)
+        rendering = True
     
     # Get some statistics
-    total_reviews = Review.objects.count()
-    total_words = sum(word_freq.values())
-    unique_words = len(word_freq)
-    top_words = dict(sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10])
+    reviews = Review.objects.all()
+    if window.get('disease') is not None:
+        reviews = reviews.filter(disease=window['disease'])
+    if window.get('start') is not None:
+        reviews = reviews.filter(created_at__date__gte=window['start'])
+    if window.get('end') is not None:
+        reviews = reviews.filter(created_at__date__lte=window['end'])
+    total_reviews = reviews.count()
+    total_words, unique_words = term_totals(**window)
+    top_words = dict(list(word_freq.items())[:10])
     
     context = {
-        'wordcloud_image': image_base64,
+        'filter_form': filter_form,
+        'windowed': windowed,
+        'wordcloud_image': image,
+        'wordcloud_rendering': rendering,
         'total_reviews': total_reviews,
         'total_words': total_words,
         'unique_words': unique_words,
@@ -663,57 +586,44 @@ def wordcloud_view(request):
     
     return render(request, 'wordcloud.html', context)
 
+@condition(etag_func=lambda request, key: key)
+def wordcloud_image(request, key):
+    """A rendered word cloud; its content never changes, so browsers may keep it"""
+    try:
+        path = image_path(key)
+    except ValueError:
+        raise Http404('No such word cloud')
+    if not os.path.exists(path):
+        raise Http404('No such word cloud')
+    response = FileResponse(open(path, 'rb'), content_type='image/png')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 def is_admin(user):
     """Check if user is the specific testadmin"""
     return user.is_authenticated and user.username == 'testadmin'
 
 @login_required
 @user_passes_test(is_admin)
+@query_budget(10)
 def admin_dashboard(request):
     """Admin Dashboard Overview"""
     try:
-        # Get statistics
-        total_users = User.objects.count()
-        total_predictions = Prediction.objects.count()
-        total_diseases = Disease.objects.count()
-        total_reviews = Review.objects.count()
-        total_chat_logs = AIChatLog.objects.count()
-        unique_conversations = AIChatLog.objects.values('conversation_id').distinct().count()
+        # Counters are maintained by signals (ss_app.dashboard_stats)
+        stats = dashboard_stats()
         
-        # Recent activity
-        recent_predictions = Prediction.objects.select_related('user', 'disease').order_by('-created_at')[:5]
-        recent_reviews = Review.objects.select_related('user', 'disease').order_by('-created_at')[:5]
-        recent_users = User.objects.order_by('-date_joined')[:5]
-        recent_chat_logs = AIChatLog.objects.select_related('user', 'disease').order_by('-timestamp')[:5]
-        
-        # Chart data
-        predictions_by_disease = Prediction.objects.values('disease__name').annotate(count=Count('id')).order_by('-count')[:5]
-        reviews_by_rating = Review.objects.values('rating').annotate(count=Count('id')).order_by('rating')
-        
-        # Monthly trends
-        current_month = timezone.now().month
-        monthly_predictions = Prediction.objects.filter(created_at__month=current_month).count()
-        monthly_users = User.objects.filter(date_joined__month=current_month).count()
-        monthly_chat_logs = AIChatLog.objects.filter(timestamp__month=current_month).count()
-        monthly_reviews = Review.objects.filter(created_at__month=current_month).count()
+        # Recent activity; ids follow creation order and are indexed
+        recent_predictions = Prediction.objects.select_related('user', 'disease').order_by('-id')[:5]
+        recent_reviews = Review.objects.select_related('user', 'disease').order_by('-id')[:5]
+        recent_users = User.objects.order_by('-id')[:5]
+        recent_chat_logs = AIChatLog.objects.select_related('user', 'disease').order_by('-id')[:5]
         
         context = {
-            'total_users': total_users,
-            'total_predictions': total_predictions,
-            'total_diseases': total_diseases,
-            'total_reviews': total_reviews,
-            'total_chat_logs': total_chat_logs,
-            'unique_conversations': unique_conversations,
+            **stats,
             'recent_predictions': recent_predictions,
             'recent_reviews': recent_reviews,
             'recent_users': recent_users,
             'recent_chat_logs': recent_chat_logs,
-            'predictions_by_disease': predictions_by_disease,
-            'reviews_by_rating': reviews_by_rating,
-            'monthly_predictions': monthly_predictions,
-            'monthly_users': monthly_users,
-            'monthly_chat_logs': monthly_chat_logs,
-            'monthly_reviews': monthly_reviews,
         }
         
         return render(request, 'admin/dashboard.html', context)
@@ -834,6 +744,45 @@ def admin_user_detail(request, user_id):
     
     return render(request, 'admin/user_detail.html', context)
 
+@login_required
+@user_passes_test(is_admin)
+def admin_metrics(request):
+    """Prediction metrics of this worker process in Prometheus text format (see ss_app.metrics)"""
+    response = HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['X-Metrics-Worker'] = str(os.getpid())
+    return response
+
+@login_required
+@user_passes_test(is_admin)
+def admin_profiles(request):
+    """Request profiles written by ProfilingMiddleware, newest first"""
+    context = {
+        'reports': list_reports(),
+        'sample_rate': getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0),
+    }
+    return render(request, 'admin/profiles.html', context)
+
+@login_required
+@user_passes_test(is_admin)
+def admin_profile_detail(request, report_id):
+    """One request profile: timings, SQL and the hottest functions"""
+    try:
+        report = load_report(report_id)
+    except (OSError, ValueError):
+        raise Http404('No such profile report')
+    return render(request, 'admin/profile_detail.html', {'report': report})
+
+@login_required
+@user_passes_test(is_admin)
+def admin_profile_download(request, report_id, kind):
+    """Raw cProfile stats (.prof) or folded stacks for a flamegraph (.folded)"""
+    try:
+        path = report_path(report_id, kind)
+        handle = open(path, 'rb')
+    except (OSError, ValueError):
+        raise Http404('No such profile report')
+    return FileResponse(handle, as_attachment=True, filename=os.path.basename(path))
+
 @login_required
 @user_passes_test(is_admin)
 def admin_diseases(request):
@@ -862,6 +811,9 @@ def admin_disease_detail(request, disease_id):
     
     # Get form fields
     form_fields = DiseaseFormField.objects.filter(disease=disease)
+    model_problem = form_fields_mismatch(disease, form_fields)
+    if model_problem:
+        messages.warning(request, model_problem)
     
     # Get risk categories
     risk_categories = RiskCategory.objects.filter(disease=disease)
@@ -872,16 +824,66 @@ def admin_disease_detail(request, disease_id):
     # Get reviews for this disease
     reviews = Review.objects.filter(disease=disease).select_related('user').order_by('-created_at')
     
+    # Training jobs for the uploaded CSV, newest first
+    training_jobs = TrainingJob.objects.filter(disease=disease)[:10]
+    
     context = {
         'disease': disease,
         'form_fields': form_fields,
         'risk_categories': risk_categories,
         'predictions': predictions,
         'reviews': reviews,
+        'training_jobs': training_jobs,
+        'has_active_job': any(job.is_active for job in training_jobs),
     }
     
     return render(request, 'admin/disease_detail.html', context)
 
+def queue_training_job(request, disease):
+    """Queue training from ``disease.csv_file`` unless a job is already pending"""
+    # A job whose worker died is pending again (or failed), not running forever
+    TrainingJob.reclaim_stale()
+    if TrainingJob.objects.filter(disease=disease, status__in=['queued', 'running']).exists():
+        messages.info(request, f'A training job for "{disease.name}" is already queued.')
+        return None
+    job = TrainingJob.objects.create(disease=disease, created_by=request.user, message='Waiting for a worker')
+    messages.success(request, f'Training for "{disease.name}" queued; progress is shown below.')
+    return job
+
+@login_required
+@user_passes_test(is_admin)
+@require_http_methods(["POST"])
+def admin_disease_train(request, disease_id):
+    """Queue a training job for a disease's uploaded CSV"""
+    disease = get_object_or_404(Disease, id=disease_id)
+    try:
+        training_spec(disease)
+    except InvalidUpload as e:
+        messages.error(request, f'Cannot train "{disease.name}": {e}')
+    else:
+        queue_training_job(request, disease)
+    return redirect('admin_disease_detail', disease_id=disease_id)
+
+@login_required
+@user_passes_test(is_admin)
+def admin_training_jobs(request, disease_id):
+    """JSON status of a disease's recent training jobs, polled by the detail page"""
+    disease = get_object_or_404(Disease, id=disease_id)
+    jobs = TrainingJob.objects.filter(disease=disease)[:10]
+    return JsonResponse({'jobs': [
+        {
+            'id': job.pk,
+            'status': job.status,
+            'progress': job.progress,
+            'message': job.message,
+            'version': job.version,
+            'metrics': job.metrics,
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+        for job in jobs
+    ]})
+
 @login_required
 @user_passes_test(is_admin)
 def admin_disease_edit(request, disease_id):
@@ -893,6 +895,16 @@ def admin_disease_edit(request, disease_id):
         if form.is_valid():
             form.save()
             messages.success(request, f'Disease "{disease.name}" updated successfully.')
+            # Check uploads against the form fields now rather than on the first prediction
+            try:
+                if 'csv_file' in form.changed_data and disease.csv_file:
+                    training_spec(disease)
+                    queue_training_job(request, disease)
+                if 'model_file' in form.changed_data and disease.model_file:
+                    meta = prepare_uploaded_model(disease)
+                    messages.success(request, f"Model version {meta['version']} is now served for {disease.name}.")
+            except InvalidUpload as e:
+                messages.error(request, f'Uploaded file rejected: {e}')
             return redirect('admin_disease_detail', disease_id=disease_id)
     else:
         form = DiseaseForm(instance=disease)
@@ -951,6 +963,7 @@ def admin_form_fields(request, disease_id):
 
 @login_required
 @user_passes_test(is_admin)
+@query_budget(8)
 def admin_reviews(request):
     """Review Moderation"""
     search_form = AdminSearchForm(request.GET)
@@ -982,11 +995,7 @@ def admin_reviews(request):
     page_obj = paginator.get_page(page_number)
     
     # Calculate average rating from all reviews
-    if reviews.exists():
-        total_rating = sum(review.rating for review in reviews)
-        average_rating = total_rating / reviews.count()
-    else:
-        average_rating = 0
+    average_rating = reviews.aggregate(average=Avg('rating'))['average'] or 0
     
     context = {
         'page_obj': page_obj,
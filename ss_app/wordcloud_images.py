@@ -0,0 +1,244 @@
+"""
+Pre-rendered word cloud images.
+
+Drawing a word cloud takes seconds, so pages never do it. Each image is a PNG
+in ``WORDCLOUD_IMAGE_DIR`` named by a hash of the word counts drawn in it, and
+``<scope>.json`` records which image a scope currently shows (``all`` is the
+site-wide cloud, see ``scope_for`` for those of a disease or date range). Pages link to ``/wordcloud/image/<key>.png``; an image never
+changes once written, so it is served with its key as the ETag and cached by
+browsers for good.
+
+A page asks for a new image in the background once the word counts have moved
+more than ``WORDCLOUD_RERENDER_THRESHOLD`` (a fraction of all counted words)
+away from those in the current one, and keeps showing the current one
+meanwhile. ``manage.py render_wordcloud`` renders on a schedule instead.
+
+Only one render runs at a time on a host: a lock in the process and an
+``flock`` on ``.render.lock`` across worker processes. Requests that find a
+render in progress don't start another.
+
+The site-wide and per-disease clouds over all dates are a fixed set of
+scopes. Date ranges are chosen by visitors, so their scopes are rendered at
+most ``WORDCLOUD_WINDOW_RENDERS_PER_HOUR`` times an hour per host (counted
+from the scope files themselves, so across workers), and only the newest
+``MAX_SCOPES`` of them are kept.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: only renders within one process are serialised
+    fcntl = None
+
+# Words drawn in a word cloud
+WORDCLOUD_MAX_WORDS = 100
+
+IMAGE_KEY = re.compile(r'^[0-9a-f]{16}$')
+SCOPE = re.compile(r'^[\w.-]+$')
+# Images kept besides the current ones, for pages rendered just before a swap
+KEEP_OLD_IMAGES = 5
+# Date-range scopes kept, most recently rendered first
+MAX_SCOPES = 100
+
+_render_lock = threading.Lock()
+
+
+def image_dir():
+    return str(getattr(settings, 'WORDCLOUD_IMAGE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'wordclouds')))
+
+
+def image_key(frequencies):
+    """Content key of the image for these word counts"""
+    payload = json.dumps(sorted(frequencies.items()), separators=(',', ':'))
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def image_path(key):
+    if not IMAGE_KEY.match(key):
+        raise ValueError(f'Invalid word cloud image {key!r}')
+    return os.path.join(image_dir(), f'{key}.png')
+
+
+def _scope_path(scope):
+    if not SCOPE.match(scope):
+        raise ValueError(f'Invalid word cloud scope {scope!r}')
+    return os.path.join(image_dir(), f'{scope}.json')
+
+
+def scope_for(disease=None, start=None, end=None):
+    """Scope name of the word cloud for a disease and/or date range"""
+    if disease is None and start is None and end is None:
+        return 'all'
+    disease_id = getattr(disease, 'pk', disease)
+    return f"disease-{disease_id or 'all'}_{start or 'start'}_{end or 'end'}"
+
+
+def is_standing(scope):
+    """Whether ``scope`` is one of the fixed scopes: all reviews, or one disease over all dates"""
+    return scope == 'all' or scope.endswith('_start_end')
+
+
+def date_range_scopes():
+    """Rendered date-range scope files, newest first"""
+    directory = image_dir()
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.json') and not is_standing(name[:-5])]
+    except FileNotFoundError:
+        return []
+    return sorted(names, key=lambda name: os.path.getmtime(os.path.join(directory, name)), reverse=True)
+
+
+def may_render(scope):
+    """Whether a page may start a render for ``scope`` now (see the module docstring)"""
+    if is_standing(scope):
+        return True
+    limit = getattr(settings, 'WORDCLOUD_WINDOW_RENDERS_PER_HOUR', 20)
+    hour_ago = time.time() - 3600
+    directory = image_dir()
+    recent = 0
+    for name in date_range_scopes():
+        if os.path.getmtime(os.path.join(directory, name)) < hour_ago:
+            break
+        recent += 1
+    return recent < limit
+
+
+def current_image(scope='all'):
+    """The image a scope shows, as its metadata dict, or None before the first render"""
+    try:
+        with open(_scope_path(scope)) as f:
+            image = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return image if os.path.exists(image_path(image['key'])) else None
+
+
+def drift(old, new):
+    """How far ``new`` word counts are from ``old``, relative to the old total"""
+    changed = sum(abs(new.get(term, 0) - old.get(term, 0)) for term in set(old) | set(new))
+    return changed / max(sum(old.values()), 1)
+
+
+def needs_render(image, frequencies):
+    if image is None:
+        return True
+    if image['key'] == image_key(frequencies):
+        return False
+    threshold = getattr(settings, 'WORDCLOUD_RERENDER_THRESHOLD', 0.05)
+    return drift(image['frequencies'], frequencies) > threshold
+
+
+def draw(frequencies, path):
+    # Imported here so that loading the URLconf doesn't pay for wordcloud and PIL
+    from wordcloud import WordCloud
+
+    cloud = WordCloud(
+        width=800,
+        height=400,
+        scale=2,
+        background_color='white',
+        colormap='viridis',
+        max_words=len(frequencies),
+        relative_scaling=0.5
+    ).generate_from_frequencies(frequencies)
+    cloud.to_image().save(path, format='PNG', optimize=True)
+
+
+def _write_atomically(path, write):
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def render(frequencies, scope='all', blocking=True):
+    """Render the image for these counts and make it the scope's current one.
+
+    Returns its metadata, or None when ``blocking`` is false and another
+    render holds the lock.
+    """
+    if not _render_lock.acquire(blocking=blocking):
+        return None
+    try:
+        directory = image_dir()
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '.render.lock'), 'w') as lock_file:
+            if fcntl:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    return None
+
+            key = image_key(frequencies)
+            path = image_path(key)
+            if not os.path.exists(path):
+                _write_atomically(path, lambda tmp_path: draw(frequencies, tmp_path))
+
+            image = {
+                'key': key,
+                'scope': scope,
+                'rendered_at': timezone.now().isoformat(),
+                'frequencies': frequencies,
+            }
+
+            def write_metadata(tmp_path):
+                with open(tmp_path, 'w') as f:
+                    json.dump(image, f)
+
+            _write_atomically(_scope_path(scope), write_metadata)
+            prune_images()
+            return image
+    finally:
+        _render_lock.release()
+
+
+def render_in_background(frequencies, scope='all'):
+    """Start a render unless one is already running; returns whether one was started"""
+    if _render_lock.locked():
+        return False
+
+    def run():
+        try:
+            render(frequencies, scope, blocking=False)
+        except Exception as e:
+            print(f"⚠️ Could not render the {scope} word cloud: {str(e)}")
+
+    threading.Thread(target=run, name=f'wordcloud-{scope}', daemon=True).start()
+    return True
+
+
+def prune_images():
+    """Delete the least recently rendered date-range scopes and images no scope shows, except the newest few"""
+    directory = image_dir()
+    scopes = date_range_scopes()
+    for name in scopes[MAX_SCOPES:]:
+        os.remove(os.path.join(directory, name))
+
+    standing = [name for name in os.listdir(directory) if name.endswith('.json') and is_standing(name[:-5])]
+    current = set()
+    for name in standing + scopes[:MAX_SCOPES]:
+        image = current_image(name[:-5])
+        if image:
+            current.add(f"{image['key']}.png")
+    old = sorted(
+        (name for name in os.listdir(directory) if name.endswith('.png') and name not in current),
+        key=lambda name: os.path.getmtime(os.path.join(directory, name)),
+        reverse=True,
+    )
+    for name in old[KEEP_OLD_IMAGES:]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass